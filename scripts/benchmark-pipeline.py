@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmarks
+Times synthesis, fault injection, dataset I/O, feature extraction, training and inference
+over a sweep of dataset sizes, records peak memory and compares against a stored baseline
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from grid_synthesis import FAULT_CLASSES, FAULT_INJECTORS, synthesize_normal
+from waveform_store import WaveformStore
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join('data', 'benchmark_baseline.json')
+DEFAULT_OUTPUT = os.path.join('data', 'benchmark_results.json')
+BENCHMARK_SEED = 1234
+
+
+def _load_script(filename, module_name):
+    """Import one of the hyphenated CLI scripts as a module"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class BenchmarkEnvironment:
+    """
+    Scratch working directory plus inputs shared between stages
+    The pipeline writes to data/ and server/ml/ relative to the working directory,
+    so every stage runs inside the scratch directory
+    """
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.dataset_module = _load_script('generate-dataset.py', 'generate_dataset')
+        self.train_module = _load_script('train-model.py', 'train_model')
+        self.generator = self.dataset_module.KeralaGridDataGenerator(seed=BENCHMARK_SEED)
+        self._samples = {}
+        self._features_size = None
+
+    def rng(self):
+        return np.random.default_rng(BENCHMARK_SEED)
+
+    def samples(self, n):
+        """Dataset of n samples as the generator's list of dicts"""
+        if n not in self._samples:
+            self._samples[n] = self.generator.generate_dataset(num_samples=n)
+        return self._samples[n]
+
+    def store_path(self, n):
+        path = os.path.join('data', f'bench_{n}')
+        if not WaveformStore.exists(path):
+            self.generator.save_dataset(self.samples(n), f'bench_{n}')
+        return path
+
+    def features_path(self, n):
+        """Basic features of n samples where train-model.py looks for them"""
+        path = os.path.join('data', 'kerala_grid_features_10k.csv')
+        if self._features_size != n:
+            self.generator.generate_features_csv(WaveformStore(self.store_path(n)), 'kerala_grid_features_10k.csv')
+            self._features_size = n
+        return path
+
+    def model_dir(self, n):
+        """Model trained on the n-sample features, kept per size since training overwrites server/ml"""
+        path = os.path.join('models', f'bench_{n}')
+        if not os.path.isdir(path):
+            self.features_path(n)
+            self.train_module.train_model()
+            shutil.copytree(os.path.join('server', 'ml'), path)
+        return path
+
+
+def _synthesis(class_name):
+    def setup(env, n):
+        rng = env.rng()
+        return lambda: env.generator.generate_batch(class_name, n, rng)
+    return setup
+
+
+def _fault_injection(class_name):
+    def setup(env, n):
+        rng = env.rng()
+        waveforms = synthesize_normal(n, env.generator.time_vector, rng)
+        return lambda: FAULT_INJECTORS[class_name](waveforms, rng, env.generator.sampling_rate)
+    return setup
+
+
+def _save_dataset(env, n):
+    dataset = env.samples(n)
+    return lambda: env.generator.save_dataset(dataset, f'bench_save_{n}')
+
+
+def _features(feature_set):
+    def setup(env, n):
+        store = WaveformStore(env.store_path(n))
+        return lambda: env.generator.generate_features_csv(store, f'bench_{feature_set}_{n}.csv', feature_set)
+    return setup
+
+
+def _training(env, n):
+    env.features_path(n)
+    return lambda: env.train_module.train_model()
+
+
+def _inference(env, n):
+    import pandas as pd
+    from grid_inference import BatchPredictor
+
+    predictor = BatchPredictor.from_dir(env.model_dir(n))
+    X = pd.read_csv(env.features_path(n))[predictor.feature_columns].to_numpy()
+    return lambda: predictor.predict_proba(X)
+
+
+# Stage name -> setup(env, n) returning the timed callable; setup itself is never timed
+STAGES = {
+    **{f'synthesis_{c.lower()}': _synthesis(c) for c in FAULT_CLASSES},
+    **{f'fault_injection_{c.lower()}': _fault_injection(c) for c in FAULT_INJECTORS},
+    'save_dataset': _save_dataset,
+    'features_basic': _features('basic'),
+    'features_full': _features('full'),
+    'training': _training,
+    'inference': _inference,
+}
+
+
+def run_stage(env, stage, n, repeat):
+    """Best and median wall time over repeats, then one traced run for peak memory"""
+    times = []
+    for _ in range(repeat):
+        run = STAGES[stage](env, n)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    # Tracing slows allocation-heavy code, so memory is measured on a separate run
+    run = STAGES[stage](env, n)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    best = min(times)
+    return {
+        'stage': stage,
+        'size': n,
+        'seconds': best,
+        'median_seconds': statistics.median(times),
+        'samples_per_second': n / best if best > 0 else None,
+        'peak_memory_mb': peak / 2**20,
+    }
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=SCRIPTS_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(stages, sizes, repeat=3, keep_workdir=False):
+    """Run every stage at every size; returns the results document"""
+    workdir = tempfile.mkdtemp(prefix='kerala-bench-')
+    cwd = os.getcwd()
+    results = []
+    try:
+        os.chdir(workdir)
+        # The pipeline reports its progress on stdout; keep it out of the benchmark table
+        with contextlib.redirect_stdout(io.StringIO()):
+            env = BenchmarkEnvironment(workdir)
+        for n in sizes:
+            for stage in stages:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = run_stage(env, stage, n, repeat)
+                results.append(result)
+                print(f"  {stage:<30} {n:>7} {result['seconds']:>9.3f}s "
+                      f"{result['samples_per_second']:>12,.0f}/s {result['peak_memory_mb']:>9.1f} MB")
+    finally:
+        os.chdir(cwd)
+        if not keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {'environment': environment_info(), 'repeat': repeat, 'results': results}
+
+
+def compare(results, baseline, tolerance=0.10):
+    """Per stage and size: time relative to the baseline and whether it regressed beyond tolerance"""
+    reference = {(r['stage'], r['size']): r for r in baseline['results']}
+    rows = []
+    for result in results['results']:
+        base = reference.get((result['stage'], result['size']))
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] > 0 else float('inf')
+        rows.append({
+            'stage': result['stage'],
+            'size': result['size'],
+            'seconds': result['seconds'],
+            'baseline_seconds': base['seconds'],
+            'ratio': ratio,
+            'peak_memory_mb': result['peak_memory_mb'],
+            'baseline_peak_memory_mb': base['peak_memory_mb'],
+            'regressed': ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the dataset and training pipeline')
+    parser.add_argument('--sizes', default='1000,4000', help='Comma-separated dataset sizes')
+    parser.add_argument('--stages', default=None, help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage and size; the best counts')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed slowdown before flagging')
+    parser.add_argument('--keep-workdir', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    stages = args.stages.split(',') if args.stages else list(STAGES)
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    print("⏱️  Kerala Grid Pipeline Benchmarks")
+    print("=" * 50)
+    results = run_benchmarks(stages, sizes, args.repeat, args.keep_workdir)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
+
+    regressions = []
+    if os.path.isfile(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with baseline from {baseline['environment']['timestamp']} "
+              f"(commit {baseline['environment'].get('commit')}):")
+        for row in compare(results, baseline, args.tolerance):
+            flag = '⚠️  slower' if row['regressed'] else ''
+            print(f"  {row['stage']:<30} {row['size']:>7} {row['seconds']:>9.3f}s "
+                  f"vs {row['baseline_seconds']:>9.3f}s ({(row['ratio'] - 1) * 100:+6.1f}%) {flag}")
+            if row['regressed']:
+                regressions.append(row)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        shutil.copyfile(args.output, args.baseline)
+        print(f"✅ Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Compact Binary Model Format
+Scaler and MLP weights in one file, float32 or int8-quantized, read by server/services/mlService.ts
+
+Layout (little-endian):
+    b'KGML' | uint32 header length | JSON header | payload sections, each 4-byte aligned
+"""
+
+import json
+import struct
+
+import numpy as np
+
+from grid_synthesis import FAULT_CLASSES
+
+MAGIC = b'KGML'
+FORMAT_VERSION = 1
+
+
+def _quantize(weights):
+    """Symmetric per-output-unit int8 quantization; returns (int8 weights, float32 scales)"""
+    scales = np.abs(weights).max(axis=0) / 127.0
+    scales[scales == 0] = 1.0
+    return np.round(weights / scales).clip(-127, 127).astype(np.int8), scales.astype(np.float32)
+
+
+def write_compact_model(path, coefs, intercepts, mean, std, feature_columns, classes, dtype='float32'):
+    """Write an MLP and its scaler; dtype is 'float32' or 'int8'"""
+    sections = []
+    offset = 0
+
+    def add(array):
+        nonlocal offset
+        data = np.ascontiguousarray(array).tobytes()
+        entry = {'offset': offset, 'length': int(np.size(array))}
+        sections.append(data + b'\0' * (-len(data) % 4))
+        offset += len(sections[-1])
+        return entry
+
+    header = {
+        'version': FORMAT_VERSION,
+        'dtype': dtype,
+        'activation': 'relu',
+        'output_activation': 'softmax',
+        'feature_columns': list(feature_columns),
+        'classes': [FAULT_CLASSES[int(c)] for c in classes],
+        'scaler': {
+            'mean': add(np.asarray(mean, dtype=np.float32)),
+            'std': add(np.asarray(std, dtype=np.float32)),
+        },
+        'layers': [],
+    }
+    for coef, intercept in zip(coefs, intercepts):
+        coef = np.asarray(coef, dtype=np.float32)
+        layer = {'inputs': coef.shape[0], 'outputs': coef.shape[1]}
+        if dtype == 'int8':
+            quantized, scales = _quantize(coef)
+            layer['weights'] = add(quantized)
+            layer['scales'] = add(scales)
+        else:
+            layer['weights'] = add(coef)
+        layer['bias'] = add(np.asarray(intercept, dtype=np.float32))
+        header['layers'].append(layer)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    header_bytes += b' ' * (-(len(MAGIC) + 4 + len(header_bytes)) % 4)
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for section in sections:
+            f.write(section)
+    return header
+
+
+def read_compact_model(path):
+    """Load a compact model; weights are dequantized to float32"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f'{path} is not a compact model file')
+
+    (header_length,) = struct.unpack('<I', data[4:8])
+    header = json.loads(data[8:8 + header_length])
+    payload = 8 + header_length
+
+    def section(entry, dtype):
+        return np.frombuffer(data, dtype=dtype, count=entry['length'], offset=payload + entry['offset'])
+
+    layers = []
+    for layer in header['layers']:
+        shape = (layer['inputs'], layer['outputs'])
+        if header['dtype'] == 'int8':
+            weights = section(layer['weights'], np.int8).reshape(shape) * section(layer['scales'], np.float32)
+        else:
+            weights = section(layer['weights'], np.float32).reshape(shape)
+        layers.append((weights.astype(np.float32), section(layer['bias'], np.float32)))
+
+    return {
+        'feature_columns': header['feature_columns'],
+        'classes': header['classes'],
+        'mean': section(header['scaler']['mean'], np.float32),
+        'std': section(header['scaler']['std'], np.float32),
+        'layers': layers,
+        'dtype': header['dtype'],
+    }
+
+
+def predict_proba(model, X):
+    """Scaler and forward pass of a loaded compact model over a batch of raw features"""
+    h = (np.asarray(X, dtype=np.float32) - model['mean']) / model['std']
+    for i, (weights, bias) in enumerate(model['layers']):
+        h = h @ weights + bias
+        if i < len(model['layers']) - 1:
+            np.maximum(h, 0, out=h)
+    h -= h.max(axis=1, keepdims=True)
+    np.exp(h, out=h)
+    return h / h.sum(axis=1, keepdims=True)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Bulk Database Loader
+Streams a generated waveform store into the waveform_data and feature_data tables with COPY,
+in batches over parallel connections, resuming where an interrupted load stopped
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+
+from grid_features import FEATURE_SETS, ID_COLUMNS, features_frame
+from grid_synthesis import CHANNELS
+from waveform_store import WaveformStore
+
+try:
+    import psycopg2
+    from psycopg2.extras import execute_values
+except ImportError:  # Only needed to talk to the database
+    psycopg2 = None
+
+DEFAULT_STORE = os.path.join('data', 'kerala_grid_dataset_10k')
+DEFAULT_BATCH_SIZE = 1000
+
+# Waveform values are written with this many decimals, finer than the float32 store resolves them
+ARRAY_DECIMALS = 4
+
+WAVEFORM_COLUMNS = ['id', 'feeder_id', 'timestamp', *CHANNELS, 'sampling_rate', 'duration_seconds', 'label']
+FEATURE_DATA_COLUMNS = ['id', 'waveform_id', 'features', 'label']
+
+# One row per committed batch, written in the batch's own transaction so a batch loads exactly once
+PROGRESS_TABLE = 'dataset_load_batches'
+PROGRESS_DDL = f"""
+CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+    dataset_id uuid NOT NULL,
+    batch_index integer NOT NULL,
+    batch_size integer NOT NULL,
+    rows integer NOT NULL,
+    loaded_at timestamptz DEFAULT now(),
+    PRIMARY KEY (dataset_id, batch_index)
+)
+"""
+
+NULL = '\\N'
+
+
+def connect(dsn):
+    if psycopg2 is None:
+        raise RuntimeError('psycopg2 is required to load the database: pip install psycopg2-binary')
+    return psycopg2.connect(dsn)
+
+
+def dataset_id(store):
+    """
+    Stable identity of a store; row ids derive from it, so reloading a store never duplicates rows
+    Generated stores are identified by their seed and settings, others by their location
+    """
+    manifest = store.manifest
+    if manifest.get('seed') is not None:
+        key = json.dumps({k: manifest.get(k) for k in ('seed', 'reference_time', 'num_samples', 'sampling_rate',
+                                                        'duration_seconds', 'fidelity')}, sort_keys=True)
+    else:
+        key = os.path.abspath(store.path)
+    return uuid.uuid5(uuid.NAMESPACE_URL, f'kerala-grid-dataset:{key}')
+
+
+def row_ids(dataset, kind, sample_ids):
+    return [str(uuid.uuid5(dataset, f'{kind}-{sample_id}')) for sample_id in sample_ids]
+
+
+def plan_batches(store, batch_size=DEFAULT_BATCH_SIZE):
+    """Split every chunk into batches of at most batch_size rows; a batch never spans chunks"""
+    batches = []
+    for chunk_index, chunk in enumerate(store.chunks):
+        for start in range(0, chunk['num_samples'], batch_size):
+            batches.append({
+                'index': len(batches),
+                'chunk': chunk_index,
+                'start': start,
+                'stop': min(start + batch_size, chunk['num_samples']),
+            })
+    return batches
+
+
+def loaded_batches(conn, dataset, batch_size):
+    """Indices of the batches committed by earlier runs for this dataset"""
+    with conn, conn.cursor() as cur:
+        cur.execute(PROGRESS_DDL)
+        cur.execute(f'SELECT batch_index, batch_size FROM {PROGRESS_TABLE} WHERE dataset_id = %s', (str(dataset),))
+        rows = cur.fetchall()
+    sizes = {size for _, size in rows}
+    if sizes and sizes != {batch_size}:
+        raise ValueError(f'Dataset was partly loaded with --batch-size {sizes.pop()}, resume with the same size')
+    return {index for index, _ in rows}
+
+
+def store_arrays_uncompressed(conn):
+    """
+    Keep the waveform channels of new rows out of line but uncompressed
+    pglz compression of the arrays dominates server time during a load; this trades it for
+    roughly twice the disk space and only changes how later rows are stored
+    """
+    with conn, conn.cursor() as cur:
+        for channel in CHANNELS:
+            cur.execute(f'ALTER TABLE waveform_data ALTER COLUMN {channel} SET STORAGE EXTERNAL')
+
+
+def sync_feeders(conn, metadata):
+    """Create the feeders of the dataset that the database lacks; returns feeder code -> id"""
+    feeders = metadata.drop_duplicates('feeder_id')
+    with conn, conn.cursor() as cur:
+        execute_values(
+            cur,
+            'INSERT INTO feeders (code, name, area_type, typical_load_kw) VALUES %s ON CONFLICT (code) DO NOTHING',
+            list(zip(feeders['feeder_id'], feeders['feeder_name'], feeders['area_type'],
+                     feeders['typical_load_kw'].round(2))),
+        )
+        cur.execute('SELECT code, id FROM feeders WHERE code = ANY(%s)', (list(feeders['feeder_id']),))
+        return {code: str(feeder_id) for code, feeder_id in cur.fetchall()}
+
+
+def array_literals(waveforms, decimals=ARRAY_DECIMALS):
+    """
+    The channels of every sample as tab-separated text[] literals, one string per sample
+    Values are formatted in bulk with NumPy as fixed-width decimals; the padding is leading
+    spaces, which the array parser ignores
+    """
+    scaled = np.rint(np.asarray(waveforms, dtype=np.float64) * 10**decimals).astype(np.int64)
+    n, channels, points = scaled.shape
+    magnitude = np.abs(scaled)
+    int_digits = max(len(str(int(magnitude.max()) // 10**decimals)), 1)
+    point = 1 + int_digits  # Sign, integer digits, point, fraction, separator
+    width = point + decimals + 2
+
+    chars = np.full((n, channels, points, width), ord(' '), dtype=np.uint8)
+    rest = magnitude.copy()
+    for position in range(point + decimals, point, -1):
+        chars[..., position] = ord('0') + rest % 10
+        rest //= 10
+    chars[..., point] = ord('.')
+    first_digit = np.full(scaled.shape, point - 1)
+    for position in range(point - 1, 0, -1):
+        chars[..., position] = np.where((rest > 0) | (position == point - 1), ord('0') + rest % 10, ord(' '))
+        first_digit = np.where(rest > 0, position, first_digit)
+        rest //= 10
+    negative = scaled < 0
+    np.put_along_axis(chars, (first_digit - 1)[..., None],
+                      np.where(negative, ord('-'), ord(' ')).astype(np.uint8)[..., None], axis=-1)
+    chars[..., -1] = ord(',')
+
+    # '{' + values + '}' per channel, channels separated by tabs
+    literals = np.empty((n, channels, 1 + points * width + 1), dtype=np.uint8)
+    literals[..., 0] = ord('{')
+    literals[..., 1:-1] = chars.reshape(n, channels, points * width)
+    literals[..., -2] = ord('}')
+    literals[..., -1] = ord('\t')
+    literals = literals.reshape(n, -1)[:, :-1]
+    return [row.tobytes().decode('ascii') for row in literals]
+
+
+def waveform_rows(ids, feeder_ids, waveforms, metadata, sampling_rate, duration_seconds):
+    """COPY text rows of waveform_data; channels become text[] literals"""
+    out = io.StringIO()
+    arrays = array_literals(waveforms)
+    for i, (timestamp, label) in enumerate(zip(metadata['timestamp'], metadata['label'])):
+        out.write(f'{ids[i]}\t{feeder_ids[i] or NULL}\t{timestamp}\t{arrays[i]}\t'
+                  f'{sampling_rate}\t{duration_seconds}\t{label}\n')
+    out.seek(0)
+    return out
+
+
+def feature_rows(ids, waveform_ids, features):
+    """COPY text rows of feature_data; the features of a sample become one JSON object"""
+    documents = features.drop(columns=ID_COLUMNS).to_json(orient='records', lines=True).splitlines()
+    out = io.StringIO()
+    for feature_id, waveform_id, document, label in zip(ids, waveform_ids, documents, features['label']):
+        out.write(f'{feature_id}\t{waveform_id}\t{document}\t{label}\n')
+    out.seek(0)
+    return out
+
+
+class BatchLoader:
+    """Loads batches of one store over one connection; each batch is a single transaction"""
+
+    def __init__(self, dsn, store_path, dataset, feeder_ids, batch_size, feature_set='basic'):
+        self.conn = connect(dsn)
+        self.store = WaveformStore(store_path)
+        self.dataset = dataset
+        self.feeder_ids = feeder_ids
+        self.batch_size = batch_size
+        self.feature_set = feature_set
+        self.sampling_rate = int(round(self.store.manifest['sampling_rate']))
+        self.duration_seconds = self.store.manifest['duration_seconds']
+
+    def load(self, batch):
+        """COPY one batch and record it; returns (batch index, rows)"""
+        waveforms, metadata = self.store.load_chunk(batch['chunk'])
+        waveforms = waveforms[batch['start']:batch['stop']]
+        metadata = metadata.iloc[batch['start']:batch['stop']].reset_index(drop=True)
+
+        waveform_ids = row_ids(self.dataset, 'waveform', metadata['sample_id'])
+        feeder_ids = [self.feeder_ids.get(code) for code in metadata['feeder_id']]
+        with self.conn, self.conn.cursor() as cur:
+            cur.copy_expert(
+                f"COPY waveform_data ({', '.join(WAVEFORM_COLUMNS)}) FROM STDIN",
+                waveform_rows(waveform_ids, feeder_ids, waveforms, metadata, self.sampling_rate,
+                              self.duration_seconds),
+            )
+            if self.feature_set:
+                features = features_frame(waveforms, metadata, self.feature_set, self.store.manifest['sampling_rate'])
+                cur.copy_expert(
+                    f"COPY feature_data ({', '.join(FEATURE_DATA_COLUMNS)}) FROM STDIN",
+                    feature_rows(row_ids(self.dataset, 'features', metadata['sample_id']), waveform_ids, features),
+                )
+            cur.execute(
+                f'INSERT INTO {PROGRESS_TABLE} (dataset_id, batch_index, batch_size, rows) VALUES (%s, %s, %s, %s)',
+                (str(self.dataset), batch['index'], self.batch_size, len(metadata)),
+            )
+        return batch['index'], len(metadata)
+
+    def close(self):
+        self.conn.close()
+
+
+# Each worker process keeps one connection for all of its batches
+_worker_loader = None
+
+
+def _init_worker(*args):
+    global _worker_loader
+    _worker_loader = BatchLoader(*args)
+
+
+def _load_batch_worker(batch):
+    return _worker_loader.load(batch)
+
+
+def load_store(store_path, dsn, batch_size=DEFAULT_BATCH_SIZE, workers=1, feature_set='basic',
+               uncompressed=False, progress=True):
+    """
+    Load a waveform store into waveform_data (and feature_data unless feature_set is None)
+    Batches committed by an earlier, interrupted run are skipped; returns a summary
+    """
+    store = WaveformStore(store_path)
+    dataset = dataset_id(store)
+    batches = plan_batches(store, batch_size)
+
+    conn = connect(dsn)
+    try:
+        done = loaded_batches(conn, dataset, batch_size)
+        if uncompressed:
+            store_arrays_uncompressed(conn)
+        feeder_ids = sync_feeders(conn, store.metadata())
+    finally:
+        conn.close()
+    pending = [batch for batch in batches if batch['index'] not in done]
+
+    summary = {
+        'dataset_id': str(dataset),
+        'batches': len(batches),
+        'skipped_batches': len(batches) - len(pending),
+        'loaded_batches': 0,
+        'rows': 0,
+    }
+    if progress:
+        print(f"Loading {sum(b['stop'] - b['start'] for b in pending)} samples in {len(pending)} batches "
+              f"({summary['skipped_batches']} already loaded) over {workers} connection(s)...")
+
+    start = time.perf_counter()
+    init_args = (dsn, store_path, dataset, feeder_ids, batch_size, feature_set)
+    if workers > 1:
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args)
+    else:
+        pool = nullcontext()
+        _init_worker(*init_args)
+    with pool:
+        results = pool.map(_load_batch_worker, pending) if workers > 1 else map(_load_batch_worker, pending)
+        for _, rows in results:
+            summary['loaded_batches'] += 1
+            summary['rows'] += rows
+            if progress and (summary['loaded_batches'] % 10 == 0 or summary['loaded_batches'] == len(pending)):
+                print(f"  Progress: {summary['loaded_batches']}/{len(pending)} batches "
+                      f"({summary['rows'] / (time.perf_counter() - start):.0f} rows/s)")
+    if workers == 1:
+        _worker_loader.close()
+
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load a generated dataset into waveform_data and feature_data')
+    parser.add_argument('store', nargs='?', default=DEFAULT_STORE, help='Waveform store directory')
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='PostgreSQL connection string (default: $DATABASE_URL)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Rows per COPY transaction; keep it when resuming')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel connections')
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default='basic')
+    parser.add_argument('--no-features', action='store_true', help='Load waveform_data only')
+    parser.add_argument('--uncompressed', action='store_true',
+                        help='Store waveform arrays without compression: several times faster loads, '
+                             'about twice the disk space (changes the column storage setting)')
+    args = parser.parse_args()
+
+    if not args.dsn or not args.dsn.startswith(('postgres://', 'postgresql://')):
+        parser.error('a PostgreSQL --dsn (or DATABASE_URL) is required')
+    if not WaveformStore.exists(args.store):
+        print(f"Waveform store not found at {args.store}. Run generate-dataset.py first.")
+        sys.exit(1)
+
+    print("🗄️  Kerala Grid Bulk Loader")
+    print("=" * 50)
+    summary = load_store(args.store, args.dsn, args.batch_size, args.workers,
+                         None if args.no_features else args.feature_set, args.uncompressed)
+    print(f"✅ Loaded {summary['rows']} samples in {summary['seconds']:.1f}s "
+          f"({summary['skipped_batches']} batches were already loaded)")
+
+
+if __name__ == '__main__':
+    main()
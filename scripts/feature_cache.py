@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Incremental Feature Cache
+Feature rows keyed by a content hash of each waveform, one file per feature set, sampling
+rate and feature-set version
+"""
+
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+KEY_BYTES = 16
+
+
+def waveform_keys(waveforms):
+    """
+    Content hash of each (6, T) waveform, taken over its float64 values, the precision features
+    are computed in; float32 store rows hash as their exact float64 values
+    """
+    rows = np.ascontiguousarray(waveforms, dtype=np.float64).reshape(len(waveforms), -1)
+    return np.array(
+        [hashlib.blake2b(row.tobytes(), digest_size=KEY_BYTES).digest() for row in rows],
+        dtype=f'S{KEY_BYTES}',
+    )
+
+
+def _rate_tag(sampling_rate):
+    return f'{float(sampling_rate):g}hz'
+
+
+class FeatureCache:
+    """
+    On-disk cache of feature rows for one feature set, sampling rate and version
+    Identical waveform bytes at different rates have different spectral features, so every
+    rate has its own file. Saving removes files left behind by other versions of the same
+    feature set and rate; entries not looked up during a run are only evicted on request.
+    """
+
+    def __init__(self, cache_dir, feature_set, version, columns, sampling_rate):
+        self.cache_dir = cache_dir
+        self.feature_set = feature_set
+        self.version = version
+        self.columns = list(columns)
+        self.sampling_rate = sampling_rate
+        self.path = os.path.join(cache_dir, f'{feature_set}-{_rate_tag(sampling_rate)}-v{version}.npz')
+
+        self.keys = np.empty(0, dtype=f'S{KEY_BYTES}')
+        self.features = np.empty((0, len(self.columns)))
+        self._seen = []
+        self._added = []
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.isfile(self.path):
+            cached = np.load(self.path)
+            if list(cached['columns']) == self.columns:
+                self.keys = cached['keys']
+                self.features = cached['features']
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, keys):
+        """Cached rows for keys (NaN where missing) and the mask of hits"""
+        self._seen.append(keys)
+        rows = np.full((len(keys), len(self.columns)), np.nan)
+        if len(self.keys) == 0:
+            hit = np.zeros(len(keys), dtype=bool)
+        else:
+            idx = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            hit = self.keys[idx] == keys
+            rows[hit] = self.features[idx[hit]]
+
+        self.hits += int(hit.sum())
+        self.misses += int((~hit).sum())
+        return rows, hit
+
+    def update(self, keys, features):
+        """Add freshly computed rows, keeping the key index sorted"""
+        keys, first = np.unique(keys, return_index=True)
+        new = ~np.isin(keys, self.keys)
+        if not new.any():
+            return
+        self._added.append((keys[new], np.asarray(features)[first][new]))
+        merged_keys = np.concatenate([self.keys, keys[new]])
+        merged_features = np.concatenate([self.features, self._added[-1][1]])
+        order = np.argsort(merged_keys)
+        self.keys = merged_keys[order]
+        self.features = merged_features[order]
+
+    def journal(self):
+        """
+        Keys looked up, rows added and hit counts since the last journal, for a worker
+        process to hand its work on a private copy of the cache back to the parent
+        """
+        empty = np.empty(0, dtype=f'S{KEY_BYTES}')
+        journal = {
+            'seen': np.concatenate(self._seen) if self._seen else empty,
+            'keys': np.concatenate([keys for keys, _ in self._added]) if self._added else empty,
+            'features': (np.concatenate([rows for _, rows in self._added]) if self._added
+                         else np.empty((0, len(self.columns)))),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+        self._seen, self._added = [], []
+        self.hits = self.misses = 0
+        return journal
+
+    def merge(self, journal):
+        """Apply the journal of a worker's copy of this cache"""
+        self._seen.append(journal['seen'])
+        if len(journal['keys']):
+            self.update(journal['keys'], journal['features'])
+        self.hits += journal['hits']
+        self.misses += journal['misses']
+
+    def save(self, prune=False):
+        """
+        Persist the cache; with prune, entries not looked up since it was opened are evicted
+        first, so pruning after a run over part of the corpus drops the rest of it.
+        Returns the number of evicted entries
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        evicted = 0
+        if prune and self._seen:
+            keep = np.isin(self.keys, np.concatenate(self._seen))
+            evicted = int((~keep).sum())
+            self.keys = self.keys[keep]
+            self.features = self.features[keep]
+
+        np.savez(self.path, keys=self.keys, features=self.features, columns=np.array(self.columns))
+
+        # Rows computed under other versions of this feature set are stale
+        stale = glob.glob(os.path.join(self.cache_dir, f'{self.feature_set}-{_rate_tag(self.sampling_rate)}-v*.npz'))
+        for path in stale:
+            if os.path.abspath(path) != os.path.abspath(self.path):
+                os.remove(path)
+        return evicted
@@ -6,12 +6,42 @@ Generates 10,000 realistic waveform samples for Kerala electrical grid
 
 import numpy as np
 import pandas as pd
-from scipy import signal
-import json
 from datetime import datetime, timedelta
-import random
 import os
 import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from grid_synthesis import (
+    CHANNELS, FAULT_CLASSES, FAULT_INJECTORS, decimate, generate_feeder_list, kept_time_vector, synthesize_normal,
+)
+from grid_features import FEATURE_SETS, extract_features, features_frame, open_feature_cache
+from pipeline_metrics import PROFILERS, RunMetrics
+from scenario_spec import ScenarioSpec
+from waveform_store import (
+    PARAM_COLUMNS, WaveformStore, build_index, samples_to_arrays, write_chunk, write_manifest,
+)
+
+# Spawn keys of the independent random streams derived from the master seed
+FEEDER_STREAM = 0
+SAMPLE_STREAM = 1
+SHARD_STREAM = 2
+
+DEFAULT_SHARD_SIZE = 2500
+
+# How stored waveforms are obtained from the simulation rate:
+# 'slice' evaluates only every downsample_factor-th instant (the original datasets, aliased),
+# 'direct' synthesizes at the output rate without the harmonics it cannot represent,
+# 'decimate' synthesizes at the full rate and low-pass filters before downsampling
+FIDELITY_MODES = ['slice', 'direct', 'decimate']
+
+# Samples synthesized at the full rate at once in 'decimate' mode, bounds memory
+DECIMATE_BATCH_SIZE = 32
+
+# Stored rate of 'direct' and 'decimate' datasets unless given: 20 samples per 50 Hz cycle
+DEFAULT_OUTPUT_RATE = 1000
 
 class KeralaGridDataGenerator:
     """
@@ -19,230 +49,353 @@ class KeralaGridDataGenerator:
     Based on actual Kerala State Electricity Board characteristics
     """
     
-    def __init__(self):
-        self.sampling_rate = 10000  # 10 kHz
+    def __init__(self, seed=None, reference_time=None, metrics=None, fidelity='slice',
+                 sampling_rate=10000, duration_seconds=4.0, output_rate=None, scenario=None):
+        if fidelity not in FIDELITY_MODES:
+            raise ValueError(f'Unknown fidelity {fidelity!r}, expected one of {FIDELITY_MODES}')
+        self.fidelity = fidelity
+        self.sampling_rate = sampling_rate  # 10 kHz simulation rate
         self.fundamental_freq = 50  # 50 Hz for Indian grid
         self.voltage_level = 11000  # 11 kV distribution
-        self.feeders = self._generate_feeder_list()
-        
-    def _generate_feeder_list(self):
+        self.duration_seconds = duration_seconds
+        # Rate of the stored waveforms
+        self.output_rate = output_rate or (sampling_rate / 100 if fidelity == 'slice' else DEFAULT_OUTPUT_RATE)
+        if fidelity != 'slice' and self.output_rate <= 2 * self.fundamental_freq:
+            raise ValueError(f'An output rate of {self.output_rate:g} Hz cannot represent the '
+                             f'{self.fundamental_freq} Hz fundamental, use at least {4 * self.fundamental_freq} Hz')
+        self.downsample_factor = sampling_rate / self.output_rate
+        
+        if fidelity == 'slice':
+            if self.downsample_factor != int(self.downsample_factor):
+                raise ValueError("'slice' fidelity needs an output rate that divides the sampling rate")
+            self.downsample_factor = int(self.downsample_factor)
+            self.time_vector = kept_time_vector(self.sampling_rate, self.duration_seconds, self.downsample_factor)
+            # Sliced waveforms have always been labelled with the simulation rate, as the server assumes
+            self.waveform_rate = self.sampling_rate
+        else:
+            self.time_vector = np.arange(int(round(duration_seconds * self.output_rate))) / self.output_rate
+            self.waveform_rate = self.output_rate
+        if fidelity == 'decimate':
+            self.synthesis_time_vector = np.arange(int(round(duration_seconds * sampling_rate))) / sampling_rate
+        
+        # Proportions and parameter distributions; None keeps the balanced defaults
+        self.scenario = ScenarioSpec.from_dict(scenario) if isinstance(scenario, dict) else scenario
+        
+        # Every random stream is derived from one master seed so runs are reproducible
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.reference_time = reference_time or datetime.now()
+        self.rng = np.random.default_rng(self._seed_sequence(SAMPLE_STREAM))
+        self.feeders = self._generate_feeder_list(np.random.default_rng(self._seed_sequence(FEEDER_STREAM)))
+        self.feeder_table = pd.DataFrame(self.feeders)
+        
+        self.feeder_probabilities = self.scenario.feeder_probabilities(self.feeders) if self.scenario else None
+        
+        # Stage timings and counters of this run, written out as the run report
+        self.metrics = metrics or RunMetrics()
+        
+    def _seed_sequence(self, *spawn_key):
+        """Child seed sequence of the master seed for one independent stream"""
+        return np.random.SeedSequence(self.seed, spawn_key=spawn_key)
+    
+    def shard_rng(self, shard_index):
+        """Random generator for one shard, independent of how shards are scheduled"""
+        return np.random.default_rng(self._seed_sequence(SHARD_STREAM, shard_index))
+    
+    def options(self):
+        """Constructor arguments that fix the waveform layout, e.g. for worker processes"""
+        return {
+            'fidelity': self.fidelity,
+            'sampling_rate': self.sampling_rate,
+            'duration_seconds': self.duration_seconds,
+            'output_rate': self.output_rate,
+            'scenario': self.scenario.to_dict() if self.scenario else None,
+        }
+    
+    def _generate_feeder_list(self, rng):
         """Generate Kerala KSEBL feeders based on actual districts"""
-        districts = [
-            'Trivandrum', 'Kollam', 'Pathanamthitta', 'Alappuzha', 
-            'Kottayam', 'Idukki', 'Ernakulam', 'Thrissur', 'Palakkad',
-            'Malappuram', 'Kozhikode', 'Wayanad', 'Kannur', 'Kasaragod'
-        ]
-        
-        feeders = []
-        for district in districts:
-            # Generate 25 feeders per district (350 total)
-            for i in range(1, 26):
-                feeders.append({
-                    'id': f'{district[:3].upper()}-F{i:03d}',
-                    'name': f'{district} Feeder {i}',
-                    'district': district,
-                    'voltage': 11000,  # 11 kV
-                    'length_km': round(random.uniform(2, 15), 2),
-                    'area_type': random.choice(['urban', 'rural', 'semi-urban']),
-                    'typical_load_kw': round(random.uniform(50, 500), 2),
-                    'num_consumers': random.randint(20, 200),
-                })
-        return feeders
-    
-    def generate_dataset(self, num_samples=10000):
+        return generate_feeder_list(rng)
+    
+    def generate_dataset(self, num_samples=10000, shard_size=DEFAULT_SHARD_SIZE):
         """Generate balanced dataset with all fault types"""
-        samples_per_class = num_samples // 4
+        shards = self.plan_shards(num_samples, shard_size)
         
         all_data = []
         
         print(f"Generating {num_samples} samples...")
-        print(f"Samples per class: {samples_per_class}")
-        
-        # Generate each class
-        for class_name, generator_func in [
-            ('NORMAL', self._generate_normal),
-            ('LINE_BREAK', self._generate_line_break),
-            ('SHORT_CIRCUIT', self._generate_short_circuit),
-            ('OVERLOAD', self._generate_overload)
-        ]:
-            print(f"\nGenerating {samples_per_class} {class_name} samples...")
-            for i in range(samples_per_class):
-                sample = generator_func()
-                sample['label'] = class_name
-                sample['sample_id'] = len(all_data) + 1
-                all_data.append(sample)
-                
-                if (i + 1) % 100 == 0:
-                    print(f"  Progress: {i+1}/{samples_per_class}")
+        print(f"Samples per class: {dict(self.class_counts(num_samples))}")
+        
+        for shard in shards:
+            with self.metrics.stage('synthesis') as stage:
+                samples = self.generate_shard(shard)
+                stage.add(len(samples))
+            all_data.extend(samples)
+            print(f"  Progress: {len(all_data)}/{num_samples} ({stage.samples / stage.seconds:.0f} samples/s)")
         
         return all_data
     
-    def _generate_normal(self):
-        """Generate normal operation waveform"""
-        feeder = random.choice(self.feeders)
-        base_current = random.uniform(30, 60)
-        base_voltage = 230
-        
-        # Generate time vector (4 seconds)
-        t = np.linspace(0, 4, 4 * self.sampling_rate)
-        
-        # 3-phase currents with realistic variations
-        load_var = np.random.normal(1.0, 0.05, len(t))
-        
-        # Add some load variation over time
-        load_trend = 1 + 0.1 * np.sin(2 * np.pi * 0.1 * t)  # Slow load variation
-        
-        current_r = base_current * load_var * load_trend * np.sin(2*np.pi*self.fundamental_freq*t)
-        current_y = base_current * load_var * load_trend * np.sin(2*np.pi*self.fundamental_freq*t - 2*np.pi/3)
-        current_b = base_current * load_var * load_trend * np.sin(2*np.pi*self.fundamental_freq*t + 2*np.pi/3)
-        
-        # Add harmonics (typical for electrical loads)
-        for h in [3, 5, 7, 9]:
-            harm_amp = base_current * 0.03 / h
-            current_r += harm_amp * np.sin(2*np.pi*self.fundamental_freq*h*t)
-            current_y += harm_amp * np.sin(2*np.pi*self.fundamental_freq*h*t - 2*np.pi/3)
-            current_b += harm_amp * np.sin(2*np.pi*self.fundamental_freq*h*t + 2*np.pi/3)
-        
-        # Add noise
-        noise_level = 0.02
-        current_r += np.random.normal(0, noise_level * base_current, len(t))
-        current_y += np.random.normal(0, noise_level * base_current, len(t))
-        current_b += np.random.normal(0, noise_level * base_current, len(t))
-        
-        # Voltages (more stable than currents)
-        voltage_r = base_voltage * np.sin(2*np.pi*self.fundamental_freq*t)
-        voltage_y = base_voltage * np.sin(2*np.pi*self.fundamental_freq*t - 2*np.pi/3)
-        voltage_b = base_voltage * np.sin(2*np.pi*self.fundamental_freq*t + 2*np.pi/3)
-        
-        # Add small voltage variations
-        voltage_var = np.random.normal(1.0, 0.02, len(t))
-        voltage_r *= voltage_var
-        voltage_y *= voltage_var
-        voltage_b *= voltage_var
-        
-        # Downsample for storage (every 100th sample)
-        downsample_factor = 100
+    def class_counts(self, num_samples):
+        """Samples of each class: the scenario's proportions, else num_samples // 4 each"""
+        if self.scenario:
+            return self.scenario.class_counts(num_samples)
+        return [(class_name, num_samples // 4) for class_name in FAULT_CLASSES]
+    
+    def plan_shards(self, num_samples, shard_size=DEFAULT_SHARD_SIZE):
+        """Split the class-ordered sample sequence into fixed-size shards"""
+        class_counts = self.class_counts(num_samples)
+        total = sum(count for _, count in class_counts)
+        
+        shards = []
+        for first in range(0, total, shard_size):
+            last = min(first + shard_size, total)
+            segments = []
+            offset = 0
+            for class_name, count in class_counts:
+                lo, hi = max(first, offset), min(last, offset + count)
+                if lo < hi:
+                    segments.append((class_name, hi - lo))
+                offset += count
+            shards.append({
+                'index': len(shards),
+                'first_sample_id': first + 1,
+                'segments': segments,
+            })
+        return shards
+    
+    def generate_shard(self, shard, batch_size=1000):
+        """Generate the samples of one shard with its own random generator"""
+        rng = self.shard_rng(shard['index'])
+        samples = []
+        for class_name, count in shard['segments']:
+            done = 0
+            while done < count:
+                n = min(batch_size, count - done)
+                for sample in self._batch_to_samples(self.generate_batch(class_name, n, rng)):
+                    sample['sample_id'] = shard['first_sample_id'] + len(samples)
+                    samples.append(sample)
+                done += n
+        return samples
+    
+    def generate_shard_arrays(self, shard, batch_size=1000):
+        """Generate one shard as an (N, 6, T) waveform array and a metadata table"""
+        rng = self.shard_rng(shard['index'])
+        waveforms = []
+        metadata = []
+        for class_name, count in shard['segments']:
+            done = 0
+            while done < count:
+                n = min(batch_size, count - done)
+                batch = self.generate_batch(class_name, n, rng)
+                waveforms.append(batch['waveforms'])
+                metadata.append(self._batch_metadata(batch))
+                done += n
+        
+        metadata = pd.concat(metadata, ignore_index=True)
+        metadata['sample_id'] = shard['first_sample_id'] + np.arange(len(metadata))
+        return np.concatenate(waveforms), metadata
+    
+    def generate_dataset_streaming(self, num_samples=10000, name='kerala_grid_dataset',
+                                   features_filename='kerala_grid_features.csv',
+                                   shard_size=DEFAULT_SHARD_SIZE, workers=1, feature_set='basic',
+                                   cache_dir=None, prune_cache=False):
+        """
+        Generate, extract features and write one shard at a time
+        Peak memory is bounded by the shard size, not by num_samples
+        """
+        shards = self.plan_shards(num_samples, shard_size)
+        output_dir = os.path.join('data', name)
+        features_path = os.path.join('data', features_filename)
+        os.makedirs(output_dir, exist_ok=True)
+        
+        print(f"Generating {num_samples} samples in {len(shards)} shards (seed {self.seed})...")
+        
+        metrics = self.metrics
+        profiling = (metrics.profile_stage, metrics.profile_dir) if metrics.profiler == 'cprofile' else (None, None)
+        jobs = [(self.seed, self.reference_time, self.options(), shard, output_dir, feature_set, profiling)
+                for shard in shards]
+        
+        # Every worker looks rows up in its own copy of the cache and hands back what it added
+        cache = open_feature_cache(cache_dir, feature_set, self.waveform_rate) if cache_dir else None
+        cache_args = (cache_dir, feature_set, self.waveform_rate)
+        
+        chunks = []
+        start = time.perf_counter()
+        summary = {'num_samples': 0, 'num_features': 0, 'class_counts': {}, 'districts': set(), 'feeders': set()}
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker, initargs=cache_args)
+        else:
+            _init_shard_worker(*cache_args)
+            pool = nullcontext()
+        with pool:
+            results = pool.map(_generate_shard_worker, jobs) if workers > 1 else map(_generate_shard_worker, jobs)
+            # Results arrive in shard order, so the output is worker-count independent
+            with open(features_path, 'w', newline='') as f:
+                for i, (chunk, shard_features, shard_stages, journal) in enumerate(results):
+                    chunks.append(chunk)
+                    metrics.merge_stages(shard_stages)
+                    if cache is not None:
+                        cache.merge(journal)
+                    with metrics.stage('write_features', len(shard_features)):
+                        shard_features.to_csv(f, header=(i == 0), index=False)
+                    
+                    summary['num_samples'] += len(shard_features)
+                    summary['num_features'] = shard_features.shape[1]
+                    for label, count in shard_features['label'].value_counts(sort=False).items():
+                        summary['class_counts'][label] = summary['class_counts'].get(label, 0) + int(count)
+                    summary['districts'].update(shard_features['district'])
+                    summary['feeders'].update(shard_features['feeder_id'])
+                    print(f"  Progress: {i+1}/{len(shards)} shards "
+                          f"({summary['num_samples'] / (time.perf_counter() - start):.0f} samples/s)")
+        
+        self._write_manifest(output_dir, chunks)
+        
+        print(f"\n✅ Dataset saved to: {output_dir}")
+        print(f"✅ Features CSV saved to: {features_path}")
+        if cache is not None:
+            self._save_feature_cache(cache, prune_cache)
+        
+        return summary
+    
+    def _write_manifest(self, output_path, chunks):
+        """Write the store manifest with this generator's settings"""
+        write_manifest(
+            output_path, chunks, self.waveform_rate, self.duration_seconds,
+            fidelity=self.fidelity,
+            synthesis_rate=self.sampling_rate,
+            output_rate=self.output_rate,
+            downsample_factor=self.downsample_factor,
+            scenario=self.scenario.to_dict() if self.scenario else None,
+            seed=self.seed,
+            reference_time=self.reference_time.isoformat(),
+        )
+    
+    def generate_batch(self, class_name, n, rng=None):
+        """Generate N samples of one class as an (N, 6, T) waveform array plus per-sample columns"""
+        rng = rng or self.rng
+        # Parameters the scenario sets, including oversampled hard cases; the rest use defaults
+        values = self.scenario.draw(class_name, n, rng) if self.scenario else {}
+        if self.fidelity == 'decimate':
+            waveforms, params = self._synthesize_decimated(class_name, n, rng, values)
+        elif self.fidelity == 'direct':
+            waveforms = synthesize_normal(n, self.time_vector, rng, self.fundamental_freq,
+                                          base_current=values.get('base_current'),
+                                          max_frequency=self.output_rate / 2)
+            params = self._inject(class_name, waveforms, rng, self.output_rate, values)
+        else:
+            # Transients keep the simulation-rate constants the sliced datasets were made with
+            waveforms = synthesize_normal(n, self.time_vector, rng, self.fundamental_freq,
+                                          base_current=values.get('base_current'))
+            params = self._inject(class_name, waveforms, rng, self.sampling_rate, values)
+        
+        if self.feeder_probabilities is None:
+            feeder_index = rng.integers(len(self.feeders), size=n)
+        else:
+            feeder_index = rng.choice(len(self.feeders), size=n, p=self.feeder_probabilities)
         
         return {
-            'feeder_id': feeder['id'],
-            'feeder_name': feeder['name'],
-            'district': feeder['district'],
-            'timestamp': (datetime.now() - timedelta(days=random.randint(0, 365))).isoformat(),
-            'current_r': current_r[::downsample_factor].tolist(),
-            'current_y': current_y[::downsample_factor].tolist(),
-            'current_b': current_b[::downsample_factor].tolist(),
-            'voltage_r': voltage_r[::downsample_factor].tolist(),
-            'voltage_y': voltage_y[::downsample_factor].tolist(),
-            'voltage_b': voltage_b[::downsample_factor].tolist(),
-            'sampling_rate': self.sampling_rate,
-            'duration_seconds': 4.0,
-            'area_type': feeder['area_type'],
-            'typical_load_kw': feeder['typical_load_kw'],
+            'label': class_name,
+            'waveforms': waveforms,
+            'feeder_index': feeder_index,
+            'days_ago': rng.integers(0, 365, size=n, endpoint=True),
+            'params': params,
         }
     
+    def _inject(self, class_name, waveforms, rng, sampling_rate, values=None):
+        """Apply the fault of a class in place; returns its per-sample parameters"""
+        if class_name == 'NORMAL':
+            return {}
+        if class_name == 'OVERLOAD':
+            return FAULT_INJECTORS[class_name](waveforms, rng, sampling_rate, self.fundamental_freq,
+                                              self.duration_seconds, values=values)
+        return FAULT_INJECTORS[class_name](waveforms, rng, sampling_rate, values=values)
+    
+    def _synthesize_decimated(self, class_name, n, rng, values):
+        """Synthesize and inject at the full rate in small batches, then anti-alias and downsample"""
+        waveforms = []
+        params = []
+        for start in range(0, n, DECIMATE_BATCH_SIZE):
+            part = {name: v[start:start + DECIMATE_BATCH_SIZE] for name, v in values.items()}
+            full = synthesize_normal(min(DECIMATE_BATCH_SIZE, n - start), self.synthesis_time_vector, rng,
+                                     self.fundamental_freq, base_current=part.get('base_current'))
+            params.append(self._inject(class_name, full, rng, self.sampling_rate, part))
+            waveforms.append(decimate(full, self.sampling_rate, self.output_rate))
+        params = {key: np.concatenate([p[key] for p in params]) for key in params[0]}
+        return np.concatenate(waveforms), params
+    
+    def _batch_metadata(self, batch):
+        """Per-sample metadata table of a waveform batch"""
+        n = len(batch['waveforms'])
+        feeders = self.feeder_table.iloc[batch['feeder_index']].reset_index(drop=True)
+        timestamps = np.datetime64(self.reference_time, 'us') - batch['days_ago'].astype('timedelta64[D]')
+        
+        metadata = pd.DataFrame({
+            'sample_id': np.zeros(n, dtype=int),
+            'label': batch['label'],
+            'feeder_id': feeders['id'],
+            'feeder_name': feeders['name'],
+            'district': feeders['district'],
+            'area_type': feeders['area_type'],
+            'typical_load_kw': feeders['typical_load_kw'],
+            # Same text as datetime.isoformat() of the per-sample path, which drops zero microseconds
+            'timestamp': np.datetime_as_string(timestamps, unit='us' if self.reference_time.microsecond else 's'),
+        })
+        for column in PARAM_COLUMNS:
+            metadata[column] = batch['params'].get(column, np.full(n, np.nan))
+        return metadata
+    
+    def _batch_to_samples(self, batch):
+        """Expand a waveform batch into per-sample dicts"""
+        now = self.reference_time
+        samples = []
+        for i, waveform in enumerate(batch['waveforms']):
+            feeder = self.feeders[batch['feeder_index'][i]]
+            sample = {
+                'feeder_id': feeder['id'],
+                'feeder_name': feeder['name'],
+                'district': feeder['district'],
+                'timestamp': (now - timedelta(days=int(batch['days_ago'][i]))).isoformat(),
+            }
+            for channel, values in zip(CHANNELS, waveform):
+                sample[channel] = values.tolist()
+            sample.update({
+                'sampling_rate': self.waveform_rate,
+                'duration_seconds': self.duration_seconds,
+                'area_type': feeder['area_type'],
+                'typical_load_kw': feeder['typical_load_kw'],
+                'label': batch['label'],
+            })
+            if batch['label'] != 'NORMAL':
+                sample['fault_type'] = batch['label']
+                for key, values in batch['params'].items():
+                    sample[key] = float(values[i])
+            samples.append(sample)
+        return samples
+    
+    def _generate_normal(self):
+        """Generate normal operation waveform"""
+        return self._batch_to_samples(self.generate_batch('NORMAL', 1))[0]
+    
     def _generate_line_break(self):
         """Generate line break fault waveform"""
-        sample = self._generate_normal()
-        
-        # Inject line break at random point (after 25% of signal)
-        break_point = random.randint(len(sample['current_r']) // 4, 3 * len(sample['current_r']) // 4)
-        drop_factor = random.uniform(0.1, 0.4)  # 10-40% current drop
-        
-        # Simulate line break by reducing current
-        for phase in ['current_r', 'current_y', 'current_b']:
-            sample[phase][break_point:] = [x * drop_factor for x in sample[phase][break_point:]]
-        
-        # Voltage also drops but less dramatically
-        voltage_drop = random.uniform(0.7, 0.9)
-        for phase in ['voltage_r', 'voltage_y', 'voltage_b']:
-            sample[phase][break_point:] = [x * voltage_drop for x in sample[phase][break_point:]]
-        
-        # Add some transient effects
-        transient_duration = min(50, len(sample['current_r']) - break_point)
-        for i in range(transient_duration):
-            if break_point + i < len(sample['current_r']):
-                # Add oscillatory transient
-                transient_factor = 1 + 0.3 * np.exp(-i/10) * np.sin(2*np.pi*100*i/self.sampling_rate)
-                sample['current_r'][break_point + i] *= transient_factor
-                sample['current_y'][break_point + i] *= transient_factor
-                sample['current_b'][break_point + i] *= transient_factor
-        
-        sample['break_location_km'] = round(random.uniform(0.5, sample.get('feeder_length_km', 10)), 2)
-        sample['fault_type'] = 'LINE_BREAK'
-        
-        return sample
+        return self._batch_to_samples(self.generate_batch('LINE_BREAK', 1))[0]
     
     def _generate_short_circuit(self):
         """Generate short circuit fault waveform"""
-        sample = self._generate_normal()
-        fault_point = random.randint(len(sample['current_r']) // 4, 3 * len(sample['current_r']) // 4)
-        
-        # Short circuit causes massive current increase
-        current_multiplier = random.uniform(5, 15)
-        
-        for phase in ['current_r', 'current_y', 'current_b']:
-            sample[phase][fault_point:] = [x * current_multiplier for x in sample[phase][fault_point:]]
-        
-        # Voltage collapses during short circuit
-        voltage_drop = random.uniform(0.05, 0.2)
-        for phase in ['voltage_r', 'voltage_y', 'voltage_b']:
-            sample[phase][fault_point:] = [x * voltage_drop for x in sample[phase][fault_point:]]
-        
-        # Add high-frequency transients
-        for i in range(min(100, len(sample['current_r']) - fault_point)):
-            if fault_point + i < len(sample['current_r']):
-                # High-frequency oscillation
-                hf_factor = 1 + 0.5 * np.sin(2*np.pi*1000*i/self.sampling_rate)
-                sample['current_r'][fault_point + i] *= hf_factor
-                sample['current_y'][fault_point + i] *= hf_factor
-                sample['current_b'][fault_point + i] *= hf_factor
-        
-        sample['fault_type'] = 'SHORT_CIRCUIT'
-        sample['fault_location_km'] = round(random.uniform(0.5, sample.get('feeder_length_km', 10)), 2)
-        
-        return sample
+        return self._batch_to_samples(self.generate_batch('SHORT_CIRCUIT', 1))[0]
     
     def _generate_overload(self):
         """Generate overload condition waveform"""
-        sample = self._generate_normal()
-        overload_start = len(sample['current_r']) // 4
-        
-        # Gradual increase in current over time
-        for i in range(overload_start, len(sample['current_r'])):
-            # Gradual increase with some fluctuation
-            overload_factor = 1.0 + (i - overload_start) / (len(sample['current_r']) - overload_start) * 0.8
-            overload_factor += 0.1 * np.sin(2*np.pi*0.5*i/self.sampling_rate)  # Slow fluctuation
-            
-            sample['current_r'][i] *= overload_factor
-            sample['current_y'][i] *= overload_factor
-            sample['current_b'][i] *= overload_factor
-        
-        # Voltage drops slightly due to increased load
-        voltage_drop = random.uniform(0.85, 0.95)
-        for phase in ['voltage_r', 'voltage_y', 'voltage_b']:
-            sample[phase][overload_start:] = [x * voltage_drop for x in sample[phase][overload_start:]]
-        
-        # Add more harmonics due to non-linear loads
-        t = np.linspace(0, 4, len(sample['current_r']))
-        for h in [3, 5, 7, 9, 11]:
-            harm_amp = 0.1 * np.sin(2*np.pi*self.fundamental_freq*h*t)
-            for i in range(overload_start, len(sample['current_r'])):
-                sample['current_r'][i] += harm_amp[i]
-                sample['current_y'][i] += harm_amp[i]
-                sample['current_b'][i] += harm_amp[i]
-        
-        sample['fault_type'] = 'OVERLOAD'
-        sample['overload_percentage'] = round(random.uniform(20, 80), 1)
-        
-        return sample
-    
-    def save_dataset(self, dataset, filename='kerala_grid_dataset.json'):
-        """Save dataset to JSON file"""
-        output_path = os.path.join('data', filename)
-        os.makedirs('data', exist_ok=True)
+        return self._batch_to_samples(self.generate_batch('OVERLOAD', 1))[0]
+    
+    def save_dataset(self, dataset, name='kerala_grid_dataset', chunk_size=DEFAULT_SHARD_SIZE):
+        """Save dataset as a chunked float32 waveform store"""
+        output_path = os.path.join('data', name)
         
-        with open(output_path, 'w') as f:
-            json.dump(dataset, f, indent=2)
+        chunks = []
+        with self.metrics.stage('save_dataset', len(dataset)):
+            for first in range(0, len(dataset), chunk_size):
+                waveforms, metadata = samples_to_arrays(dataset[first:first + chunk_size])
+                chunks.append(write_chunk(output_path, len(chunks), waveforms, metadata))
+            self._write_manifest(output_path, chunks)
         
         print(f"\n✅ Dataset saved to: {output_path}")
         print(f"Total samples: {len(dataset)}")
@@ -257,96 +410,112 @@ class KeralaGridDataGenerator:
         for class_name, count in class_counts.items():
             print(f"  {class_name}: {count} samples")
     
-    def generate_features_csv(self, dataset, filename='kerala_grid_features.csv'):
+    def generate_features_csv(self, dataset, filename='kerala_grid_features.csv', feature_set='basic',
+                              cache_dir=None, prune_cache=False):
         """Generate CSV file with extracted features for ML training"""
         print("\nGenerating features CSV...")
         
-        features_list = []
-        
-        for i, sample in enumerate(dataset):
-            if i % 100 == 0:
-                print(f"  Processing sample {i+1}/{len(dataset)}")
-            
-            # Extract basic features
-            features = {
-                'sample_id': sample['sample_id'],
-                'label': sample['label'],
-                'feeder_id': sample['feeder_id'],
-                'district': sample['district'],
-                'area_type': sample['area_type'],
-                'typical_load_kw': sample['typical_load_kw'],
-            }
-            
-            # Calculate RMS values
-            features['current_rms_r'] = np.sqrt(np.mean(np.square(sample['current_r'])))
-            features['current_rms_y'] = np.sqrt(np.mean(np.square(sample['current_y'])))
-            features['current_rms_b'] = np.sqrt(np.mean(np.square(sample['current_b'])))
-            features['voltage_rms_r'] = np.sqrt(np.mean(np.square(sample['voltage_r'])))
-            features['voltage_rms_y'] = np.sqrt(np.mean(np.square(sample['voltage_y'])))
-            features['voltage_rms_b'] = np.sqrt(np.mean(np.square(sample['voltage_b'])))
-            
-            # Calculate peak values
-            features['current_peak_r'] = np.max(np.abs(sample['current_r']))
-            features['current_peak_y'] = np.max(np.abs(sample['current_y']))
-            features['current_peak_b'] = np.max(np.abs(sample['current_b']))
-            features['voltage_peak_r'] = np.max(np.abs(sample['voltage_r']))
-            features['voltage_peak_y'] = np.max(np.abs(sample['voltage_y']))
-            features['voltage_peak_b'] = np.max(np.abs(sample['voltage_b']))
-            
-            # Calculate current unbalance
-            current_rms = [features['current_rms_r'], features['current_rms_y'], features['current_rms_b']]
-            features['current_unbalance'] = (np.max(current_rms) - np.min(current_rms)) / np.max(current_rms) * 100
-            
-            # Calculate voltage unbalance
-            voltage_rms = [features['voltage_rms_r'], features['voltage_rms_y'], features['voltage_rms_b']]
-            features['voltage_unbalance'] = (np.max(voltage_rms) - np.min(voltage_rms)) / np.max(voltage_rms) * 100
-            
-            # Calculate current drop ratio (first 10% vs last 10%)
-            first_10_percent = int(len(sample['current_r']) * 0.1)
-            last_10_percent = int(len(sample['current_r']) * 0.9)
-            
-            initial_current = np.sqrt(np.mean(np.square(sample['current_r'][:first_10_percent])))
-            final_current = np.sqrt(np.mean(np.square(sample['current_r'][last_10_percent:])))
-            
-            features['current_drop_ratio'] = (initial_current - final_current) / initial_current if initial_current > 0 else 0
-            
-            # Calculate voltage drop ratio
-            initial_voltage = np.sqrt(np.mean(np.square(sample['voltage_r'][:first_10_percent])))
-            final_voltage = np.sqrt(np.mean(np.square(sample['voltage_r'][last_10_percent:])))
-            
-            features['voltage_drop_ratio'] = (initial_voltage - final_voltage) / initial_voltage if initial_voltage > 0 else 0
-            
-            features_list.append(features)
+        # A store carries the rate it was generated with, whatever this generator's settings
+        rate = dataset.manifest['sampling_rate'] if isinstance(dataset, WaveformStore) else self.waveform_rate
+        # Reuse feature rows of waveforms seen in earlier runs
+        cache = open_feature_cache(cache_dir, feature_set, rate) if cache_dir else None
+        
+        with self.metrics.stage('features') as stage:
+            df = extract_features(dataset, feature_set, rate, cache)
+            stage.add(len(df))
         
         # Save to CSV
-        df = pd.DataFrame(features_list)
         output_path = os.path.join('data', filename)
-        df.to_csv(output_path, index=False)
+        with self.metrics.stage('write_features', len(df)):
+            df.to_csv(output_path, index=False)
         
         print(f"✅ Features CSV saved to: {output_path}")
         print(f"Features shape: {df.shape}")
         
+        if cache is not None:
+            self._save_feature_cache(cache, prune_cache)
+        
         return df
+    
+    def _save_feature_cache(self, cache, prune=False):
+        """Persist the feature cache and count its hits"""
+        evicted = cache.save(prune)
+        self.metrics.count('feature_cache_hits', cache.hits)
+        self.metrics.count('feature_cache_misses', cache.misses)
+        self.metrics.count('feature_cache_evicted', evicted)
+        print(f"Feature cache: {cache.hits} reused, {cache.misses} computed, {evicted} evicted")
 
-def main():
-    """Main function to generate dataset"""
-    print("🚀 Kerala Grid Data Generator")
-    print("=" * 50)
+
+# Feature cache copy of a shard worker process, opened once by _init_shard_worker
+_shard_cache = None
+
+
+def _init_shard_worker(cache_dir, feature_set, sampling_rate):
+    global _shard_cache
+    _shard_cache = open_feature_cache(cache_dir, feature_set, sampling_rate) if cache_dir else None
+
+
+def _generate_shard_worker(job):
+    """Process pool entry point: generate one shard and write it to disk"""
+    seed, reference_time, options, shard, output_dir, feature_set, (profile_stage, profile_dir) = job
+    metrics = RunMetrics(profile_stage=profile_stage, profile_dir=profile_dir)
+    generator = KeralaGridDataGenerator(seed=seed, reference_time=reference_time, metrics=metrics, **options)
+    with metrics.stage('synthesis') as stage:
+        waveforms, metadata = generator.generate_shard_arrays(shard)
+        stage.add(len(metadata))
     
-    # Create data directory
-    os.makedirs('data', exist_ok=True)
+    with metrics.stage('save_dataset', len(metadata)):
+        chunk = write_chunk(output_dir, shard['index'], waveforms, metadata)
     
-    # Initialize generator
-    generator = KeralaGridDataGenerator()
+    with metrics.stage('features', len(metadata)):
+        features = features_frame(waveforms, metadata, feature_set, generator.waveform_rate, _shard_cache)
+    
+    # Only the chunk entry, the small feature rows, the stage timings and the cache journal leave the worker
+    journal = _shard_cache.journal() if _shard_cache is not None else None
+    return chunk, features, metrics.stage_dicts(), journal
+
+def run_pipeline(generator, args, store_path, cache_dir):
+    """Generate the dataset and features as selected on the command line"""
+    if args.features_only:
+        if not WaveformStore.exists(store_path):
+            print(f"Waveform store not found at {store_path}. Run without --features-only first.")
+            return
+        generator.generate_features_csv(
+            WaveformStore(store_path), 'kerala_grid_features_10k.csv', args.feature_set, cache_dir,
+            args.prune_feature_cache,
+        )
+        return
+    
+    if args.stream or args.workers > 1:
+        summary = generator.generate_dataset_streaming(
+            args.num_samples, 'kerala_grid_dataset_10k', 'kerala_grid_features_10k.csv',
+            shard_size=args.shard_size, workers=args.workers, feature_set=args.feature_set,
+            cache_dir=cache_dir, prune_cache=args.prune_feature_cache,
+        )
+        
+        print("\n🎉 Dataset generation complete!")
+        print(f"Generated {summary['num_samples']} samples")
+        print(f"Features: {summary['num_features']} columns")
+        
+        print("\nClass distribution:")
+        for class_name, count in summary['class_counts'].items():
+            print(f"  {class_name}: {count} samples")
+        
+        print("\n📊 Dataset Statistics:")
+        print(f"Districts covered: {len(summary['districts'])}")
+        print(f"Feeders: {len(summary['feeders'])}")
+        return
     
     # Generate dataset
-    dataset = generator.generate_dataset(num_samples=10000)
+    dataset = generator.generate_dataset(num_samples=args.num_samples, shard_size=args.shard_size)
     
     # Save dataset
-    generator.save_dataset(dataset, 'kerala_grid_dataset_10k.json')
+    generator.save_dataset(dataset, 'kerala_grid_dataset_10k', chunk_size=args.shard_size)
     
     # Generate features CSV for ML training
-    features_df = generator.generate_features_csv(dataset, 'kerala_grid_features_10k.csv')
+    features_df = generator.generate_features_csv(
+        dataset, 'kerala_grid_features_10k.csv', args.feature_set, cache_dir, args.prune_feature_cache
+    )
     
     print("\n🎉 Dataset generation complete!")
     print(f"Generated {len(dataset)} samples")
@@ -358,5 +527,90 @@ def main():
     print(f"Feeders: {len(set(sample['feeder_id'] for sample in dataset))}")
     print(f"Area types: {set(sample['area_type'] for sample in dataset)}")
 
+def main():
+    """Main function to generate dataset"""
+    parser = argparse.ArgumentParser(description='Generate Kerala grid waveform dataset')
+    parser.add_argument('--num-samples', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None, help='Master seed (random if omitted)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Generate, extract features and write shard by shard with bounded memory')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for streaming generation')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE)
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default='basic',
+                        help="'full' adds the THD, sequence, power and statistical features of the server")
+    parser.add_argument('--features-only', action='store_true',
+                        help='Rebuild the features CSV from the existing waveform store without regenerating')
+    parser.add_argument('--feature-cache', default=os.path.join('data', 'feature_cache'),
+                        help="Feature cache directory, 'none' to disable")
+    parser.add_argument('--prune-feature-cache', action='store_true',
+                        help='Evict cached rows of waveforms this run did not look up')
+    parser.add_argument('--build-index', action='store_true',
+                        help='Also write the sorted, indexed waveform layout for fast queries by '
+                             'label, district, feeder and time')
+    parser.add_argument('--fidelity', choices=FIDELITY_MODES, default='slice',
+                        help="'direct' synthesizes at the output rate (cheap), 'decimate' at the sampling "
+                             "rate with anti-aliasing (slow, keeps transients); 'slice' matches earlier datasets")
+    parser.add_argument('--sampling-rate', type=int, default=10000, help='Simulation rate in Hz')
+    parser.add_argument('--output-rate', type=int, default=None,
+                        help='Rate of the stored waveforms in Hz (default: sampling rate / 100 when slicing, '
+                             f'{DEFAULT_OUTPUT_RATE} Hz otherwise)')
+    parser.add_argument('--duration', type=float, default=4.0, help='Seconds per sample')
+    parser.add_argument('--scenario', default=None,
+                        help='JSON scenario spec with class and district proportions, parameter '
+                             'distributions and hard-case oversampling (default: balanced classes)')
+    parser.add_argument('--profile-stage', default=None,
+                        help='Profile one stage: synthesis, save_dataset, features, write_features or pipeline')
+    parser.add_argument('--profiler', choices=PROFILERS, default='cprofile',
+                        help='py-spy samples the whole process tree and must be on PATH')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Record the Python allocation peak of every stage (slower)')
+    args = parser.parse_args()
+    cache_dir = None if args.feature_cache == 'none' else args.feature_cache
+    
+    print("🚀 Kerala Grid Data Generator")
+    print("=" * 50)
+    
+    # Create data directory
+    os.makedirs('data', exist_ok=True)
+    
+    # Initialize generator; the run report and any profiles go next to the dataset
+    store_path = os.path.join('data', 'kerala_grid_dataset_10k')
+    metrics = RunMetrics(args.profile_stage, args.profiler, store_path, args.trace_memory)
+    generator = KeralaGridDataGenerator(
+        seed=args.seed, metrics=metrics, fidelity=args.fidelity, sampling_rate=args.sampling_rate,
+        duration_seconds=args.duration, output_rate=args.output_rate,
+        scenario=ScenarioSpec.from_file(args.scenario) if args.scenario else None,
+    )
+    print(f"Master seed: {generator.seed}")
+    if generator.scenario:
+        print(f"Scenario: {generator.scenario.name} ({args.scenario})")
+    print(f"Fidelity: {generator.fidelity}, {generator.sampling_rate} Hz simulated, "
+          f"{generator.output_rate:g} Hz stored, {generator.duration_seconds} s per sample")
+    metrics.info.update({
+        'seed': generator.seed,
+        'num_samples': args.num_samples,
+        'shard_size': args.shard_size,
+        'workers': args.workers,
+        'mode': 'features-only' if args.features_only else 'streaming' if args.stream or args.workers > 1 else 'serial',
+        'feature_set': args.feature_set,
+        **generator.options(),
+    })
+    
+    with metrics.stage('pipeline'):
+        run_pipeline(generator, args, store_path, cache_dir)
+        
+        if args.build_index and WaveformStore.exists(store_path):
+            with metrics.stage('build_index') as stage:
+                stage.add(build_index(store_path)['num_samples'])
+            print(f"✅ Index built for {store_path}")
+    
+    if os.path.isdir(store_path):
+        report_path = os.path.join(store_path, 'run_report.json')
+        report = metrics.save(report_path)
+        print(f"\n✅ Run report saved to: {report_path}")
+        for name, stage in report['stages'].items():
+            rate = f", {stage['samples_per_second']:.0f} samples/s" if stage['samples_per_second'] else ''
+            print(f"  {name}: {stage['seconds']:.2f}s{rate}")
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Waveform Feature Extraction
+Computes ML features over stacked (N, 6, T) waveform arrays
+The 'full' set mirrors ExtractedFeatures in server/services/featureExtractor.ts
+"""
+
+import numpy as np
+
+from feature_cache import FeatureCache, waveform_keys
+from grid_synthesis import CHANNELS
+
+ID_COLUMNS = ['sample_id', 'label', 'feeder_id', 'district', 'area_type', 'typical_load_kw']
+
+FEATURE_COLUMNS = [
+    'current_rms_r', 'current_rms_y', 'current_rms_b',
+    'voltage_rms_r', 'voltage_rms_y', 'voltage_rms_b',
+    'current_peak_r', 'current_peak_y', 'current_peak_b',
+    'voltage_peak_r', 'voltage_peak_y', 'voltage_peak_b',
+    'current_unbalance', 'voltage_unbalance',
+    'current_drop_ratio', 'voltage_drop_ratio',
+]
+
+# Same order as ExtractedFeatures / MLService.featuresToArray on the server
+FULL_FEATURE_COLUMNS = [
+    'current_rms_r', 'current_rms_y', 'current_rms_b',
+    'voltage_rms_r', 'voltage_rms_y', 'voltage_rms_b',
+    'current_peak_r', 'current_peak_y', 'current_peak_b',
+    'voltage_peak_r', 'voltage_peak_y', 'voltage_peak_b',
+    'thd_current_r', 'thd_current_y', 'thd_current_b',
+    'thd_voltage_r', 'thd_voltage_y', 'thd_voltage_b',
+    'positive_sequence_current', 'negative_sequence_current', 'zero_sequence_current',
+    'positive_sequence_voltage', 'negative_sequence_voltage', 'zero_sequence_voltage',
+    'active_power_r', 'active_power_y', 'active_power_b',
+    'reactive_power_r', 'reactive_power_y', 'reactive_power_b',
+    'fundamental_frequency', 'frequency_deviation',
+    'current_skewness', 'current_kurtosis', 'voltage_skewness', 'voltage_kurtosis',
+    'current_unbalance', 'voltage_unbalance',
+    'current_drop_ratio', 'voltage_drop_ratio',
+]
+
+FEATURE_SETS = {
+    'basic': FEATURE_COLUMNS,
+    'full': FULL_FEATURE_COLUMNS,
+}
+
+# Bump when a feature definition changes so cached feature rows are recomputed
+FEATURE_SET_VERSIONS = {
+    'basic': 2,
+    'full': 1,
+}
+
+
+def _rms(x):
+    return np.sqrt(np.mean(np.square(x), axis=-1))
+
+
+def _unbalance(rms):
+    """Max-min spread across the 3 phases as a percentage of the max"""
+    high = rms.max(axis=1)
+    low = rms.min(axis=1)
+    return np.divide((high - low) * 100, high, out=np.zeros_like(high), where=high > 0)
+
+
+def _drop_ratios(x, final_start):
+    """
+    Phase R current and voltage RMS over the first 10% of the capture against the RMS from
+    final_start on; 0 when the capture is too short to have a first 10%
+    """
+    edge = int(x.shape[-1] * 0.1)
+    if edge == 0:
+        return np.zeros(len(x)), np.zeros(len(x))
+    first = _rms(x[:, [0, 3], :edge])
+    last = _rms(x[:, [0, 3], final_start:])
+    ratio = np.divide(first - last, first, out=np.zeros_like(first), where=first > 0)
+    return ratio[:, 0], ratio[:, 1]
+
+
+def batch_features(waveforms):
+    """Compute every feature for an (N, 6, T) array; returns a dict of (N,) columns"""
+    x = np.asarray(waveforms, dtype=np.float64)
+    num_points = x.shape[-1]
+
+    rms = _rms(x)
+    peak = np.abs(x).max(axis=-1)
+
+    columns = {}
+    for i, channel in enumerate(CHANNELS):
+        quantity, phase = channel.split('_')
+        columns[f'{quantity}_rms_{phase}'] = rms[:, i]
+    for i, channel in enumerate(CHANNELS):
+        quantity, phase = channel.split('_')
+        columns[f'{quantity}_peak_{phase}'] = peak[:, i]
+    columns['current_unbalance'] = _unbalance(rms[:, :3])
+    columns['voltage_unbalance'] = _unbalance(rms[:, 3:])
+    # The last 10% starts at 90% of the capture, as the per-sample extraction cut it
+    columns['current_drop_ratio'], columns['voltage_drop_ratio'] = _drop_ratios(x, int(num_points * 0.9))
+    return columns
+
+
+def _standardized_moment(x, order):
+    """Population standardized moment along the last axis, 0 for constant signals"""
+    centered = x - x.mean(axis=-1, keepdims=True)
+    std = np.sqrt(np.mean(centered ** 2, axis=-1))
+    moment = np.mean(centered ** order, axis=-1)
+    return np.divide(moment, std ** order, out=np.zeros_like(std), where=std > 0)
+
+
+def full_batch_features(waveforms, sampling_rate=10000, fundamental_freq=50):
+    """
+    Compute the full ExtractedFeatures set for an (N, 6, T) array
+    One real FFT per channel per sample is shared by every spectral feature
+    """
+    x = np.asarray(waveforms, dtype=np.float64)
+    n, _, num_points = x.shape
+    columns = batch_features(x)
+    rms = _rms(x)
+
+    spectrum = np.abs(np.fft.rfft(x, axis=-1))
+
+    # THD as the server defines it: all non-DC bins of the two-sided spectrum over the
+    # fundamental bin. Each rfft bin stands for itself and its mirror, except Nyquist.
+    mirror_weight = np.full(spectrum.shape[-1], 2.0)
+    mirror_weight[0] = 0.0
+    if num_points % 2 == 0:
+        mirror_weight[-1] = 1.0
+    harmonics = spectrum @ mirror_weight
+    fundamental_bin = int(fundamental_freq * num_points / sampling_rate)
+    fundamental_bin = min(fundamental_bin, num_points - fundamental_bin)
+    fundamental = spectrum[..., fundamental_bin]
+    thd = np.divide(harmonics, fundamental, out=np.zeros_like(harmonics), where=fundamental > 0)
+    for i, channel in enumerate(CHANNELS):
+        quantity, phase = channel.split('_')
+        columns[f'thd_{quantity}_{phase}'] = thd[:, i]
+
+    # Symmetrical components (simplified RMS-based form used on the server)
+    for quantity, phases in [('current', rms[:, :3]), ('voltage', rms[:, 3:])]:
+        columns[f'positive_sequence_{quantity}'] = np.sqrt(np.mean(phases ** 2, axis=1))
+        columns[f'negative_sequence_{quantity}'] = np.abs(phases[:, 0] - phases[:, 1]) / 2
+        columns[f'zero_sequence_{quantity}'] = np.abs(phases.sum(axis=1)) / 3
+
+    # The server takes the last floor(10%) samples instead, which differs when 10% is fractional
+    columns['current_drop_ratio'], columns['voltage_drop_ratio'] = _drop_ratios(x, num_points - int(num_points * 0.1))
+
+    # Active and reactive power per phase
+    active = np.mean(x[:, :3] * x[:, 3:], axis=-1)
+    apparent = rms[:, :3] * rms[:, 3:]
+    reactive = np.sqrt(np.maximum(0, apparent ** 2 - active ** 2))
+    for i, phase in enumerate(['r', 'y', 'b']):
+        columns[f'active_power_{phase}'] = active[:, i]
+        columns[f'reactive_power_{phase}'] = reactive[:, i]
+
+    # Dominant frequency of phase R current below Nyquist
+    search = spectrum[:, 0, 1:(num_points + 1) // 2]
+    peak_bin = search.argmax(axis=1) + 1
+    peak_bin[search.max(axis=1) <= 0] = 0
+    columns['fundamental_frequency'] = peak_bin * sampling_rate / num_points
+    columns['frequency_deviation'] = np.abs(columns['fundamental_frequency'] - fundamental_freq)
+
+    # Statistics over the three phases joined end to end
+    currents = x[:, :3].reshape(n, -1)
+    voltages = x[:, 3:].reshape(n, -1)
+    columns['current_skewness'] = _standardized_moment(currents, 3)
+    columns['current_kurtosis'] = _standardized_moment(currents, 4) - 3
+    columns['voltage_skewness'] = _standardized_moment(voltages, 3)
+    columns['voltage_kurtosis'] = _standardized_moment(voltages, 4) - 3
+
+    return {name: columns[name] for name in FULL_FEATURE_COLUMNS}
+
+
+def _compute_features(waveforms, feature_set, sampling_rate):
+    if feature_set == 'full':
+        return full_batch_features(waveforms, sampling_rate)
+    return batch_features(waveforms)
+
+
+def open_feature_cache(cache_dir, feature_set, sampling_rate=10000):
+    """Feature cache for the current version of a feature set at a sampling rate"""
+    return FeatureCache(cache_dir, feature_set, FEATURE_SET_VERSIONS[feature_set], FEATURE_SETS[feature_set],
+                        sampling_rate)
+
+
+def features_frame(waveforms, metadata, feature_set='basic', sampling_rate=10000, cache=None):
+    """
+    Feature table for a batch: identifying metadata columns followed by the features
+    With a cache, only waveforms whose content hash is not cached are computed
+    """
+    import pandas as pd
+
+    frame = metadata[ID_COLUMNS].reset_index(drop=True)
+    if cache is None:
+        features = pd.DataFrame(_compute_features(waveforms, feature_set, sampling_rate))
+        return pd.concat([frame, features], axis=1)
+
+    if cache.sampling_rate != sampling_rate:
+        raise ValueError(f'Feature cache holds rows for {cache.sampling_rate} Hz, waveforms are at {sampling_rate} Hz')
+    keys = waveform_keys(waveforms)
+    rows, hit = cache.lookup(keys)
+    if not hit.all():
+        miss = np.flatnonzero(~hit)
+        computed = _compute_features(np.asarray(waveforms)[miss], feature_set, sampling_rate)
+        rows[miss] = np.column_stack([computed[name] for name in cache.columns])
+        cache.update(keys[miss], rows[miss])
+    return pd.concat([frame, pd.DataFrame(rows, columns=cache.columns)], axis=1)
+
+
+def extract_features(dataset, feature_set='basic', sampling_rate=10000, cache=None):
+    """
+    Extract ML features into a DataFrame
+    Accepts a list of sample dicts or a WaveformStore, which is processed chunk by chunk
+    """
+    import pandas as pd
+
+    if hasattr(dataset, 'iter_chunks'):
+        frames = []
+        for i, (waveforms, metadata) in enumerate(dataset.iter_chunks()):
+            print(f"  Processing chunk {i+1}/{len(dataset.chunks)}")
+            frames.append(features_frame(waveforms, metadata, feature_set, sampling_rate, cache))
+        return pd.concat(frames, ignore_index=True)
+
+    waveforms = np.array([[sample[channel] for channel in CHANNELS] for sample in dataset])
+    metadata = pd.DataFrame([{column: sample[column] for column in ID_COLUMNS} for sample in dataset])
+    return features_frame(waveforms, metadata, feature_set, sampling_rate, cache)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Batched Model Inference
+Scores feature rows with the exported server/ml/model.json and scaler.json using NumPy only
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from grid_features import FEATURE_SETS, ID_COLUMNS, features_frame
+from grid_synthesis import FAULT_CLASSES
+from waveform_store import WaveformStore
+
+DEFAULT_BATCH_SIZE = 65536
+
+
+class BatchPredictor:
+    """
+    MLP forward pass over large batches of raw feature rows
+    The scaler is folded into the first layer and every layer writes into a buffer
+    allocated once, so scoring a batch allocates nothing but the output
+    """
+
+    def __init__(self, model_path='server/ml/model.json', scaler_path='server/ml/scaler.json',
+                 batch_size=DEFAULT_BATCH_SIZE, dtype=np.float32):
+        with open(model_path) as f:
+            model = json.load(f)
+        with open(scaler_path) as f:
+            scaler = json.load(f)
+
+        self.feature_columns = list(model['feature_columns'])
+        if list(scaler['feature_columns']) != self.feature_columns:
+            raise ValueError(f'{scaler_path} was fitted on different features than {model_path}')
+        self.classes = np.array(model['classes'])
+        self.class_names = [FAULT_CLASSES[int(c)] for c in self.classes]
+        self.batch_size = batch_size
+        self.dtype = np.dtype(dtype)
+
+        # (x - mean) / std @ W + b  ==  x @ (W / std) + (b - (mean / std) @ W)
+        mean = np.asarray(scaler['mean'], dtype=np.float64)
+        std = np.asarray(scaler['std'], dtype=np.float64)
+        std[std == 0] = 1.0
+        weights = [np.asarray(coef, dtype=np.float64) for coef in model['coefs']]
+        biases = [np.asarray(intercept, dtype=np.float64) for intercept in model['intercepts']]
+        biases[0] = biases[0] - (mean / std) @ weights[0]
+        weights[0] = weights[0] / std[:, None]
+
+        self.weights = [w.astype(self.dtype) for w in weights]
+        self.biases = [b.astype(self.dtype) for b in biases]
+        self._input = np.empty((batch_size, len(self.feature_columns)), dtype=self.dtype)
+        self._activations = [np.empty((batch_size, w.shape[1]), dtype=self.dtype) for w in self.weights]
+
+    @classmethod
+    def from_dir(cls, model_dir='server/ml', **kwargs):
+        return cls(os.path.join(model_dir, 'model.json'), os.path.join(model_dir, 'scaler.json'), **kwargs)
+
+    @property
+    def feature_set(self):
+        """Name of the feature set the model was trained on, None for a custom column list"""
+        for name, columns in FEATURE_SETS.items():
+            if list(columns) == self.feature_columns:
+                return name
+        return None
+
+    def _forward(self, X, out):
+        n = len(X)
+        h = self._input[:n]
+        h[...] = X
+        last = len(self.weights) - 1
+        for i, (weights, bias) in enumerate(zip(self.weights, self.biases)):
+            a = self._activations[i][:n]
+            np.matmul(h, weights, out=a)
+            a += bias
+            if i < last:
+                np.maximum(a, 0, out=a)
+            h = a
+
+        # Softmax in place
+        h -= h.max(axis=1, keepdims=True)
+        np.exp(h, out=h)
+        h /= h.sum(axis=1, keepdims=True)
+        out[...] = h
+
+    def predict_proba(self, X, out=None):
+        """Class probabilities for raw (unscaled) feature rows, in the order of self.classes"""
+        X = np.asarray(X)
+        if out is None:
+            out = np.empty((len(X), len(self.classes)), dtype=self.dtype)
+        for start in range(0, len(X), self.batch_size):
+            stop = min(start + self.batch_size, len(X))
+            self._forward(X[start:stop], out[start:stop])
+        return out
+
+    def predict(self, X):
+        """Predicted class codes for raw feature rows"""
+        return self.classes[self.predict_proba(X).argmax(axis=1)]
+
+    def score_frame(self, df):
+        """Prediction table for a feature frame: its ID columns, label, confidence and probabilities"""
+        proba = self.predict_proba(df[self.feature_columns].to_numpy())
+        best = proba.argmax(axis=1)
+        result = df[[c for c in ID_COLUMNS if c in df.columns]].reset_index(drop=True)
+        result['predicted_label'] = np.array(self.class_names)[best]
+        result['confidence'] = proba[np.arange(len(proba)), best]
+        for i, name in enumerate(self.class_names):
+            result[f'p_{name.lower()}'] = proba[:, i]
+        return result
+
+
+def iter_feature_frames(source, feature_set, chunk_size):
+    """Feature frames from a features CSV (read in chunks) or a waveform store (one per chunk)"""
+    if WaveformStore.exists(source):
+        store = WaveformStore(source)
+        for waveforms, metadata in store.iter_chunks():
+            yield features_frame(waveforms, metadata, feature_set, store.manifest['sampling_rate'])
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size)
+
+
+def score_dataset(predictor, source, output, chunk_size=DEFAULT_BATCH_SIZE):
+    """Score every row of a features CSV or waveform store and write the predictions CSV"""
+    feature_set = predictor.feature_set
+    if WaveformStore.exists(source) and feature_set is None:
+        raise ValueError('Model features do not match a known feature set; score a features CSV instead')
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    total = 0
+    counts = dict.fromkeys(predictor.class_names, 0)
+    correct = 0
+    labelled = False
+    start = time.perf_counter()
+    for i, frame in enumerate(iter_feature_frames(source, feature_set, chunk_size)):
+        result = predictor.score_frame(frame)
+        result.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        total += len(result)
+        for name, count in result['predicted_label'].value_counts().items():
+            counts[name] += int(count)
+        if 'label' in result:
+            labelled = True
+            correct += int((result['label'] == result['predicted_label']).sum())
+
+    elapsed = time.perf_counter() - start
+    return {
+        'num_samples': total,
+        'seconds': elapsed,
+        'samples_per_second': total / elapsed if elapsed > 0 else 0.0,
+        'class_counts': counts,
+        'accuracy': correct / total if labelled else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a dataset with the exported model')
+    parser.add_argument('source', nargs='?', default=os.path.join('data', 'kerala_grid_features_10k.csv'),
+                        help='Features CSV or waveform store directory')
+    parser.add_argument('--model-dir', default=os.path.join('server', 'ml'))
+    parser.add_argument('--output', default=os.path.join('data', 'kerala_grid_predictions.csv'))
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--dtype', choices=['float32', 'float64'], default='float32')
+    args = parser.parse_args()
+
+    predictor = BatchPredictor.from_dir(args.model_dir, batch_size=args.batch_size, dtype=args.dtype)
+    print(f"🔎 Scoring {args.source} with {len(predictor.feature_columns)}-feature model")
+    summary = score_dataset(predictor, args.source, args.output, args.batch_size)
+
+    print(f"✅ {summary['num_samples']} predictions saved to {args.output}")
+    print(f"Throughput: {summary['samples_per_second']:.0f} samples/sec")
+    if summary['accuracy'] is not None:
+        print(f"Accuracy against labels: {summary['accuracy']:.4f}")
+    for name, count in summary['class_counts'].items():
+        print(f"  {name}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Batch Waveform Synthesis for Kerala Grid
+Builds N samples of a class at once as (N, phases, samples) arrays
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Channel order of the phase axis in every waveform batch
+CHANNELS = ['current_r', 'current_y', 'current_b', 'voltage_r', 'voltage_y', 'voltage_b']
+CURRENT = slice(0, 3)
+VOLTAGE = slice(3, 6)
+
+# R, Y, B phase shifts
+PHASE_SHIFTS = np.array([0.0, -2 * np.pi / 3, 2 * np.pi / 3])
+
+FAULT_CLASSES = ['NORMAL', 'LINE_BREAK', 'SHORT_CIRCUIT', 'OVERLOAD']
+
+DISTRICTS = [
+    'Trivandrum', 'Kollam', 'Pathanamthitta', 'Alappuzha',
+    'Kottayam', 'Idukki', 'Ernakulam', 'Thrissur', 'Palakkad',
+    'Malappuram', 'Kozhikode', 'Wayanad', 'Kannur', 'Kasaragod'
+]
+FEEDERS_PER_DISTRICT = 25
+
+# Default distribution of every per-sample scenario parameter: load parameters of every
+# class, then the fault parameters of each class. The synthesis and injection functions draw
+# these unless they are handed values, e.g. from a scenario spec.
+# fault_position is the fault onset as a fraction of the signal.
+LOAD_PARAMETERS = {
+    'base_current': {'distribution': 'uniform', 'low': 30, 'high': 60},
+}
+PARAMETER_DISTRIBUTIONS = {
+    'NORMAL': {},
+    'LINE_BREAK': {
+        'fault_position': {'distribution': 'uniform', 'low': 0.25, 'high': 0.75},
+        'drop_factor': {'distribution': 'uniform', 'low': 0.1, 'high': 0.4},
+        'voltage_drop': {'distribution': 'uniform', 'low': 0.7, 'high': 0.9},
+        'break_location_km': {'distribution': 'uniform', 'low': 0.5, 'high': 10},
+    },
+    'SHORT_CIRCUIT': {
+        'fault_position': {'distribution': 'uniform', 'low': 0.25, 'high': 0.75},
+        'current_multiplier': {'distribution': 'uniform', 'low': 5, 'high': 15},
+        'voltage_drop': {'distribution': 'uniform', 'low': 0.05, 'high': 0.2},
+        'fault_location_km': {'distribution': 'uniform', 'low': 0.5, 'high': 10},
+    },
+    'OVERLOAD': {
+        'overload_increase': {'distribution': 'constant', 'value': 0.8},
+        'voltage_drop': {'distribution': 'uniform', 'low': 0.85, 'high': 0.95},
+        'overload_percentage': {'distribution': 'uniform', 'low': 20, 'high': 80},
+    },
+}
+DISTRIBUTIONS = ['uniform', 'normal', 'triangular', 'constant']
+
+
+def generate_feeder_list(rng):
+    """Generate Kerala KSEBL feeders based on actual districts"""
+    feeders = []
+    for district in DISTRICTS:
+        # Generate 25 feeders per district (350 total)
+        for i in range(1, FEEDERS_PER_DISTRICT + 1):
+            feeders.append({
+                'id': f'{district[:3].upper()}-F{i:03d}',
+                'name': f'{district} Feeder {i}',
+                'district': district,
+                'voltage': 11000,  # 11 kV
+                'length_km': round(float(rng.uniform(2, 15)), 2),
+                'area_type': str(rng.choice(['urban', 'rural', 'semi-urban'])),
+                'typical_load_kw': round(float(rng.uniform(50, 500)), 2),
+                'num_consumers': int(rng.integers(20, 200, endpoint=True)),
+            })
+    return feeders
+
+
+def draw_parameter(spec, size, rng):
+    """
+    Draw a parameter from a distribution spec such as {'distribution': 'uniform', 'low': 0, 'high': 1}
+    Normal draws are clipped to optional low/high bounds
+    """
+    kind = spec['distribution']
+    if kind == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], size=size)
+    if kind == 'normal':
+        values = rng.normal(spec['mean'], spec['std'], size=size)
+        return np.clip(values, spec.get('low', -np.inf), spec.get('high', np.inf))
+    if kind == 'triangular':
+        return rng.triangular(spec['low'], spec['mode'], spec['high'], size=size)
+    if kind == 'constant':
+        return np.full(size, float(spec['value'])) if size is not None else float(spec['value'])
+    raise ValueError(f'Unknown distribution {kind!r}, expected one of {DISTRIBUTIONS}')
+
+
+def _parameter(values, class_name, name, n, rng):
+    """Given per-sample values of a parameter, else a draw from its default distribution"""
+    if values and name in values:
+        return np.asarray(values[name], dtype=np.float64)
+    return draw_parameter(PARAMETER_DISTRIBUTIONS[class_name][name], n, rng)
+
+
+def _fault_point(values, n, num_points, rng):
+    """Per-sample fault onset index, by default uniform between 25% and 75% of the signal"""
+    if values and 'fault_position' in values:
+        position = np.asarray(values['fault_position']) * num_points
+        return np.clip(position.astype(int), 0, num_points - 1)
+    return rng.integers(num_points // 4, 3 * num_points // 4, size=n, endpoint=True)
+
+
+def kept_time_vector(sampling_rate, duration_seconds, downsample_factor):
+    """Time instants of the samples that survive downsampling"""
+    total_points = int(duration_seconds * sampling_rate)
+    step = duration_seconds / (total_points - 1)
+    return np.arange(0, total_points, downsample_factor) * step
+
+
+def synthesis_basis(t, fundamental_freq=50, max_frequency=None):
+    """
+    Per-phase carriers (3, T), harmonic content (3, T) and slow load trend (T,) over t
+    Every batch of a dataset shares t, so the basis is computed once and returned read-only
+    """
+    t = np.ascontiguousarray(t, dtype=np.float64)
+    return _synthesis_basis(t.tobytes(), float(fundamental_freq), max_frequency)
+
+
+@lru_cache(maxsize=4)
+def _synthesis_basis(t_bytes, fundamental_freq, max_frequency):
+    t = np.frombuffer(t_bytes, dtype=np.float64)
+    num_points = len(t)
+
+    # Per-phase carriers, shape (3, T)
+    wt = 2 * np.pi * fundamental_freq * t
+    carriers = np.sin(wt[None, :] + PHASE_SHIFTS[:, None])
+
+    # Harmonics (typical for electrical loads), scaled per sample
+    harmonics = np.zeros((3, num_points))
+    for h in [3, 5, 7, 9]:
+        if max_frequency is not None and h * fundamental_freq >= max_frequency:
+            continue
+        harmonics += 0.03 / h * np.sin(h * wt[None, :] + PHASE_SHIFTS[:, None])
+
+    load_trend = 1 + 0.1 * np.sin(2 * np.pi * 0.1 * t)
+
+    for array in (carriers, harmonics, load_trend):
+        array.setflags(write=False)
+    return carriers, harmonics, load_trend
+
+
+def synthesize_normal(n, t, rng, fundamental_freq=50, base_voltage=230, base_current=None, max_frequency=None):
+    """
+    Generate N normal operation waveforms as an (N, 6, T) array
+    Pass base_current to keep each sample's load level fixed, e.g. across chunks of one stream,
+    and max_frequency (the Nyquist frequency of t) to leave out harmonics it cannot represent
+    """
+    num_points = len(t)
+    if base_current is None:
+        base_current = draw_parameter(LOAD_PARAMETERS['base_current'], n, rng)
+    base_current = np.asarray(base_current, dtype=np.float64)
+
+    carriers, harmonics, load_trend = synthesis_basis(t, fundamental_freq, max_frequency)
+
+    # Load variation is shared across phases, slow load trend is shared across samples
+    load_var = rng.normal(1.0, 0.05, size=(n, 1, num_points))
+
+    waveforms = np.empty((n, 6, num_points))
+    scale = base_current[:, None, None]
+    waveforms[:, CURRENT] = scale * (load_var * load_trend * carriers + harmonics)
+
+    # Add noise
+    noise_level = 0.02
+    waveforms[:, CURRENT] += rng.normal(0, 1, size=(n, 3, num_points)) * (noise_level * scale)
+
+    # Voltages (more stable than currents)
+    voltage_var = rng.normal(1.0, 0.02, size=(n, 1, num_points))
+    waveforms[:, VOLTAGE] = base_voltage * carriers * voltage_var
+
+    return waveforms
+
+
+def _step_mask(num_points, start):
+    """Boolean (N, 1, T) mask that is True from each sample's start index onwards"""
+    return (np.arange(num_points)[None, :] >= start[:, None])[:, None, :]
+
+
+def _transient(num_points, start, duration, shape_func):
+    """Per-sample (N, 1, T) multiplicative transient beginning at start"""
+    offset = np.arange(num_points)[None, :] - start[:, None]
+    window = (offset >= 0) & (offset < duration)
+    factor = np.where(window, shape_func(np.clip(offset, 0, None)), 1.0)
+    return factor[:, None, :]
+
+
+def _samples(seconds, sampling_rate):
+    return int(round(seconds * sampling_rate))
+
+
+def inject_line_break(waveforms, rng, sampling_rate, values=None):
+    """
+    Inject line breaks in place; returns per-sample fault parameters
+    sampling_rate is the rate of the waveforms, transients are timed in seconds;
+    values optionally holds per-sample parameters that replace the default draws
+    """
+    n, _, num_points = waveforms.shape
+
+    # Break at a random point between 25% and 75% of the signal
+    break_point = _fault_point(values, n, num_points, rng)
+    after = _step_mask(num_points, break_point)
+
+    # 10-40% of the current remains, voltage drops less dramatically
+    drop_factor = _parameter(values, 'LINE_BREAK', 'drop_factor', n, rng)
+    voltage_drop = _parameter(values, 'LINE_BREAK', 'voltage_drop', n, rng)
+    waveforms[:, CURRENT] *= np.where(after, drop_factor[:, None, None], 1.0)
+    waveforms[:, VOLTAGE] *= np.where(after, voltage_drop[:, None, None], 1.0)
+
+    # Oscillatory transient: 5 ms long, decaying over 1 ms
+    waveforms[:, CURRENT] *= _transient(
+        num_points, break_point, _samples(0.005, sampling_rate),
+        lambda i: 1 + 0.3 * np.exp(-i / (0.001 * sampling_rate)) * np.sin(2 * np.pi * 100 * i / sampling_rate),
+    )
+
+    return {
+        'break_location_km': np.round(_parameter(values, 'LINE_BREAK', 'break_location_km', n, rng), 2),
+    }
+
+
+def inject_short_circuit(waveforms, rng, sampling_rate, values=None):
+    """
+    Inject short circuits in place; returns per-sample fault parameters
+    sampling_rate is the rate of the waveforms, transients are timed in seconds;
+    values optionally holds per-sample parameters that replace the default draws
+    """
+    n, _, num_points = waveforms.shape
+    fault_point = _fault_point(values, n, num_points, rng)
+    after = _step_mask(num_points, fault_point)
+
+    # Massive current increase, voltage collapse
+    current_multiplier = _parameter(values, 'SHORT_CIRCUIT', 'current_multiplier', n, rng)
+    voltage_drop = _parameter(values, 'SHORT_CIRCUIT', 'voltage_drop', n, rng)
+    waveforms[:, CURRENT] *= np.where(after, current_multiplier[:, None, None], 1.0)
+    waveforms[:, VOLTAGE] *= np.where(after, voltage_drop[:, None, None], 1.0)
+
+    # High-frequency transient, 10 ms long
+    waveforms[:, CURRENT] *= _transient(
+        num_points, fault_point, _samples(0.01, sampling_rate),
+        lambda i: 1 + 0.5 * np.sin(2 * np.pi * 1000 * i / sampling_rate),
+    )
+
+    return {
+        'fault_location_km': np.round(_parameter(values, 'SHORT_CIRCUIT', 'fault_location_km', n, rng), 2),
+    }
+
+
+def inject_overload(waveforms, rng, sampling_rate, fundamental_freq=50, duration_seconds=4.0, values=None):
+    """
+    Inject overload conditions in place; returns per-sample fault parameters
+    Harmonics at or above the Nyquist frequency of sampling_rate are left out;
+    values optionally holds per-sample parameters that replace the default draws
+    """
+    n, _, num_points = waveforms.shape
+    overload_start = num_points // 4
+    idx = np.arange(overload_start, num_points)
+
+    # Gradual increase in current (by 80% unless given) with slow fluctuation
+    increase = _parameter(values, 'OVERLOAD', 'overload_increase', n, rng)
+    overload_factor = 1.0 + (idx - overload_start) / (num_points - overload_start) * increase[:, None]
+    overload_factor += 0.1 * np.sin(2 * np.pi * 0.5 * idx / sampling_rate)
+    waveforms[:, CURRENT, overload_start:] *= overload_factor[:, None, :]
+
+    # Voltage drops slightly due to increased load
+    voltage_drop = _parameter(values, 'OVERLOAD', 'voltage_drop', n, rng)
+    waveforms[:, VOLTAGE, overload_start:] *= voltage_drop[:, None, None]
+
+    # More harmonics due to non-linear loads
+    harmonics = _overload_harmonics(num_points, sampling_rate, fundamental_freq, duration_seconds)
+    waveforms[:, CURRENT, overload_start:] += harmonics[overload_start:]
+
+    return {
+        'overload_percentage': np.round(_parameter(values, 'OVERLOAD', 'overload_percentage', n, rng), 1),
+    }
+
+
+@lru_cache(maxsize=4)
+def _overload_harmonics(num_points, sampling_rate, fundamental_freq, duration_seconds):
+    """Harmonic content added by non-linear overload, (T,) and read-only"""
+    t = np.linspace(0, duration_seconds, num_points)
+    harmonics = np.zeros(num_points)
+    for h in [3, 5, 7, 9, 11]:
+        if h * fundamental_freq < sampling_rate / 2:
+            harmonics += 0.1 * np.sin(2 * np.pi * fundamental_freq * h * t)
+    harmonics.setflags(write=False)
+    return harmonics
+
+
+def decimate(waveforms, sampling_rate, output_rate):
+    """
+    Resample (N, 6, T) waveforms from sampling_rate to output_rate along the last axis
+    A polyphase FIR filter removes content above the output Nyquist frequency first
+    """
+    from scipy import signal
+
+    divisor = np.gcd(int(sampling_rate), int(output_rate))
+    up, down = int(output_rate) // divisor, int(sampling_rate) // divisor
+    return signal.resample_poly(waveforms, up, down, axis=-1)
+
+
+FAULT_INJECTORS = {
+    'LINE_BREAK': inject_line_break,
+    'SHORT_CIRCUIT': inject_short_circuit,
+    'OVERLOAD': inject_overload,
+}
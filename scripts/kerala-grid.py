@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Kerala Grid Pipeline CLI
+One entry point for dataset generation, feature extraction, training and scoring;
+only the chosen stage is imported, so pandas and scikit-learn load when a stage needs them
+"""
+
+import argparse
+import os
+import runpy
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Subcommand: (stage script, arguments placed before the user's, help)
+COMMANDS = {
+    'generate': ('generate-dataset.py', [], 'Generate the waveform store and features CSV'),
+    'features': ('generate-dataset.py', ['--features-only'],
+                 'Rebuild the features CSV from the existing waveform store'),
+    'train': ('train-model.py', [], 'Train the model and export it to server/ml'),
+    'score': ('grid_inference.py', [], 'Score a features CSV or waveform store with the exported model'),
+}
+
+
+def run_stage(command, args):
+    """
+    Run a stage script as __main__ with the given arguments, exactly as if invoked directly,
+    so its worker processes can find the functions they are sent
+    """
+    script, prefix, _ = COMMANDS[command]
+    path = os.path.join(SCRIPTS_DIR, script)
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    sys.argv = [path, *prefix, *args]
+    runpy.run_path(path, run_name='__main__')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Kerala grid dataset, training and scoring pipeline',
+        epilog="Run '%(prog)s <command> --help' for the options of a command",
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='command', required=True)
+    for name, (_, _, help_text) in COMMANDS.items():
+        # Options belong to the stage script, which parses them itself
+        subparsers.add_parser(name, help=help_text, add_help=False)
+    args, rest = parser.parse_known_args()
+    run_stage(args.command, rest)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Pipeline Instrumentation
+Per-stage timers, sample counters, memory high-water marks and an optional profiler hook,
+collected into a JSON run report
+"""
+
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import shutil
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ['cprofile', 'py-spy']
+PROFILE_TOP_FUNCTIONS = 25
+
+
+def rss_high_water_mb(who='self'):
+    """Peak resident set size of this process (or of its reaped children) in MB, None if unknown"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return usage.ru_maxrss * scale / 2**20
+
+
+class StageRecord:
+    """
+    Accumulated measurements of every run of one named stage
+    process_rss_high_water_mb is the process-lifetime peak when the stage last exited, so it
+    includes earlier stages; rss_growth_mb is how far a run of this stage raised that peak
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.samples = 0
+        self.process_rss_high_water_mb = None
+        self.rss_growth_mb = None
+        self.python_peak_mb = None
+
+    def add(self, samples):
+        """Count samples processed by the stage"""
+        self.samples += int(samples)
+
+    def merge(self, other):
+        self.calls += other['calls']
+        self.seconds += other['seconds']
+        self.cpu_seconds += other['cpu_seconds']
+        self.samples += other['samples']
+        for key in ('process_rss_high_water_mb', 'rss_growth_mb', 'python_peak_mb'):
+            if other.get(key) is not None:
+                setattr(self, key, max(getattr(self, key) or 0.0, other[key]))
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'samples': self.samples,
+            'samples_per_second': self.samples / self.seconds if self.samples and self.seconds > 0 else None,
+            'process_rss_high_water_mb': self.process_rss_high_water_mb,
+            'rss_growth_mb': self.rss_growth_mb,
+            'python_peak_mb': self.python_peak_mb,
+        }
+
+
+class RunMetrics:
+    """
+    Collects stage measurements for one pipeline run
+
+    Stages are timed with `with metrics.stage('name') as stage: ... stage.add(n)`; runs of
+    the same name accumulate. Stages measured in worker processes are merged with
+    merge_stages(), so with parallel workers their seconds add up to more than wall time.
+    One stage can be profiled: cProfile output from every process is
+    combined into profile-<stage>.prof, py-spy samples the whole process tree.
+    """
+
+    def __init__(self, profile_stage=None, profiler='cprofile', profile_dir=None, trace_memory=False):
+        if profiler not in PROFILERS:
+            raise ValueError(f'Unknown profiler {profiler!r}, expected one of {PROFILERS}')
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counters = {}
+        self.info = {}
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._profile_files = []
+        # Peaks of the open traced stages, innermost last, carried across nested resets
+        self._traced_peaks = []
+
+    def _record(self, name):
+        if name not in self.stages:
+            self.stages[name] = StageRecord(name)
+        return self.stages[name]
+
+    @contextmanager
+    def stage(self, name, samples=0):
+        record = self._record(name)
+        record.add(samples)
+        profiling = self.profile_stage == name
+        rss_at_entry = rss_high_water_mb()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # Resetting wipes the enclosing stage's peak so far, so keep it aside first
+            if self._traced_peaks:
+                self._traced_peaks[-1] = max(self._traced_peaks[-1], tracemalloc.get_traced_memory()[1])
+            self._traced_peaks.append(0)
+            tracemalloc.reset_peak()
+
+        with self._profile(name) if profiling else _nothing():
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            try:
+                yield record
+            finally:
+                record.calls += 1
+                record.seconds += time.perf_counter() - wall
+                record.cpu_seconds += time.process_time() - cpu
+                record.process_rss_high_water_mb = rss_high_water_mb()
+                if rss_at_entry is not None:
+                    growth = record.process_rss_high_water_mb - rss_at_entry
+                    record.rss_growth_mb = max(record.rss_growth_mb or 0.0, growth)
+                if self.trace_memory:
+                    peak = max(self._traced_peaks.pop(), tracemalloc.get_traced_memory()[1])
+                    if self._traced_peaks:
+                        self._traced_peaks[-1] = max(self._traced_peaks[-1], peak)
+                    record.python_peak_mb = max(record.python_peak_mb or 0.0, peak / 2**20)
+
+    @contextmanager
+    def _profile(self, name):
+        os.makedirs(self.profile_dir or '.', exist_ok=True)
+        if self.profiler == 'py-spy':
+            with _py_spy(os.path.join(self.profile_dir or '.', f'profile-{name}.speedscope.json')) as path:
+                yield
+            if path:
+                self._profile_files.append(path)
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(self.profile_dir or '.', f'profile-{name}-{os.getpid()}-{time.time_ns()}.prof')
+            profiler.dump_stats(path)
+            self._profile_files.append(path)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge_stages(self, stages):
+        """Fold in stage dicts measured elsewhere, e.g. returned by a worker process"""
+        for name, stage in stages.items():
+            self._record(name).merge(stage)
+
+    def stage_dicts(self):
+        return {name: record.to_dict() for name, record in self.stages.items()}
+
+    def _profile_summary(self):
+        """Combine per-process cProfile dumps into one file and list the costliest functions"""
+        if not self.profile_stage:
+            return None
+        directory = self.profile_dir or '.'
+        if self.profiler == 'py-spy':
+            return {'stage': self.profile_stage, 'profiler': 'py-spy', 'files': self._profile_files}
+
+        parts = sorted(glob.glob(os.path.join(directory, f'profile-{self.profile_stage}-*.prof')))
+        if not parts:
+            return {'stage': self.profile_stage, 'profiler': 'cprofile', 'file': None, 'top': []}
+        stats = pstats.Stats(parts[0], stream=io.StringIO())
+        for part in parts[1:]:
+            stats.add(part)
+        combined = os.path.join(directory, f'profile-{self.profile_stage}.prof')
+        stats.dump_stats(combined)
+        for part in parts:
+            os.remove(part)
+
+        processes = len({os.path.basename(part).split('-')[-2] for part in parts})
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+        return {
+            'stage': self.profile_stage,
+            'profiler': 'cprofile',
+            'file': combined,
+            'processes': processes,
+            'top': [
+                {
+                    'function': f'{os.path.basename(filename)}:{line}({function})',
+                    'calls': calls,
+                    'total_seconds': total,
+                    'cumulative_seconds': cumulative,
+                }
+                for (filename, line, function), (_, calls, total, cumulative, _) in top
+            ],
+        }
+
+    def report(self):
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'seconds': time.perf_counter() - self._start,
+            'argv': sys.argv,
+            **self.info,
+            'stages': self.stage_dicts(),
+            'counters': self.counters,
+            'memory': {
+                'rss_high_water_mb': rss_high_water_mb(),
+                'children_rss_high_water_mb': rss_high_water_mb('children'),
+            },
+            'profile': self._profile_summary(),
+        }
+
+    def save(self, path):
+        """Write the run report as JSON; returns the report"""
+        report = self.report()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        return report
+
+
+@contextmanager
+def _nothing():
+    yield
+
+
+@contextmanager
+def _py_spy(path):
+    """Sample this process and its children with py-spy; yields the output path, None if unavailable"""
+    executable = shutil.which('py-spy')
+    if executable is None:
+        print("⚠️  py-spy not found on PATH, stage not profiled")
+        yield None
+        return
+    process = subprocess.Popen(
+        [executable, 'record', '--pid', str(os.getpid()), '--subprocesses',
+         '--format', 'speedscope', '--output', path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield path
+    finally:
+        # py-spy writes its output when interrupted
+        process.send_signal(signal.SIGINT)
+        process.wait()
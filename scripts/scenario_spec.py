@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Scenario Specs for Dataset Generation
+Class and district proportions, per-sample parameter distributions and oversampling of hard
+cases near the class boundaries, loaded from a JSON file
+"""
+
+import json
+
+import numpy as np
+
+from grid_synthesis import (
+    DISTRICTS, DISTRIBUTIONS, FAULT_CLASSES, LOAD_PARAMETERS, PARAMETER_DISTRIBUTIONS, draw_parameter,
+)
+
+# Parameter regions where a class's signature fades toward another class: mild line breaks
+# and short circuits late in the window, shallow overloads. Oversampled hard cases are drawn
+# from these unless the spec gives its own.
+BOUNDARY_PARAMETERS = {
+    'LINE_BREAK': {
+        'fault_position': {'distribution': 'uniform', 'low': 0.6, 'high': 0.75},
+        'drop_factor': {'distribution': 'uniform', 'low': 0.32, 'high': 0.4},
+        'voltage_drop': {'distribution': 'uniform', 'low': 0.86, 'high': 0.9},
+    },
+    'SHORT_CIRCUIT': {
+        'fault_position': {'distribution': 'uniform', 'low': 0.6, 'high': 0.75},
+        'current_multiplier': {'distribution': 'uniform', 'low': 5, 'high': 6.5},
+        'voltage_drop': {'distribution': 'uniform', 'low': 0.16, 'high': 0.2},
+    },
+    'OVERLOAD': {
+        'overload_increase': {'distribution': 'uniform', 'low': 0.2, 'high': 0.4},
+        'voltage_drop': {'distribution': 'uniform', 'low': 0.93, 'high': 0.95},
+    },
+}
+
+# Key of a weight table that applies to every entry not listed, and of the parameters of every class
+ANY = '*'
+
+DISTRIBUTION_FIELDS = {
+    'uniform': {'low', 'high'},
+    'normal': {'mean', 'std'},
+    'triangular': {'low', 'mode', 'high'},
+    'constant': {'value'},
+}
+
+
+def _weights(table, names, what):
+    """Relative weights of names from a {name: weight} table, '*' covering the unlisted ones"""
+    unknown = set(table) - set(names) - {ANY}
+    if unknown:
+        raise ValueError(f"Unknown {what} in scenario: {', '.join(sorted(unknown))}")
+    weights = np.array([float(table.get(name, table.get(ANY, 0.0))) for name in names])
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError(f'Scenario {what} weights must be non-negative with a positive total')
+    return weights / weights.sum()
+
+
+def _check_distributions(parameters, class_name):
+    known = {**LOAD_PARAMETERS, **PARAMETER_DISTRIBUTIONS.get(class_name, {})}
+    for name, spec in parameters.items():
+        if name not in known:
+            raise ValueError(f"Unknown parameter {name!r} for {class_name}, expected one of {sorted(known)}")
+        kind = spec.get('distribution')
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f'Unknown distribution {kind!r} for {name}, expected one of {DISTRIBUTIONS}')
+        missing = DISTRIBUTION_FIELDS[kind] - set(spec)
+        if missing:
+            raise ValueError(f"{kind} distribution of {name} needs {', '.join(sorted(missing))}")
+
+
+class ScenarioSpec:
+    """
+    What to generate: class proportions, district proportions, parameter distributions that
+    replace the defaults of grid_synthesis, and the fraction of each class drawn from its
+    boundary region instead. Oversampling splits each batch, so it costs no rejected samples.
+
+    Weight tables map names to relative weights; unlisted names weigh the '*' entry, or nothing.
+    Parameters under '*' apply to every class.
+    """
+
+    def __init__(self, name='custom', classes=None, districts=None, parameters=None, oversample=None):
+        self.name = name
+        self.classes = dict(classes or {ANY: 1})
+        self.districts = dict(districts or {ANY: 1})
+        self.parameters = {class_name: dict(params) for class_name, params in (parameters or {}).items()}
+        self.oversample = {}
+        for class_name, entry in (oversample or {}).items():
+            entry = entry if isinstance(entry, dict) else {'fraction': entry}
+            self.oversample[class_name] = {
+                'fraction': float(entry['fraction']),
+                'parameters': dict(entry.get('parameters') or BOUNDARY_PARAMETERS.get(class_name, {})),
+            }
+
+        self.class_proportions = _weights(self.classes, FAULT_CLASSES, 'classes')
+        self.district_proportions = _weights(self.districts, DISTRICTS, 'districts')
+        for class_name, params in self.parameters.items():
+            if class_name != ANY and class_name not in FAULT_CLASSES:
+                raise ValueError(f'Unknown class {class_name!r} in scenario parameters')
+            _check_distributions(params, 'NORMAL' if class_name == ANY else class_name)
+        for class_name, entry in self.oversample.items():
+            if class_name not in FAULT_CLASSES:
+                raise ValueError(f'Unknown class {class_name!r} in scenario oversampling')
+            if not 0 <= entry['fraction'] <= 1:
+                raise ValueError(f'Oversampling fraction of {class_name} must be between 0 and 1')
+            if not entry['parameters']:
+                raise ValueError(f'Oversampling {class_name} needs parameters, it has no built-in boundary')
+            _check_distributions(entry['parameters'], class_name)
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(**spec)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'classes': self.classes,
+            'districts': self.districts,
+            'parameters': self.parameters,
+            'oversample': self.oversample,
+        }
+
+    def class_counts(self, num_samples):
+        """Samples per class for a dataset of num_samples, largest remainders rounded up"""
+        exact = self.class_proportions * num_samples
+        counts = np.floor(exact).astype(int)
+        counts[np.argsort(counts - exact)[:num_samples - counts.sum()]] += 1
+        return [(class_name, int(count)) for class_name, count in zip(FAULT_CLASSES, counts)]
+
+    def feeder_probabilities(self, feeders):
+        """Selection probability of each feeder, so districts get their share whatever their feeder count"""
+        districts = [feeder['district'] for feeder in feeders]
+        feeders_in = {district: districts.count(district) for district in set(districts)}
+        share = dict(zip(DISTRICTS, self.district_proportions))
+        p = np.array([share.get(district, 0.0) / feeders_in[district] for district in districts])
+        return p / p.sum()
+
+    def draw(self, class_name, n, rng):
+        """
+        Per-sample values of every parameter the scenario changes for a batch of one class;
+        the first round(fraction * n) samples are hard cases from the boundary region
+        """
+        regular = {**self.parameters.get(ANY, {}), **self.parameters.get(class_name, {})}
+        hard = self.oversample.get(class_name, {'fraction': 0.0, 'parameters': {}})
+        num_hard = int(round(hard['fraction'] * n))
+        defaults = {**LOAD_PARAMETERS, **PARAMETER_DISTRIBUTIONS[class_name]}
+
+        values = {}
+        for name in sorted(set(regular) | set(hard['parameters'])):
+            spec = regular.get(name, defaults[name])
+            values[name] = np.concatenate([
+                draw_parameter(hard['parameters'].get(name, spec), num_hard, rng),
+                draw_parameter(spec, n - num_hard, rng),
+            ])
+        return values
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Streaming Fault Detector
+Classifies continuous 3-phase feeder streams chunk by chunk, without waiting for a full capture
+"""
+
+import numpy as np
+
+from grid_synthesis import CURRENT, FAULT_CLASSES, VOLTAGE
+
+NORMAL, LINE_BREAK, SHORT_CIRCUIT, OVERLOAD = range(len(FAULT_CLASSES))
+
+# How many samples of past sums of squares may accumulate before they are recomputed
+RESYNC_SAMPLES = 1 << 16
+
+
+def sliding_max(x, window):
+    """
+    Max over every length-window run along the last axis (van Herk / Gil-Werman)
+    Returns shape (..., L - window + 1) at a constant cost per element
+    """
+    length = x.shape[-1]
+    padded = -(-length // window) * window
+    blocks = np.full(x.shape[:-1] + (padded,), -np.inf)
+    blocks[..., :length] = x
+    blocks = blocks.reshape(x.shape[:-1] + (padded // window, window))
+
+    prefix = np.maximum.accumulate(blocks, axis=-1).reshape(x.shape[:-1] + (padded,))
+    suffix = np.maximum.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1].reshape(x.shape[:-1] + (padded,))
+    count = length - window + 1
+    return np.maximum(suffix[..., :count], prefix[..., window - 1:window - 1 + count])
+
+
+class FeederDetector:
+    """
+    Fault detector for one feeder's continuous (6, m) chunks, channels in CHANNELS order
+
+    The last `window` magnitudes of every channel are kept in a ring buffer where sample i
+    sits at i % window, so the ring splits the stream into blocks of one window. Window RMS
+    comes from running sums of squares. In chunks shorter than a window, a window peak is the
+    larger of the running max of the current block and the suffix max of the previous one,
+    computed once per completed block; longer chunks take a sliding max over the chunk plus
+    one window of history. Either way each sample costs O(1) amortized, although NumPy call
+    overhead dominates below a few dozen samples per chunk. Both statistics are compared
+    against a baseline learned during warm-up and tracked slowly while the feeder is normal.
+    A class is reported once its condition has held for its hold time.
+    """
+
+    def __init__(self, feeder_id=None, sampling_rate=10000, fundamental_freq=50,
+                 window_cycles=1.0, warmup_cycles=10, baseline_seconds=2.0,
+                 fault_hold_cycles=0.5, overload_hold_cycles=5, clear_cycles=5,
+                 short_circuit_current_ratio=3.0, short_circuit_voltage_ratio=0.5,
+                 line_break_current_drop=0.5, line_break_voltage_drop=0.05,
+                 overload_current_rise=0.15, overload_voltage_drop=0.04):
+        cycle = sampling_rate / fundamental_freq
+        self.feeder_id = feeder_id
+        self.sampling_rate = sampling_rate
+        self.window = max(1, int(round(window_cycles * cycle)))
+        self.warmup_samples = max(self.window, int(warmup_cycles * cycle))
+        self.baseline_samples = baseline_seconds * sampling_rate
+        self.hold = {
+            LINE_BREAK: max(1, int(fault_hold_cycles * cycle)),
+            SHORT_CIRCUIT: max(1, int(fault_hold_cycles * cycle)),
+            OVERLOAD: max(1, int(overload_hold_cycles * cycle)),
+        }
+        self.clear_samples = max(1, int(clear_cycles * cycle))
+
+        self.short_circuit_current_ratio = short_circuit_current_ratio
+        self.short_circuit_voltage_ratio = short_circuit_voltage_ratio
+        self.line_break_current_drop = line_break_current_drop
+        self.line_break_voltage_drop = line_break_voltage_drop
+        self.overload_current_rise = overload_current_rise
+        self.overload_voltage_drop = overload_voltage_drop
+
+        self.reset()
+
+    def reset(self):
+        """Forget the stream: history, baseline and reported state"""
+        self._ring = np.zeros((6, self.window))
+        # Max magnitude from each ring position to the end of the last completed block, 0 past it
+        self._suffix_max = np.zeros((6, self.window + 1))
+        self._prefix_max = np.zeros(6)
+        self._sum_squares = np.zeros(6)
+        self._since_resync = 0
+        self.samples_seen = 0
+
+        self.baseline_rms = None
+        self.baseline_peak = None
+        self.state = NORMAL
+        self._run_code = NORMAL
+        self._run_length = 0
+
+        self.rms = np.zeros(6)
+        self.peak = np.zeros(6)
+
+    @property
+    def fault_type(self):
+        return FAULT_CLASSES[self.state]
+
+    def _window_stats(self, x):
+        """Per-sample window RMS and peak for a (6, m) chunk; advances the ring buffer"""
+        magnitude = np.abs(x)
+        if x.shape[1] < self.window:
+            sums, peak = self._short_chunk_stats(magnitude)
+        else:
+            sums, peak = self._long_chunk_stats(magnitude)
+
+        self._since_resync += x.shape[1]
+        if self._since_resync >= RESYNC_SAMPLES:
+            self._sum_squares = np.sum(self._ring * self._ring, axis=1)
+            self._since_resync = 0
+        return np.sqrt(np.maximum(sums, 0) / self.window), peak
+
+    def _short_chunk_stats(self, magnitude):
+        """Running sums of squares and peaks touching only the ring positions the chunk fills"""
+        m = magnitude.shape[1]
+        w = self.window
+        sums = np.empty((6, m))
+        peak = np.empty((6, m))
+
+        # One segment per block the chunk touches, each a contiguous run of ring positions
+        position = self.samples_seen % w
+        if self._suffix_max is None:
+            # After a long chunk: entries from the current position on are the tail of the
+            # previous block, the only part of the suffix maxima short chunks look at
+            self._suffix_max = np.zeros((6, w + 1))
+            self._suffix_max[:, :w] = np.maximum.accumulate(self._ring[:, ::-1], axis=1)[:, ::-1]
+            self._prefix_max = self._ring[:, :position].max(axis=1) if position else np.zeros(6)
+        start = 0
+        while start < m:
+            stop = min(m, start + w - position)
+            end = position + stop - start
+            segment = magnitude[:, start:stop]
+
+            # The sample one window back leaves as each new one enters
+            leaving = self._ring[:, position:end]
+            sums[:, start:stop] = self._sum_squares[:, None] + np.cumsum(segment * segment - leaving * leaving, axis=1)
+            self._sum_squares = sums[:, stop - 1]
+
+            prefix = np.maximum.accumulate(segment, axis=1)
+            np.maximum(prefix, self._prefix_max[:, None], out=prefix)
+            np.maximum(prefix, self._suffix_max[:, position + 1:end + 1], out=peak[:, start:stop])
+            self._ring[:, position:end] = segment
+
+            if end == w:
+                # Block complete: its suffix maxima cover the older part of the next block's windows
+                self._suffix_max[:, :w] = np.maximum.accumulate(self._ring[:, ::-1], axis=1)[:, ::-1]
+                self._prefix_max = np.zeros(6)
+                position = 0
+            else:
+                self._prefix_max = prefix[:, -1]
+                position = end
+            start = stop
+        return sums, peak
+
+    def _long_chunk_stats(self, magnitude):
+        """Sums of squares and sliding max over the chunk plus one window of history, O(m) for m >= window"""
+        m = magnitude.shape[1]
+        w = self.window
+        head = self.samples_seen % w
+        ordered = np.concatenate([self._ring[:, head:], self._ring[:, :head]], axis=1)
+
+        # Sample leaving the window as each new one enters: the history first, then the chunk itself
+        leaving = np.concatenate([ordered, magnitude[:, :m - w]], axis=1)
+        sums = self._sum_squares[:, None] + np.cumsum(magnitude * magnitude - leaving * leaving, axis=1)
+        self._sum_squares = sums[:, -1]
+        peak = sliding_max(np.concatenate([ordered[:, 1:], magnitude], axis=1), w)
+
+        # The ring ends up holding the last window; block maxima are rebuilt if a short chunk follows
+        self._ring = np.roll(magnitude[:, -w:], (head + m) % w, axis=1)
+        self._suffix_max = None
+        return sums, peak
+
+    def _classify(self, rms, peak):
+        """Candidate class code per sample from baseline-relative statistics"""
+        current = rms[CURRENT] / self.baseline_rms[CURRENT, None]
+        voltage = rms[VOLTAGE] / self.baseline_rms[VOLTAGE, None]
+        highest_peak = (peak[CURRENT] / self.baseline_peak[CURRENT, None]).max(axis=0)
+        lowest_voltage = voltage.min(axis=0)
+
+        short_circuit = ((highest_peak > self.short_circuit_current_ratio)
+                         & (lowest_voltage < self.short_circuit_voltage_ratio))
+        line_break = ((current.min(axis=0) < 1 - self.line_break_current_drop)
+                      & (lowest_voltage < 1 - self.line_break_voltage_drop))
+        overload = ((current.sum(axis=0) > 3 * (1 + self.overload_current_rise))
+                    & (highest_peak < self.short_circuit_current_ratio)
+                    & (lowest_voltage < 1 - self.overload_voltage_drop))
+
+        # Nested selects cost less per call than np.select on the one-sample chunks of a live feed
+        codes = np.where(short_circuit, SHORT_CIRCUIT,
+                         np.where(line_break, LINE_BREAK, np.where(overload, OVERLOAD, NORMAL)))
+        return codes, current, voltage
+
+    def _event(self, code, index, first_sample, current, voltage):
+        sample_index = first_sample + index
+        return {
+            'feeder_id': self.feeder_id,
+            'fault_type': FAULT_CLASSES[code],
+            'sample_index': int(sample_index),
+            'time_seconds': float(sample_index / self.sampling_rate),
+            'current_ratio': float(current[:, index].mean()),
+            'current_drop_ratio': float(1 - current[:, index].min()),
+            'voltage_drop_ratio': float(1 - voltage[:, index].min()),
+        }
+
+    def process(self, chunk):
+        """Consume a (6, m) chunk of new samples; returns the fault events it raised"""
+        x = np.asarray(chunk, dtype=np.float64)
+        if x.ndim != 2 or x.shape[0] != 6:
+            raise ValueError(f'Expected a (6, m) chunk, got shape {x.shape}')
+        m = x.shape[1]
+        if m == 0:
+            return []
+
+        first_sample = self.samples_seen
+        rms, peak = self._window_stats(x)
+        self.samples_seen += m
+        self.rms = rms[:, -1]
+        self.peak = peak[:, -1]
+
+        if self.baseline_rms is None:
+            if self.samples_seen >= self.warmup_samples:
+                self.baseline_rms = np.maximum(rms[:, -1], 1e-9)
+                self.baseline_peak = np.maximum(peak[:, -1], 1e-9)
+            return []
+
+        codes, current, voltage = self._classify(rms, peak)
+
+        # Walk the runs of equal candidate codes; there are only a few per chunk
+        events = []
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate([[0], boundaries])
+        stops = np.concatenate([boundaries, [m]])
+        for start, stop in zip(starts, stops):
+            code = int(codes[start])
+            before = self._run_length if code == self._run_code else 0
+            self._run_code = code
+            self._run_length = before + (stop - start)
+
+            if code == NORMAL:
+                if self.state != NORMAL and self._run_length >= self.clear_samples:
+                    self.state = NORMAL
+            elif code != self.state and self._run_length >= self.hold[code]:
+                index = start + max(0, self.hold[code] - before - 1)
+                events.append(self._event(code, index, first_sample, current, voltage))
+                self.state = code
+
+        # Track slow load changes while the feeder is quiet
+        if self.state == NORMAL and not codes.any():
+            alpha = min(1.0, m / self.baseline_samples)
+            self.baseline_rms += alpha * (rms.mean(axis=1) - self.baseline_rms)
+            self.baseline_peak += alpha * (peak.mean(axis=1) - self.baseline_peak)
+
+        return events
+
+
+class StreamDetector:
+    """Detectors for many feeders, created on first sight of each feeder"""
+
+    def __init__(self, **detector_options):
+        self.detector_options = detector_options
+        self.feeders = {}
+
+    def detector(self, feeder_id):
+        if feeder_id not in self.feeders:
+            self.feeders[feeder_id] = FeederDetector(feeder_id, **self.detector_options)
+        return self.feeders[feeder_id]
+
+    def process(self, feeder_id, chunk):
+        """Consume a (6, m) chunk for a feeder; returns the fault events it raised"""
+        return self.detector(feeder_id).process(chunk)
+
+    def states(self):
+        """Currently reported class of every feeder"""
+        return {feeder_id: detector.fault_type for feeder_id, detector in self.feeders.items()}
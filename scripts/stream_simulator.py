@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Live Feeder Stream Simulator
+Emits timestamped, continuous waveform chunks for every feeder to load-test ingest and detection
+"""
+
+import argparse
+import io
+import json
+import multiprocessing as mp
+import os
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from grid_synthesis import (
+    CURRENT, FAULT_CLASSES, PARAMETER_DISTRIBUTIONS, VOLTAGE, draw_parameter, generate_feeder_list, synthesize_normal,
+)
+
+# Same spawn key as the feeder stream of generate-dataset.py, so a seed yields the same feeders
+FEEDER_STREAM = 0
+SIMULATOR_STREAM = 3
+
+# Frame: magic, feeder id, active fault code, first sample index, timestamp of the
+# first sample (unix seconds), number of samples; followed by float32 (6, m) samples
+FRAME_MAGIC = b'KGWF'
+FRAME_HEADER = struct.Struct('<4s12sB3xqdI')
+
+# Faults start only after the stream has run this long, so detectors can learn a baseline
+FAULT_WARMUP_SECONDS = 1.0
+# How often the writer checks on the workers while it waits for frames
+WORKER_POLL_SECONDS = 1.0
+FAULT_TYPES = FAULT_CLASSES[1:]
+
+
+def encode_frame(feeder_id, fault_code, first_sample, timestamp, samples):
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    header = FRAME_HEADER.pack(FRAME_MAGIC, feeder_id.encode('ascii'), fault_code,
+                               first_sample, timestamp, samples.shape[1])
+    return header + samples.tobytes()
+
+
+def read_frames(stream):
+    """Decode frames from a binary stream; yields dicts with the (6, m) float32 samples"""
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        magic, feeder_id, fault_code, first_sample, timestamp, num_samples = FRAME_HEADER.unpack(header)
+        if magic != FRAME_MAGIC:
+            raise ValueError('Lost frame alignment in waveform stream')
+        payload = stream.read(6 * num_samples * 4)
+        yield {
+            'feeder_id': feeder_id.rstrip(b'\0').decode('ascii'),
+            'fault_type': FAULT_CLASSES[fault_code],
+            'first_sample': first_sample,
+            'timestamp': timestamp,
+            'samples': np.frombuffer(payload, dtype=np.float32).reshape(6, num_samples),
+        }
+
+
+def open_sink(spec):
+    """
+    Binary sink for the frame stream:
+    'tcp:HOST:PORT', 'unix:PATH', 'file:PATH', 'pipe' (stdout) or 'null'
+    Socket writes block when the receiver falls behind, which shows up as backpressure
+    """
+    kind, _, target = spec.partition(':')
+    if kind == 'tcp':
+        host, _, port = target.rpartition(':')
+        return socket.create_connection((host or 'localhost', int(port))).makefile('wb')
+    if kind == 'unix':
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target)
+        return sock.makefile('wb')
+    if kind == 'file':
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        return open(target, 'wb')
+    if kind == 'pipe':
+        return os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    if kind == 'null':
+        return open(os.devnull, 'wb')
+    raise ValueError(f'Unknown sink {spec!r}')
+
+
+def _fault_gains(fault, first_sample, num_samples, t, sampling_rate, fundamental_freq=50):
+    """
+    Current gain, voltage gain and additive current for one feeder's chunk,
+    following the fault shapes of grid_synthesis; transients are timed in seconds
+    """
+    offset = first_sample + np.arange(num_samples) - fault['start']
+    active = (offset >= 0) & (offset < fault['length'])
+    offset = np.clip(offset, 0, None)
+
+    current = np.ones(num_samples)
+    voltage = np.ones(num_samples)
+    added = np.zeros(num_samples)
+    if fault['type'] == 'LINE_BREAK':
+        # 5 ms long, decaying over 1 ms
+        transient = np.where(offset < 0.005 * sampling_rate, 1 + 0.3 * np.exp(-offset / (0.001 * sampling_rate))
+                             * np.sin(2 * np.pi * 100 * offset / sampling_rate), 1.0)
+        current = np.where(active, fault['current'] * transient, 1.0)
+        voltage = np.where(active, fault['voltage'], 1.0)
+    elif fault['type'] == 'SHORT_CIRCUIT':
+        # 10 ms long
+        transient = np.where(offset < 0.01 * sampling_rate,
+                             1 + 0.5 * np.sin(2 * np.pi * 1000 * offset / sampling_rate), 1.0)
+        current = np.where(active, fault['current'] * transient, 1.0)
+        voltage = np.where(active, fault['voltage'], 1.0)
+    elif fault['type'] == 'OVERLOAD':
+        ramp = 1.0 + offset / fault['length'] * fault['increase'] + 0.1 * np.sin(2 * np.pi * 0.5 * offset / sampling_rate)
+        current = np.where(active, ramp, 1.0)
+        voltage = np.where(active, fault['voltage'], 1.0)
+        harmonics = sum(0.1 * np.sin(2 * np.pi * fundamental_freq * h * t) for h in [3, 5, 7, 9, 11]
+                        if h * fundamental_freq < sampling_rate / 2)
+        added = np.where(active, harmonics, 0.0)
+    return current, voltage, added
+
+
+def _draw_fault(fault_type, start, length, rng):
+    """Fault gains drawn from the same default distributions as the dataset generator"""
+    fault = {'type': fault_type, 'start': start, 'length': length}
+    distributions = PARAMETER_DISTRIBUTIONS[fault_type]
+    if fault_type == 'LINE_BREAK':
+        fault.update(current=draw_parameter(distributions['drop_factor'], None, rng),
+                     voltage=draw_parameter(distributions['voltage_drop'], None, rng))
+    elif fault_type == 'SHORT_CIRCUIT':
+        fault.update(current=draw_parameter(distributions['current_multiplier'], None, rng),
+                     voltage=draw_parameter(distributions['voltage_drop'], None, rng))
+    else:
+        fault.update(increase=draw_parameter(distributions['overload_increase'], None, rng),
+                     voltage=draw_parameter(distributions['voltage_drop'], None, rng))
+    return fault
+
+
+def _simulate_worker(job, frames, stop, ready):
+    """
+    Worker process: synthesizes one tick for all of its feeders at once, encodes a frame per
+    feeder and hands the tick's frames to the writer through a bounded queue
+    Always ends with a ('done', stats) or ('error', traceback) message, so the writer never waits on it
+    """
+    stats = {'ticks': 0, 'blocked_seconds': 0.0, 'max_lag_seconds': 0.0, 'dropped_ticks': 0}
+    error = None
+    try:
+        seed = np.random.SeedSequence(job['seed'], spawn_key=(SIMULATOR_STREAM, job['index']))
+        rng = np.random.default_rng(seed)
+        feeder_ids = job['feeder_ids']
+        sampling_rate = job['sampling_rate']
+        m = job['chunk_samples']
+        base_current = rng.uniform(30, 60, size=len(feeder_ids))
+        fault_probability = job['fault_rate_per_hour'] * m / sampling_rate / 3600
+        fault_length = int(job['fault_duration_seconds'] * sampling_rate)
+        warmup = int(FAULT_WARMUP_SECONDS * sampling_rate)
+        active = {}
+
+        ready.wait()
+        wall_start = time.perf_counter()
+        for tick in range(job['num_ticks']):
+            if stop.is_set():
+                break
+            first = tick * m
+            t = (first + np.arange(m)) / sampling_rate
+            waveforms = synthesize_normal(len(feeder_ids), t, rng, base_current=base_current,
+                                          max_frequency=sampling_rate / 2)
+
+            faults = []
+            if first >= warmup:
+                starting = np.flatnonzero(rng.random(len(feeder_ids)) < fault_probability)
+                for i in starting:
+                    if i not in active:
+                        start = first + int(rng.integers(m))
+                        active[i] = _draw_fault(str(rng.choice(FAULT_TYPES)), start, fault_length, rng)
+                        faults.append({'feeder_id': feeder_ids[i], 'fault_type': active[i]['type'],
+                                       'sample_index': start})
+
+            codes = np.zeros(len(feeder_ids), dtype=int)
+            for i, fault in list(active.items()):
+                current, voltage, added = _fault_gains(fault, first, m, t, sampling_rate)
+                waveforms[i, CURRENT] = waveforms[i, CURRENT] * current + added
+                waveforms[i, VOLTAGE] *= voltage
+                if first + m > fault['start']:
+                    codes[i] = FAULT_CLASSES.index(fault['type'])
+                if first + m >= fault['start'] + fault['length']:
+                    del active[i]
+
+            timestamp = job['start_time'] + first / sampling_rate
+            payload = b''.join(
+                encode_frame(feeder_id, codes[i], first, timestamp, waveforms[i])
+                for i, feeder_id in enumerate(feeder_ids)
+            )
+
+            # Real-time pacing: wait for the tick's wall-clock slot, or record how late it is
+            if job['speed'] > 0:
+                due = wall_start + (tick + 1) * m / sampling_rate / job['speed']
+                lag = time.perf_counter() - due
+                if lag < 0:
+                    time.sleep(-lag)
+                stats['max_lag_seconds'] = max(stats['max_lag_seconds'], lag)
+
+            blocked = time.perf_counter()
+            try:
+                frames.put(('tick', payload, len(feeder_ids) * m, faults), block=not job['drop_when_full'])
+            except queue.Full:
+                stats['dropped_ticks'] += 1
+            stats['blocked_seconds'] += time.perf_counter() - blocked
+            stats['ticks'] += 1
+    except BaseException:
+        error = traceback.format_exc()
+        # Release the writer and the other workers if this one fails before the clock starts
+        ready.abort()
+        raise
+    finally:
+        frames.put(('error', error) if error else ('done', stats))
+
+
+def _next_message(frames, processes):
+    """Next message from the workers; a worker that exits without reporting becomes a RuntimeError"""
+    while True:
+        try:
+            return frames.get(timeout=WORKER_POLL_SECONDS)
+        except queue.Empty:
+            for process in processes:
+                if process.exitcode not in (None, 0):
+                    raise RuntimeError(f'Stream worker {process.name} exited with code {process.exitcode}')
+
+
+def simulate(sink='null', feeders=None, duration_seconds=10.0, chunk_seconds=0.1, sampling_rate=10000,
+             speed=1.0, workers=1, fault_rate_per_hour=6.0, fault_duration_seconds=2.0, seed=None,
+             queue_size=8, drop_when_full=False, detect=False, report_interval=5.0):
+    """
+    Stream every feeder for duration_seconds of simulated time; returns the run report
+    speed is the multiple of real time to pace at, 0 for as fast as possible
+    Raises RuntimeError when a worker fails or dies
+    """
+    seed = np.random.SeedSequence(seed).entropy
+    if feeders is None:
+        feeders = generate_feeder_list(np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(FEEDER_STREAM,))))
+    feeder_ids = [feeder['id'] if isinstance(feeder, dict) else feeder for feeder in feeders]
+    chunk_samples = max(1, int(chunk_seconds * sampling_rate))
+    workers = max(1, min(workers, len(feeder_ids)))
+
+    context = mp.get_context('spawn')
+    frames = context.Queue(maxsize=queue_size)
+    stop = context.Event()
+    # Workers and the writer start the clock together, after every process has started up
+    ready = context.Barrier(workers + 1)
+    base = {
+        'seed': seed, 'sampling_rate': sampling_rate, 'chunk_samples': chunk_samples,
+        'num_ticks': int(np.ceil(duration_seconds * sampling_rate / chunk_samples)),
+        'speed': speed, 'fault_rate_per_hour': fault_rate_per_hour,
+        'fault_duration_seconds': fault_duration_seconds, 'drop_when_full': drop_when_full,
+        'start_time': time.time(),
+    }
+    processes = [
+        context.Process(target=_simulate_worker, args=({**base, 'index': w, 'feeder_ids': feeder_ids[w::workers]},
+                                                       frames, stop, ready), daemon=True)
+        for w in range(workers)
+    ]
+
+    detector = None
+    if detect:
+        from stream_detector import StreamDetector
+        detector = StreamDetector(sampling_rate=sampling_rate)
+
+    report = {
+        'feeders': len(feeder_ids), 'workers': workers, 'sampling_rate': sampling_rate, 'speed': speed, 'seed': seed,
+        'target_samples_per_second': len(feeder_ids) * sampling_rate * speed if speed > 0 else None,
+        'samples': 0, 'bytes': 0, 'write_seconds': 0.0, 'detect_seconds': 0.0,
+        'injected_faults': [], 'detected_faults': [], 'workers_stats': [],
+    }
+    out = open_sink(sink)
+    start = time.perf_counter()
+    try:
+        for process in processes:
+            process.start()
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            # A worker failed while starting up; its error is waiting in the queue
+            pass
+        start = last_report = time.perf_counter()
+        finished = 0
+        while finished < workers:
+            kind, *item = _next_message(frames, processes)
+            if kind == 'error':
+                raise RuntimeError(f'Stream worker failed:\n{item[0]}')
+            if kind == 'done':
+                finished += 1
+                report['workers_stats'].append(item[0])
+                continue
+            payload, samples, faults = item
+
+            began = time.perf_counter()
+            out.write(payload)
+            report['write_seconds'] += time.perf_counter() - began
+            report['samples'] += samples
+            report['bytes'] += len(payload)
+            report['injected_faults'] += faults
+
+            if detector is not None:
+                began = time.perf_counter()
+                for frame in read_frames(io.BytesIO(payload)):
+                    report['detected_faults'] += detector.process(frame['feeder_id'], frame['samples'])
+                report['detect_seconds'] += time.perf_counter() - began
+
+            now = time.perf_counter()
+            if report_interval and now - last_report >= report_interval:
+                print(f"  {report['samples'] / (now - start):,.0f} samples/s, "
+                      f"sink writes {report['write_seconds']:.1f}s", file=sys.stderr)
+                last_report = now
+        out.flush()
+    except (KeyboardInterrupt, BrokenPipeError):
+        # Interrupted or the receiver went away: report what was streamed so far
+        pass
+    finally:
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for process in processes:
+            process.join(timeout=5)
+            # A worker stuck on a full queue has nobody left to drain it
+            if process.is_alive():
+                process.terminate()
+        try:
+            out.close()
+        except BrokenPipeError:
+            pass
+
+    worker_stats = report.pop('workers_stats')
+    report.update({
+        'seconds': elapsed,
+        'samples_per_second': report['samples'] / elapsed if elapsed > 0 else 0.0,
+        'megabytes_per_second': report['bytes'] / elapsed / 1e6 if elapsed > 0 else 0.0,
+        # Time workers spent waiting on a full queue: the sink or detector is the bottleneck
+        'producer_blocked_seconds': sum(s['blocked_seconds'] for s in worker_stats),
+        'max_lag_seconds': max((s['max_lag_seconds'] for s in worker_stats), default=0.0),
+        'dropped_ticks': sum(s['dropped_ticks'] for s in worker_stats),
+    })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream live waveform chunks for every Kerala feeder')
+    parser.add_argument('--sink', default='null',
+                        help="tcp:HOST:PORT, unix:PATH, file:PATH, pipe (stdout) or null")
+    parser.add_argument('--duration', type=float, default=10.0, help='Simulated seconds per feeder')
+    parser.add_argument('--chunk-seconds', type=float, default=0.1, help='Length of each emitted chunk')
+    parser.add_argument('--sampling-rate', type=int, default=10000, help='Samples per second of every feeder')
+    parser.add_argument('--speed', type=float, default=1.0, help='Multiple of real time, 0 for unpaced')
+    parser.add_argument('--feeders', type=int, default=None, help='Stream only the first N feeders')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--fault-rate', type=float, default=6.0, help='Faults per feeder per hour')
+    parser.add_argument('--fault-duration', type=float, default=2.0, help='Seconds each fault lasts')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--queue-size', type=int, default=8, help='Ticks buffered between workers and the sink')
+    parser.add_argument('--drop-when-full', action='store_true', help='Drop ticks instead of blocking producers')
+    parser.add_argument('--detect', action='store_true', help='Run the streaming detector on every chunk')
+    parser.add_argument('--report', default=None, help='Write the run report as JSON')
+    args = parser.parse_args()
+
+    seed = np.random.SeedSequence(args.seed).entropy
+    feeders = generate_feeder_list(np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(FEEDER_STREAM,))))
+    if args.feeders:
+        feeders = feeders[:args.feeders]
+
+    print(f"📡 Streaming {len(feeders)} feeders to {args.sink} ({args.workers} workers)", file=sys.stderr)
+    report = simulate(
+        args.sink, feeders, args.duration, args.chunk_seconds, args.sampling_rate, args.speed, args.workers,
+        args.fault_rate, args.fault_duration, seed, args.queue_size, args.drop_when_full, args.detect,
+    )
+
+    print(f"✅ {report['samples']:,} samples in {report['seconds']:.1f}s: "
+          f"{report['samples_per_second']:,.0f} samples/s ({report['megabytes_per_second']:.1f} MB/s)",
+          file=sys.stderr)
+    if report['target_samples_per_second']:
+        print(f"Target: {report['target_samples_per_second']:,.0f} samples/s, "
+              f"max lag {report['max_lag_seconds']:.3f}s", file=sys.stderr)
+    print(f"Backpressure: producers blocked {report['producer_blocked_seconds']:.1f}s, "
+          f"sink writes {report['write_seconds']:.1f}s, {report['dropped_ticks']} ticks dropped", file=sys.stderr)
+    print(f"Faults injected: {len(report['injected_faults'])}", file=sys.stderr)
+    if args.detect:
+        print(f"Faults detected: {len(report['detected_faults'])} ({report['detect_seconds']:.1f}s detecting)",
+              file=sys.stderr)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report saved to {args.report}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,16 +6,36 @@ Trains a simple neural network on the generated dataset
 
 import json
 import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.neural_network import MLPClassifier
-from sklearn.metrics import classification_report, confusion_matrix
-import joblib
 import os
+import argparse
+import itertools
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 
-def load_dataset():
+from compact_model import predict_proba, read_compact_model, write_compact_model
+from grid_features import FEATURE_SETS
+from grid_synthesis import FAULT_CLASSES
+
+# Class codes the model is trained on, in the order of the exported class list
+LABEL_CODES = {name: code for code, name in enumerate(FAULT_CLASSES)}
+
+def load_dataset(store_path=None, feature_set='basic'):
     """Load the generated dataset"""
+    import pandas as pd
+    
+    if store_path:
+        from grid_features import extract_features
+        from waveform_store import WaveformStore
+        
+        # Compute features straight from the memory-mapped waveform store
+        if not WaveformStore.exists(store_path):
+            print(f"Waveform store not found at {store_path}. Please run generate-dataset.py first.")
+            return None
+        store = WaveformStore(store_path)
+        return extract_features(store, feature_set, store.manifest['sampling_rate'])
+    
     try:
         with open('data/kerala_grid_features_10k.csv', 'r') as f:
             df = pd.read_csv(f)
@@ -24,34 +44,30 @@ def load_dataset():
         print("Dataset not found. Please run generate-dataset.py first.")
         return None
 
-def prepare_data(df):
+def prepare_data(df, feature_set='basic'):
     """Prepare data for training"""
     # Select features
-    feature_columns = [
-        'current_rms_r', 'current_rms_y', 'current_rms_b',
-        'voltage_rms_r', 'voltage_rms_y', 'voltage_rms_b',
-        'current_peak_r', 'current_peak_y', 'current_peak_b',
-        'voltage_peak_r', 'voltage_peak_y', 'voltage_peak_b',
-        'current_unbalance', 'voltage_unbalance',
-        'current_drop_ratio', 'voltage_drop_ratio'
-    ]
+    feature_columns = list(FEATURE_SETS[feature_set])
     
     X = df[feature_columns].values
     y = df['label'].values
     
     # Encode labels
-    label_map = {'NORMAL': 0, 'LINE_BREAK': 1, 'SHORT_CIRCUIT': 2, 'OVERLOAD': 3}
-    y_encoded = np.array([label_map[label] for label in y])
+    y_encoded = np.array([LABEL_CODES[label] for label in y])
     
     return X, y_encoded, feature_columns
 
-def train_model():
+def train_model(store_path=None, feature_set='basic', compact_dtype='float32'):
     """Train the ML model"""
+    from sklearn.model_selection import train_test_split
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import StandardScaler
+    
     print("🚀 Training ML Model for Kerala Line Break Detection")
     print("=" * 50)
     
     # Load data
-    df = load_dataset()
+    df = load_dataset(store_path, feature_set)
     if df is None:
         return
     
@@ -59,7 +75,7 @@ def train_model():
     print(f"📊 Classes: {df['label'].value_counts().to_dict()}")
     
     # Prepare data
-    X, y, feature_columns = prepare_data(df)
+    X, y, feature_columns = prepare_data(df, feature_set)
     
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -97,12 +113,11 @@ def train_model():
     # Predictions
     y_pred = model.predict(X_test_scaled)
     
-    # Classification report
-    class_names = ['NORMAL', 'LINE_BREAK', 'SHORT_CIRCUIT', 'OVERLOAD']
-    print("\n📊 Classification Report:")
-    print(classification_report(y_test, y_pred, target_names=class_names))
-    
-    # Save model and scaler
+    save_model(model, scaler, feature_columns, compact_dtype, X_test, y_test)
+    save_metrics(y_test, y_pred, test_score, len(df), len(X_train), len(X_test))
+
+def save_model(model, scaler, feature_columns, compact_dtype='float32', X_check=None, y_check=None):
+    """Save model and scaler in the JSON format and the compact binary format read by the server"""
     os.makedirs('server/ml', exist_ok=True)
     
     # Save model (simplified for demo)
@@ -128,11 +143,43 @@ def train_model():
     with open('server/ml/scaler.json', 'w') as f:
         json.dump(scaler_data, f, indent=2)
     
+    # Compact binary copy: one file, no JSON number parsing at server start
+    write_compact_model(
+        'server/ml/model.bin', model.coefs_, model.intercepts_, scaler.mean_, scaler.scale_,
+        feature_columns, model.classes_, compact_dtype,
+    )
+    
     print("\n✅ Model saved to server/ml/model.json")
     print("✅ Scaler saved to server/ml/scaler.json")
+    print(f"✅ Compact {compact_dtype} model saved to server/ml/model.bin "
+          f"({os.path.getsize('server/ml/model.bin')} bytes)")
+    
+    if X_check is not None:
+        check_compact_model(model, scaler, 'server/ml/model.bin', X_check, y_check)
+
+def check_compact_model(model, scaler, path, X, y):
+    """Compare the exported compact model against the trained float64 model"""
+    compact = read_compact_model(path)
+    reference = model.predict(scaler.transform(X))
+    predicted = model.classes_[predict_proba(compact, X).argmax(axis=1)]
+    
+    agreement = float(np.mean(predicted == reference))
+    reference_accuracy = float(np.mean(reference == y))
+    compact_accuracy = float(np.mean(predicted == y))
+    print(f"🔎 Compact model check: {agreement:.4f} agreement, "
+          f"accuracy {compact_accuracy:.4f} vs {reference_accuracy:.4f}")
+    if reference_accuracy - compact_accuracy > 0.01:
+        print("⚠️  Compact model loses more than 1% accuracy; consider --compact-dtype float32")
+    return agreement, compact_accuracy
+
+def save_metrics(y_test, y_pred, test_score, dataset_size, training_samples, test_samples):
+    """Print the classification report and save metrics.json"""
+    from sklearn.metrics import classification_report, precision_recall_fscore_support
+    
+    print("\n📊 Classification Report:")
+    print(classification_report(y_test, y_pred, labels=range(len(FAULT_CLASSES)), target_names=FAULT_CLASSES))
     
     # Calculate metrics
-    from sklearn.metrics import precision_recall_fscore_support
     precision, recall, f1, support = precision_recall_fscore_support(y_test, y_pred, average='weighted')
     
     metrics = {
@@ -141,9 +188,9 @@ def train_model():
         'recall': float(recall),
         'f1_score': float(f1),
         'false_positive_rate': float(1 - recall),  # Simplified
-        'dataset_size': len(df),
-        'training_samples': len(X_train),
-        'test_samples': len(X_test)
+        'dataset_size': dataset_size,
+        'training_samples': training_samples,
+        'test_samples': test_samples
     }
     
     with open('server/ml/metrics.json', 'w') as f:
@@ -152,5 +199,293 @@ def train_model():
     print(f"\n🎉 Model training completed!")
     print(f"📊 Final Metrics: {metrics}")
 
+def _is_test_row(sample_ids, test_size=0.2):
+    """Stable train/test assignment from the sample id, independent of chunking"""
+    hashed = (np.asarray(sample_ids, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2**32)
+    return hashed < np.uint64(test_size * 2**32)
+
+def _spill_features(features_path, feature_columns, chunk_size, spill_dir):
+    """
+    Stream the features CSV once: fit the scaler incrementally and spill raw
+    train/test rows to float32 files on disk
+    """
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    
+    scaler = StandardScaler()
+    counts = {'train': 0, 'test': 0}
+    class_counts = {}
+    
+    files = {
+        split: (open(os.path.join(spill_dir, f'X_{split}.f32'), 'wb'),
+                open(os.path.join(spill_dir, f'y_{split}.i8'), 'wb'))
+        for split in counts
+    }
+    try:
+        for chunk in pd.read_csv(features_path, chunksize=chunk_size):
+            X = chunk[feature_columns].to_numpy(dtype=np.float32)
+            y = chunk['label'].map(LABEL_CODES).to_numpy(dtype=np.int8)
+            test = _is_test_row(chunk['sample_id'])
+            for label, count in chunk['label'].value_counts().items():
+                class_counts[label] = class_counts.get(label, 0) + int(count)
+            
+            scaler.partial_fit(X[~test])
+            for split, mask in [('train', ~test), ('test', test)]:
+                X_file, y_file = files[split]
+                X_file.write(X[mask].tobytes())
+                y_file.write(y[mask].tobytes())
+                counts[split] += int(mask.sum())
+    finally:
+        for X_file, y_file in files.values():
+            X_file.close()
+            y_file.close()
+    
+    def open_split(split):
+        shape = (counts[split], len(feature_columns))
+        if not counts[split]:
+            return np.empty(shape, dtype=np.float32), np.empty(0, dtype=np.int8)
+        X = np.memmap(os.path.join(spill_dir, f'X_{split}.f32'), dtype=np.float32, mode='r', shape=shape)
+        y = np.fromfile(os.path.join(spill_dir, f'y_{split}.i8'), dtype=np.int8)
+        return X, y
+    
+    return scaler, open_split('train'), open_split('test'), class_counts
+
+def _chunked_predict(model, scaler, X, chunk_size):
+    """Predict over a memory-mapped matrix one chunk at a time"""
+    return np.concatenate([
+        model.predict(scaler.transform(X[i:i + chunk_size])) for i in range(0, len(X), chunk_size)
+    ]) if len(X) else np.empty(0, dtype=int)
+
+def train_model_streaming(features_path='data/kerala_grid_features_10k.csv', feature_set='basic',
+                          chunk_size=50000, epochs=30, block_size=256, seed=42, compact_dtype='float32'):
+    """
+    Train out-of-core: the scaler is fitted incrementally and the MLP is trained
+    with partial_fit over epochs of shuffled chunks, never holding the dataset in memory
+    """
+    from sklearn.neural_network import MLPClassifier
+    
+    print("🚀 Training ML Model for Kerala Line Break Detection (streaming)")
+    print("=" * 50)
+    
+    if not os.path.exists(features_path):
+        print("Dataset not found. Please run generate-dataset.py first.")
+        return
+    
+    feature_columns = list(FEATURE_SETS[feature_set])
+    rng = np.random.default_rng(seed)
+    
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(features_path) or '.') as spill_dir:
+        scaler, (X_train, y_train), (X_test, y_test), class_counts = _spill_features(
+            features_path, feature_columns, chunk_size, spill_dir
+        )
+        print(f"📊 Dataset streamed: {len(X_train) + len(X_test)} samples")
+        print(f"📊 Classes: {class_counts}")
+        
+        print("\n🤖 Training Neural Network...")
+        model = MLPClassifier(
+            hidden_layer_sizes=(64, 32),
+            activation='relu',
+            solver='adam',
+            alpha=0.001,
+            batch_size=32,
+            random_state=seed
+        )
+        classes = np.arange(len(FAULT_CLASSES))
+        
+        # Rows are class-ordered on disk, so each training chunk gathers randomly
+        # chosen fixed-size blocks from across the whole file
+        num_blocks = -(-len(X_train) // block_size)
+        blocks_per_chunk = max(1, chunk_size // block_size)
+        for epoch in range(epochs):
+            order = rng.permutation(num_blocks)
+            for start in range(0, num_blocks, blocks_per_chunk):
+                rows = np.concatenate([
+                    np.arange(b * block_size, min((b + 1) * block_size, len(X_train)))
+                    for b in order[start:start + blocks_per_chunk]
+                ])
+                rows = rng.permutation(rows)
+                model.partial_fit(scaler.transform(X_train[rows]), y_train[rows], classes=classes)
+            print(f"  Epoch {epoch+1}/{epochs}: loss {model.loss_:.4f}")
+        
+        # Evaluate model
+        print("\n📈 Evaluating Model...")
+        train_score = float(np.mean(_chunked_predict(model, scaler, X_train, chunk_size) == y_train))
+        y_pred = _chunked_predict(model, scaler, X_test, chunk_size)
+        test_score = float(np.mean(y_pred == y_test))
+        
+        print(f"Training Accuracy: {train_score:.4f}")
+        print(f"Test Accuracy: {test_score:.4f}")
+        
+        save_model(model, scaler, feature_columns, compact_dtype, X_test[:chunk_size], y_test[:chunk_size])
+        save_metrics(y_test, y_pred, test_score, len(X_train) + len(X_test), len(X_train), len(X_test))
+
+# Hyperparameter search space for sweep mode
+SEARCH_SPACE = {
+    'hidden_layer_sizes': [(32,), (64, 32), (128, 64), (64, 32, 16)],
+    'alpha': [1e-4, 1e-3, 1e-2],
+    'batch_size': [32, 64, 128],
+    'learning_rate_init': [1e-3, 3e-3, 1e-2],
+}
+
+_sweep_data = {}
+
+def _init_sweep_worker(X_fit, y_fit, X_val, y_val):
+    """Process pool initializer: ship the training data to each worker once"""
+    _sweep_data.update(X_fit=X_fit, y_fit=y_fit, X_val=X_val, y_val=y_val)
+
+def _run_trial(job):
+    """
+    Train one candidate for up to some more epochs
+    Returns the model, its validation accuracy, the training time and the epochs actually run
+    
+    A warm-start fit keeps the weights but starts a fresh adam optimizer, so every round
+    resets the moment estimates and the bias correction; the rounds are few and every
+    candidate pays the same restart, so the comparison between them stays fair
+    """
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.neural_network import MLPClassifier
+    
+    params, model, epochs, seed = job
+    if model is None:
+        model = MLPClassifier(activation='relu', solver='adam', warm_start=True, random_state=seed, **params)
+    model.set_params(max_iter=epochs)
+    
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        # Short budgets stop before convergence on purpose
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        model.fit(_sweep_data['X_fit'], _sweep_data['y_fit'])
+    elapsed = time.perf_counter() - start
+    
+    # n_iter_ counts the epochs of this fit only, fewer than asked when n_iter_no_change stopped it
+    return model, model.score(_sweep_data['X_val'], _sweep_data['y_val']), elapsed, model.n_iter_
+
+def _sweep_candidates(mode, trials, rng):
+    """Grid of every combination, or a random subset of it"""
+    keys = list(SEARCH_SPACE)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    if mode == 'grid':
+        return grid
+    return [grid[i] for i in rng.choice(len(grid), size=min(trials, len(grid)), replace=False)]
+
+def sweep_model(feature_set='basic', mode='random', trials=16, workers=None,
+                min_epochs=10, max_epochs=270, eta=3, seed=42, compact_dtype='float32'):
+    """
+    Parallel hyperparameter sweep with successive halving
+    Every round trains the surviving candidates for a larger epoch budget and keeps the best 1/eta
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    
+    print("🚀 Hyperparameter Sweep for Kerala Line Break Detection")
+    print("=" * 50)
+    
+    df = load_dataset(None, feature_set)
+    if df is None:
+        return
+    
+    X, y, feature_columns = prepare_data(df, feature_set)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=seed, stratify=y_train
+    )
+    scaler = StandardScaler()
+    X_fit = scaler.fit_transform(X_fit)
+    X_val = scaler.transform(X_val)
+    
+    candidates = [
+        {'id': i + 1, 'params': params, 'model': None, 'epochs': 0, 'train_time': 0.0, 'val_accuracy': None,
+         'rounds': []}
+        for i, params in enumerate(_sweep_candidates(mode, trials, np.random.default_rng(seed)))
+    ]
+    print(f"📊 {len(candidates)} candidates, {len(X_fit)} training / {len(X_val)} validation samples")
+    
+    trials_report = []
+    survivors = candidates
+    budget = min_epochs
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                             initargs=(X_fit, y_fit, X_val, y_val)) as pool:
+        while True:
+            # Each round continues the surviving models up to the new total budget
+            jobs = [(c['params'], c['model'], budget - c['epochs'], seed) for c in survivors]
+            for candidate, (model, accuracy, elapsed, epochs) in zip(survivors, pool.map(_run_trial, jobs)):
+                candidate.update(model=model, val_accuracy=accuracy)
+                candidate['epochs'] += epochs
+                candidate['train_time'] += elapsed
+                candidate['rounds'].append({'budget': budget, 'epochs': candidate['epochs'], 'val_accuracy': accuracy})
+            
+            print(f"\n🔁 Round at {budget} epochs: {len(survivors)} candidates")
+            # Best accuracy first, faster training breaks ties
+            survivors = sorted(survivors, key=lambda c: (-c['val_accuracy'], c['train_time']))
+            for c in survivors:
+                print(f"  #{c['id']:>3} acc {c['val_accuracy']:.4f}  time {c['train_time']:6.1f}s  {c['params']}")
+            
+            if len(survivors) == 1 or budget >= max_epochs:
+                break
+            
+            # Drop the weakest configurations
+            keep = max(1, len(survivors) // eta)
+            for c in survivors[keep:]:
+                trials_report.append(c)
+                c['model'] = None
+            survivors = survivors[:keep]
+            budget = min(budget * eta, max_epochs)
+    
+    trials_report.extend(survivors)
+    best = survivors[0]
+    model = best['model']
+    
+    print(f"\n🏆 Best candidate #{best['id']}: {best['params']}")
+    X_test_scaled = scaler.transform(X_test)
+    y_pred = model.predict(X_test_scaled)
+    test_score = model.score(X_test_scaled, y_test)
+    print(f"Test Accuracy: {test_score:.4f}")
+    
+    os.makedirs('server/ml', exist_ok=True)
+    with open('server/ml/sweep.json', 'w') as f:
+        json.dump([
+            {
+                'id': c['id'],
+                'params': c['params'],
+                'epochs': c['epochs'],
+                'val_accuracy': c['val_accuracy'],
+                'train_time_seconds': round(c['train_time'], 3),
+                'rounds': c['rounds'],
+            }
+            for c in sorted(trials_report, key=lambda c: c['id'])
+        ], f, indent=2)
+    print("✅ Sweep results saved to server/ml/sweep.json")
+    
+    save_model(model, scaler, feature_columns, compact_dtype, X_test, y_test)
+    save_metrics(y_test, y_pred, test_score, len(df), len(X_fit), len(X_test))
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the Kerala line break detection model')
+    parser.add_argument('--store', default=None,
+                        help='Train from a waveform store directory instead of the features CSV')
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default='basic',
+                        help='Feature columns to train on')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Train out-of-core with partial_fit over chunks of the features CSV')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='Rows per streamed chunk')
+    parser.add_argument('--epochs', type=int, default=30, help='Passes over the data in streaming mode')
+    parser.add_argument('--sweep', choices=['grid', 'random'], default=None,
+                        help='Run a hyperparameter sweep and export the best model')
+    parser.add_argument('--trials', type=int, default=16, help='Candidates in a random sweep')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for the sweep')
+    parser.add_argument('--compact-dtype', choices=['float32', 'int8'], default='float32',
+                        help='Weight type of the compact server/ml/model.bin export')
+    args = parser.parse_args()
+    
+    if args.sweep:
+        sweep_model(args.feature_set, args.sweep, args.trials, args.workers, compact_dtype=args.compact_dtype)
+    elif args.streaming:
+        train_model_streaming(feature_set=args.feature_set, chunk_size=args.chunk_size, epochs=args.epochs,
+                              compact_dtype=args.compact_dtype)
+    else:
+        train_model(args.store, args.feature_set, args.compact_dtype)
+
 if __name__ == '__main__':
-    train_model()
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Chunked Waveform Store
+Waveforms as float32 .npy chunks of shape (N, 6, T), per-sample metadata as CSV
+An optional index adds one contiguous, sorted waveform file for zero-copy queries
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from grid_synthesis import CHANNELS
+
+STORE_VERSION = 1
+MANIFEST = 'manifest.json'
+
+METADATA_COLUMNS = [
+    'sample_id', 'label', 'feeder_id', 'feeder_name', 'district',
+    'area_type', 'typical_load_kw', 'timestamp',
+]
+# Fault parameters, empty for classes they do not apply to
+PARAM_COLUMNS = ['break_location_km', 'fault_location_km', 'overload_percentage']
+
+# Indexed layout: samples sorted by label, district, feeder and time, so that selections
+# on a prefix of these fields and a time range are a few contiguous runs
+INDEX_WAVEFORMS = 'waveforms-indexed.npy'
+INDEX_METADATA = 'metadata-indexed.csv'
+INDEX_ARRAYS = 'index.npz'
+INDEX_CATEGORIES = ['label', 'district', 'feeder_id', 'area_type']
+
+
+def samples_to_arrays(samples):
+    """Convert sample dicts into an (N, 6, T) float32 array and a metadata table"""
+    waveforms = np.array([[sample[channel] for channel in CHANNELS] for sample in samples], dtype=np.float32)
+    metadata = pd.DataFrame(
+        [{column: sample.get(column) for column in METADATA_COLUMNS + PARAM_COLUMNS} for sample in samples],
+        columns=METADATA_COLUMNS + PARAM_COLUMNS,
+    )
+    return waveforms, metadata
+
+
+def iter_samples(waveforms, metadata, sampling_rate, duration_seconds):
+    """Yield samples in the dict layout of the generator, channels as array views"""
+    for waveform, row in zip(waveforms, metadata.to_dict('records')):
+        sample = {key: value for key, value in row.items() if not pd.isna(value)}
+        sample.update(zip(CHANNELS, waveform))
+        sample['sampling_rate'] = sampling_rate
+        sample['duration_seconds'] = duration_seconds
+        yield sample
+
+
+def write_chunk(store_dir, chunk_index, waveforms, metadata):
+    """Write one chunk of waveforms and its metadata; returns the manifest entry"""
+    os.makedirs(store_dir, exist_ok=True)
+    waveform_file = f'waveforms-{chunk_index:05d}.npy'
+    metadata_file = f'metadata-{chunk_index:05d}.csv'
+
+    np.save(os.path.join(store_dir, waveform_file), np.asarray(waveforms, dtype=np.float32))
+    metadata.to_csv(os.path.join(store_dir, metadata_file), index=False)
+
+    return {
+        'index': chunk_index,
+        'waveforms': waveform_file,
+        'metadata': metadata_file,
+        'num_samples': len(metadata),
+    }
+
+
+def write_manifest(store_dir, chunks, sampling_rate, duration_seconds, **attrs):
+    """Write the manifest that ties the chunk files of a store together"""
+    manifest = {
+        'version': STORE_VERSION,
+        'channels': CHANNELS,
+        'dtype': 'float32',
+        'sampling_rate': sampling_rate,
+        'duration_seconds': duration_seconds,
+        'num_samples': sum(chunk['num_samples'] for chunk in chunks),
+        'chunks': sorted(chunks, key=lambda chunk: chunk['index']),
+        **attrs,
+    }
+    with open(os.path.join(store_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def build_index(store_dir):
+    """
+    Write the indexed layout of a store: every waveform in one fixed-stride float32 file,
+    sorted by (label, district, feeder_id, timestamp), plus coded index arrays
+    Chunks are copied one at a time, so memory stays bounded by the chunk size
+    """
+    store = WaveformStore(store_dir)
+    metadata = store.metadata()
+    num_samples = len(metadata)
+
+    arrays = {}
+    for column in INDEX_CATEGORIES:
+        categorical = pd.Categorical(metadata[column].astype(str))
+        arrays[column] = categorical.codes.astype(np.int32)
+        arrays[f'{column}_categories'] = np.asarray(categorical.categories, dtype=str)
+    arrays['timestamp'] = pd.to_datetime(metadata['timestamp']).to_numpy().astype('datetime64[s]')
+    arrays['sample_id'] = metadata['sample_id'].to_numpy(dtype=np.int64)
+
+    order = np.lexsort((arrays['timestamp'], arrays['feeder_id'], arrays['district'], arrays['label']))
+    for column in INDEX_CATEGORIES + ['timestamp', 'sample_id']:
+        arrays[column] = arrays[column][order]
+
+    # Position of every original row in the sorted file
+    destination = np.empty(num_samples, dtype=np.int64)
+    destination[order] = np.arange(num_samples)
+
+    first = store.load_chunk(0)[0] if store.chunks else np.empty((0, 6, 0), dtype=np.float32)
+    waveforms = np.lib.format.open_memmap(
+        os.path.join(store_dir, INDEX_WAVEFORMS), mode='w+', dtype=np.float32,
+        shape=(num_samples,) + first.shape[1:],
+    )
+    offset = 0
+    for chunk_waveforms, _ in store.iter_chunks():
+        n = len(chunk_waveforms)
+        waveforms[destination[offset:offset + n]] = chunk_waveforms
+        offset += n
+    waveforms.flush()
+    del waveforms
+
+    metadata.iloc[order].to_csv(os.path.join(store_dir, INDEX_METADATA), index=False)
+    np.savez(os.path.join(store_dir, INDEX_ARRAYS), **arrays)
+
+    manifest = dict(store.manifest)
+    manifest['index'] = {
+        'waveforms': INDEX_WAVEFORMS,
+        'metadata': INDEX_METADATA,
+        'arrays': INDEX_ARRAYS,
+        'sort_order': ['label', 'district', 'feeder_id', 'timestamp'],
+        'num_samples': num_samples,
+    }
+    with open(os.path.join(store_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest['index']
+
+
+class Selection:
+    """
+    Samples matching a store query, as contiguous runs of the indexed waveform file
+    views() are zero-copy slices of the memory map; waveforms() is a view for a single run
+    """
+
+    def __init__(self, store, positions):
+        self.store = store
+        self.positions = positions
+        breaks = np.flatnonzero(np.diff(positions) != 1) + 1
+        starts = positions[np.concatenate([[0], breaks])] if len(positions) else np.empty(0, dtype=np.int64)
+        stops = positions[np.concatenate([breaks - 1, [len(positions) - 1]])] + 1 if len(positions) else starts
+        self.runs = list(zip(starts.tolist(), stops.tolist()))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def views(self):
+        """(n, 6, T) memory-mapped view of every contiguous run"""
+        waveforms = self.store.indexed_waveforms()
+        return [waveforms[start:stop] for start, stop in self.runs]
+
+    def waveforms(self):
+        """All selected waveforms: a view when they form one run, otherwise a concatenated copy"""
+        views = self.views()
+        if len(views) == 1:
+            return views[0]
+        if not views:
+            return self.store.indexed_waveforms()[:0]
+        return np.concatenate(views)
+
+    @property
+    def metadata(self):
+        return self.store.indexed_metadata().iloc[self.positions].reset_index(drop=True)
+
+    @property
+    def sample_ids(self):
+        return self.store.index['sample_id'][self.positions]
+
+
+class WaveformStore:
+    """
+    Read-only view of a chunked waveform store
+    Waveform chunks are memory-mapped, so iterating never loads the whole dataset
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), 'r') as f:
+            self.manifest = json.load(f)
+        self.chunks = self.manifest['chunks']
+        self._index = None
+        self._indexed_waveforms = None
+        self._indexed_metadata = None
+
+    @staticmethod
+    def exists(path):
+        return os.path.isfile(os.path.join(path, MANIFEST))
+
+    def __len__(self):
+        return self.manifest['num_samples']
+
+    def load_chunk(self, i):
+        """Memory-mapped (N, 6, T) waveforms and metadata of chunk i"""
+        chunk = self.chunks[i]
+        waveforms = np.load(os.path.join(self.path, chunk['waveforms']), mmap_mode='r')
+        metadata = pd.read_csv(os.path.join(self.path, chunk['metadata']))
+        return waveforms, metadata
+
+    def iter_chunks(self):
+        for i in range(len(self.chunks)):
+            yield self.load_chunk(i)
+
+    def metadata(self):
+        """Metadata of every sample as one table"""
+        return pd.concat(
+            [pd.read_csv(os.path.join(self.path, chunk['metadata'])) for chunk in self.chunks],
+            ignore_index=True,
+        )
+
+    def __iter__(self):
+        """Yield samples in the dict layout of the generator, channels as array views"""
+        for waveforms, metadata in self.iter_chunks():
+            yield from iter_samples(
+                waveforms, metadata, self.manifest['sampling_rate'], self.manifest['duration_seconds']
+            )
+
+    @property
+    def has_index(self):
+        return 'index' in self.manifest
+
+    @property
+    def index(self):
+        """Coded index arrays, in the order of the indexed waveform file"""
+        if self._index is None:
+            if not self.has_index:
+                raise ValueError(f'{self.path} has no index; build it with build_index()')
+            with np.load(os.path.join(self.path, self.manifest['index']['arrays'])) as arrays:
+                self._index = {key: arrays[key] for key in arrays.files}
+        return self._index
+
+    def indexed_waveforms(self):
+        """The whole indexed waveform file, memory-mapped"""
+        if self._indexed_waveforms is None:
+            path = os.path.join(self.path, self.manifest['index']['waveforms'])
+            self._indexed_waveforms = np.load(path, mmap_mode='r')
+        return self._indexed_waveforms
+
+    def indexed_metadata(self):
+        if self._indexed_metadata is None:
+            self._indexed_metadata = pd.read_csv(os.path.join(self.path, self.manifest['index']['metadata']))
+        return self._indexed_metadata
+
+    def _codes(self, column, values):
+        """Index codes of the given category values; unknown values match nothing"""
+        if isinstance(values, str):
+            values = [values]
+        categories = self.index[f'{column}_categories']
+        if len(categories) == 0:
+            return np.empty(0, dtype=np.int64)
+        found = np.searchsorted(categories, values)
+        found = np.minimum(found, len(categories) - 1)
+        return np.unique(found[categories[found] == np.asarray(values, dtype=str)])
+
+    def _key_ranges(self, labels, districts, feeders):
+        """
+        [lo, hi) ranges of the sorted file covering the given label/district/feeder codes
+        Every combination of the most specific levels given becomes one range
+        """
+        index = self.index
+        n_districts = len(index['district_categories'])
+        n_feeders = len(index['feeder_id_categories'])
+        if '_key' not in index:
+            # Composite sort key; nondecreasing along the indexed file
+            index['_key'] = (index['label'].astype(np.int64) * n_districts + index['district']) * n_feeders \
+                + index['feeder_id']
+        key = index['_key']
+
+        all_labels = np.arange(len(index['label_categories']))
+        labels = all_labels if labels is None else labels
+        if feeders is not None:
+            # A feeder belongs to one district, so it pins the district level as well
+            feeder_district = np.zeros(n_feeders, dtype=np.int64)
+            feeder_district[index['feeder_id']] = index['district']
+            pairs = [(feeder_district[f], f) for f in feeders
+                     if districts is None or feeder_district[f] in districts]
+            bounds = [((l * n_districts + d) * n_feeders + f, (l * n_districts + d) * n_feeders + f + 1)
+                      for l in labels for d, f in pairs]
+        elif districts is not None:
+            bounds = [((l * n_districts + d) * n_feeders, (l * n_districts + d + 1) * n_feeders)
+                      for l in labels for d in districts]
+        else:
+            bounds = [(l * n_districts * n_feeders, (l + 1) * n_districts * n_feeders) for l in labels]
+
+        ranges = []
+        for lo, hi in bounds:
+            start, stop = np.searchsorted(key, [lo, hi])
+            if start < stop:
+                ranges.append((int(start), int(stop)))
+        return ranges
+
+    def query(self, label=None, district=None, feeder_id=None, feeder_prefix=None, area_type=None,
+              start=None, end=None):
+        """
+        Select samples from the indexed layout; every argument is optional
+        label, district, feeder_id and area_type take a value or a list of values,
+        feeder_prefix matches feeder ids such as 'ERN', start/end bound the timestamp as [start, end)
+        """
+        index = self.index
+        labels = None if label is None else self._codes('label', label)
+        districts = None if district is None else self._codes('district', district)
+        feeders = None if feeder_id is None else self._codes('feeder_id', feeder_id)
+        if feeder_prefix is not None:
+            matching = np.flatnonzero(np.char.startswith(index['feeder_id_categories'], feeder_prefix))
+            feeders = matching if feeders is None else np.intersect1d(feeders, matching)
+
+        positions = []
+        for lo, hi in self._key_ranges(labels, districts, feeders):
+            mask = np.ones(hi - lo, dtype=bool)
+            if area_type is not None:
+                mask &= np.isin(index['area_type'][lo:hi], self._codes('area_type', area_type))
+            if start is not None:
+                mask &= index['timestamp'][lo:hi] >= np.datetime64(start, 's')
+            if end is not None:
+                mask &= index['timestamp'][lo:hi] < np.datetime64(end, 's')
+            positions.append(lo + np.flatnonzero(mask))
+
+        positions = np.sort(np.concatenate(positions)) if positions else np.empty(0, dtype=np.int64)
+        return Selection(self, positions)
+
+    def get(self, sample_id):
+        """Zero-copy (6, T) view of one sample by id"""
+        index = self.index
+        if '_sample_order' not in index:
+            index['_sample_order'] = np.argsort(index['sample_id'])
+        order = index['_sample_order']
+        found = np.searchsorted(index['sample_id'], sample_id, sorter=order)
+        if found == len(order) or index['sample_id'][order[found]] != sample_id:
+            raise KeyError(sample_id)
+        return self.indexed_waveforms()[order[found]]
@@ -0,0 +1,155 @@
+import fs from 'fs';
+
+/**
+ * Compact binary MLP model written by scripts/compact_model.py
+ * Layout: 'KGML' | uint32 header length | JSON header | 4-byte aligned payload sections
+ * Follows .cursorrules standards for service layer
+ */
+
+interface SectionRef {
+  offset: number;
+  length: number;
+}
+
+interface CompactModelHeader {
+  version: number;
+  dtype: 'float32' | 'int8';
+  featureColumns: string[];
+  classes: string[];
+  scaler: { mean: SectionRef; std: SectionRef };
+  layers: Array<{
+    inputs: number;
+    outputs: number;
+    weights: SectionRef;
+    scales?: SectionRef;
+    bias: SectionRef;
+  }>;
+}
+
+interface DenseLayer {
+  inputs: number;
+  outputs: number;
+  weights: Float32Array; // row-major (inputs x outputs)
+  bias: Float32Array;
+}
+
+const MAGIC = 'KGML';
+
+export class CompactModel {
+  readonly featureColumns: string[];
+  readonly featureKeys: string[];
+  readonly classes: string[];
+  private readonly mean: Float32Array;
+  private readonly std: Float32Array;
+  private readonly layers: DenseLayer[];
+  private readonly input: Float32Array;
+  private readonly activations: Float32Array[];
+
+  private constructor(header: CompactModelHeader, payload: Buffer) {
+    const section = (ref: SectionRef, bytesPerValue: number): ArrayBuffer => {
+      const start = payload.byteOffset + ref.offset;
+      return payload.buffer.slice(start, start + ref.length * bytesPerValue);
+    };
+
+    this.featureColumns = header.featureColumns;
+    this.featureKeys = header.featureColumns.map(snakeToCamel);
+    this.classes = header.classes;
+    this.mean = new Float32Array(section(header.scaler.mean, 4));
+    this.std = new Float32Array(section(header.scaler.std, 4));
+
+    // Dequantize once at load so predictions run on plain Float32Arrays
+    this.layers = header.layers.map((layer) => {
+      let weights: Float32Array;
+      if (header.dtype === 'int8' && layer.scales) {
+        const quantized = new Int8Array(section(layer.weights, 1));
+        const scales = new Float32Array(section(layer.scales, 4));
+        weights = new Float32Array(quantized.length);
+        for (let i = 0; i < quantized.length; i++) {
+          weights[i] = quantized[i] * scales[i % layer.outputs];
+        }
+      } else {
+        weights = new Float32Array(section(layer.weights, 4));
+      }
+      return {
+        inputs: layer.inputs,
+        outputs: layer.outputs,
+        weights,
+        bias: new Float32Array(section(layer.bias, 4)),
+      };
+    });
+
+    // Buffers are reused across predictions
+    this.input = new Float32Array(this.featureColumns.length);
+    this.activations = this.layers.map((layer) => new Float32Array(layer.outputs));
+  }
+
+  /**
+   * Load a compact model file
+   */
+  static load(filePath: string): CompactModel {
+    const buffer = fs.readFileSync(filePath);
+    if (buffer.toString('latin1', 0, 4) !== MAGIC) {
+      throw new Error(`${filePath} is not a compact model file`);
+    }
+
+    const headerLength = buffer.readUInt32LE(4);
+    const raw = JSON.parse(buffer.toString('utf8', 8, 8 + headerLength));
+    const header: CompactModelHeader = {
+      version: raw.version,
+      dtype: raw.dtype,
+      featureColumns: raw.feature_columns,
+      classes: raw.classes,
+      scaler: raw.scaler,
+      layers: raw.layers,
+    };
+
+    return new CompactModel(header, buffer.subarray(8 + headerLength));
+  }
+
+  /**
+   * Scale the features and run the forward pass; returns class probabilities
+   */
+  predict(features: number[]): Float32Array {
+    const { input, activations, layers } = this;
+    for (let i = 0; i < input.length; i++) {
+      input[i] = (features[i] - this.mean[i]) / (this.std[i] || 1);
+    }
+
+    let current = input;
+    for (let l = 0; l < layers.length; l++) {
+      const { inputs, outputs, weights, bias } = layers[l];
+      const out = activations[l];
+      out.set(bias);
+      for (let i = 0; i < inputs; i++) {
+        const value = current[i];
+        if (value === 0) continue;
+        const row = i * outputs;
+        for (let j = 0; j < outputs; j++) {
+          out[j] += value * weights[row + j];
+        }
+      }
+      if (l < layers.length - 1) {
+        for (let j = 0; j < outputs; j++) {
+          if (out[j] < 0) out[j] = 0;
+        }
+      }
+      current = out;
+    }
+
+    // Softmax
+    let max = -Infinity;
+    for (let j = 0; j < current.length; j++) max = Math.max(max, current[j]);
+    let sum = 0;
+    for (let j = 0; j < current.length; j++) {
+      current[j] = Math.exp(current[j] - max);
+      sum += current[j];
+    }
+    for (let j = 0; j < current.length; j++) current[j] /= sum;
+
+    return current;
+  }
+}
+
+function snakeToCamel(name: string): string {
+  return name.replace(/_([a-z])/g, (_, letter: string) => letter.toUpperCase());
+}
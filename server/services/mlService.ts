@@ -1,6 +1,7 @@
 import * as tf from '@tensorflow/tfjs-node';
 import { FeatureExtractor, WaveformData, ExtractedFeatures } from './featureExtractor.js';
 import { ApiError } from '../utils/ApiError.js';
+import { CompactModel } from './compactModel.js';
 import path from 'path';
 import fs from 'fs';
 
@@ -29,16 +30,19 @@ export interface ModelMetrics {
 
 export class MLService {
   private model: tf.LayersModel | null = null;
+  private compactModel: CompactModel | null = null;
   private scaler: any = null;
   private featureExtractor: FeatureExtractor;
   private readonly modelPath: string;
   private readonly scalerPath: string;
+  private readonly compactModelPath: string;
   private isModelLoaded: boolean = false;
 
   constructor() {
     this.featureExtractor = new FeatureExtractor();
     this.modelPath = path.join(process.cwd(), 'server', 'ml', 'model.json');
     this.scalerPath = path.join(process.cwd(), 'server', 'ml', 'scaler.json');
+    this.compactModelPath = path.join(process.cwd(), 'server', 'ml', 'model.bin');
     this.loadModel();
   }
 
@@ -49,6 +53,14 @@ export class MLService {
     try {
       console.log('Loading ML model...');
       
+      // Prefer the compact binary export: one read, no JSON weight parsing
+      if (fs.existsSync(this.compactModelPath)) {
+        this.compactModel = CompactModel.load(this.compactModelPath);
+        this.isModelLoaded = true;
+        console.log('✅ Compact ML model loaded successfully');
+        return;
+      }
+
       // Check if model files exist
       if (!fs.existsSync(this.modelPath)) {
         console.log('Model file not found, running in simulation mode');
@@ -89,7 +101,9 @@ export class MLService {
         confidence: number;
       };
 
-      if (this.isModelLoaded && this.model && this.scaler) {
+      if (this.compactModel) {
+        prediction = this.predictWithCompactModel(features);
+      } else if (this.isModelLoaded && this.model && this.scaler) {
         // Use trained ML model
         prediction = await this.predictWithModel(features);
       } else {
@@ -156,6 +170,37 @@ export class MLService {
     }
   }
 
+  /**
+   * Predict using the compact binary model
+   */
+  private predictWithCompactModel(features: ExtractedFeatures): {
+    faultType: 'NORMAL' | 'LINE_BREAK' | 'SHORT_CIRCUIT' | 'OVERLOAD';
+    confidence: number;
+  } {
+    if (!this.compactModel) {
+      throw new Error('Model not loaded');
+    }
+
+    // The model header names the features it was trained on, in order; a missing one means
+    // the model and the extractor disagree, and guessing a value would skew the prediction
+    const values = features as unknown as Record<string, number>;
+    const input = this.compactModel.featureKeys.map((key) => {
+      const value = values[key];
+      if (typeof value !== 'number') {
+        throw new Error(`Feature ${key} required by the compact model is missing`);
+      }
+      return value;
+    });
+
+    const probabilities = Array.from(this.compactModel.predict(input));
+    const classIndex = this.getMaxIndex(probabilities);
+
+    return {
+      faultType: this.compactModel.classes[classIndex] as 'NORMAL' | 'LINE_BREAK' | 'SHORT_CIRCUIT' | 'OVERLOAD',
+      confidence: probabilities[classIndex],
+    };
+  }
+
   /**
    * Simulate prediction using rule-based approach
    */
@@ -0,0 +1,30 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# The Python tooling lives in scripts/ as plain modules
+SCRIPTS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+def _load_script(filename, module_name):
+    """Import one of the hyphenated CLI scripts, registered so worker processes can unpickle its functions"""
+    if module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[module_name]
+
+
+@pytest.fixture(scope='session')
+def generate_dataset():
+    return _load_script('generate-dataset.py', 'generate_dataset')
+
+
+@pytest.fixture(scope='session')
+def train_model():
+    pytest.importorskip('sklearn')
+    return _load_script('train-model.py', 'train_model')
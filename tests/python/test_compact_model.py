@@ -0,0 +1,66 @@
+"""
+Compact binary model: float32 and int8 round trips against scikit-learn, and the fixture
+files server/services/compactModel.ts is tested against
+The fixture models were written by write_compact_model, expected values by predict_proba
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+sklearn = pytest.importorskip('sklearn')
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from compact_model import predict_proba, read_compact_model, write_compact_model
+from grid_synthesis import FAULT_CLASSES
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'fixtures')
+
+
+@pytest.fixture(scope='module')
+def trained():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 6)) * [1, 10, 100, 0.1, 5, 2] + [0, 50, 230, 1, -3, 7]
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 50).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = MLPClassifier(hidden_layer_sizes=(24, 12), max_iter=2000, random_state=0).fit(scaler.transform(X), y)
+    return X, model, scaler
+
+
+@pytest.mark.parametrize('dtype, atol', [('float32', 1e-4), ('int8', 0.05)])
+def test_round_trip_matches_sklearn(tmp_path, trained, dtype, atol):
+    X, model, scaler = trained
+    columns = [f'feature_{i}' for i in range(X.shape[1])]
+    path = str(tmp_path / 'model.bin')
+    write_compact_model(path, model.coefs_, model.intercepts_, scaler.mean_, scaler.scale_, columns,
+                        model.classes_, dtype)
+
+    compact = read_compact_model(path)
+    assert compact['dtype'] == dtype
+    assert compact['feature_columns'] == columns
+    assert compact['classes'] == FAULT_CLASSES
+    assert [weights.shape for weights, _ in compact['layers']] == [c.shape for c in model.coefs_]
+
+    expected = model.predict_proba(scaler.transform(X))
+    probabilities = predict_proba(compact, X)
+    np.testing.assert_allclose(probabilities, expected, atol=atol)
+    assert (probabilities.argmax(axis=1) == expected.argmax(axis=1)).mean() > 0.98
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'model.bin'
+    path.write_bytes(b'{"coefs": []}')
+    with pytest.raises(ValueError, match='not a compact model'):
+        read_compact_model(str(path))
+
+
+@pytest.mark.parametrize('dtype', ['float32', 'int8'])
+def test_fixture_predictions(dtype):
+    with open(os.path.join(FIXTURES, 'compact_model.json')) as f:
+        fixture = json.load(f)
+    compact = read_compact_model(os.path.join(FIXTURES, f'compact_model_{dtype}.bin'))
+    assert compact['feature_columns'] == fixture['feature_columns']
+    np.testing.assert_allclose(predict_proba(compact, fixture['inputs']), fixture['expected'][dtype], atol=1e-6)
@@ -0,0 +1,152 @@
+"""
+Bulk loader against a local PostgreSQL: row contents, feature documents and resuming
+Set KERALA_TEST_DATABASE_URL to run; every test works in its own throwaway schema
+"""
+
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from grid_synthesis import CHANNELS
+from waveform_store import METADATA_COLUMNS, WaveformStore, write_chunk, write_manifest
+
+psycopg2 = pytest.importorskip('psycopg2')
+from psycopg2.extensions import make_dsn  # noqa: E402
+
+from db_loader import PROGRESS_TABLE, dataset_id, load_store, plan_batches, row_ids  # noqa: E402
+
+DATABASE_URL = os.environ.get('KERALA_TEST_DATABASE_URL')
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason='KERALA_TEST_DATABASE_URL not set')
+
+# The tables of shared/schema.ts the loader writes to
+SCHEMA = """
+CREATE TABLE feeders (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    substation_id uuid,
+    name varchar(255) NOT NULL,
+    code varchar(50) NOT NULL UNIQUE,
+    length_km decimal(10, 2),
+    typical_load_kw decimal(10, 2),
+    num_consumers integer,
+    area_type varchar(50),
+    is_active boolean DEFAULT true,
+    created_at timestamptz DEFAULT now()
+);
+CREATE TABLE waveform_data (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    feeder_id uuid REFERENCES feeders(id) ON DELETE CASCADE,
+    timestamp timestamptz NOT NULL,
+    current_r text[], current_y text[], current_b text[],
+    voltage_r text[], voltage_y text[], voltage_b text[],
+    sampling_rate integer DEFAULT 10000,
+    duration_seconds decimal(5, 2),
+    label varchar(50),
+    created_at timestamptz DEFAULT now()
+);
+CREATE TABLE feature_data (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    waveform_id uuid REFERENCES waveform_data(id) ON DELETE CASCADE,
+    features jsonb NOT NULL,
+    label varchar(50),
+    created_at timestamptz DEFAULT now()
+);
+"""
+
+
+@pytest.fixture
+def dsn():
+    schema = f'loader_test_{uuid.uuid4().hex[:12]}'
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f'CREATE SCHEMA {schema}')
+        cur.execute(f'SET search_path TO {schema}')
+        cur.execute(SCHEMA)
+    try:
+        yield make_dsn(DATABASE_URL, options=f'-c search_path={schema}')
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f'DROP SCHEMA {schema} CASCADE')
+        conn.close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(3)
+    chunks = []
+    for chunk_index, n in enumerate([120, 80]):
+        first = 1 + chunk_index * 120
+        feeder_ids = rng.choice(['ERN-F001', 'KOL-F002', 'TRI-F003'], size=n)
+        metadata = pd.DataFrame({
+            'sample_id': np.arange(first, first + n),
+            'label': rng.choice(['NORMAL', 'LINE_BREAK'], size=n),
+            'feeder_id': feeder_ids,
+            'feeder_name': [f'{f} feeder' for f in feeder_ids],
+            'district': 'Ernakulam',
+            'area_type': 'urban',
+            'typical_load_kw': 120.5,
+            'timestamp': pd.Timestamp('2024-03-01') + pd.to_timedelta(rng.integers(0, 1000, size=n), unit='h'),
+        })
+        metadata = metadata.reindex(columns=METADATA_COLUMNS)
+        waveforms = rng.normal(0, 50, size=(n, 6, 40)).astype(np.float32)
+        chunks.append(write_chunk(str(tmp_path), chunk_index, waveforms, metadata))
+    write_manifest(str(tmp_path), chunks, 10000, 4.0, seed=3)
+    return str(tmp_path)
+
+
+def _query(dsn, sql, params=None):
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def _batch_waveform_ids(store_path, batch_index, batch_size=50):
+    store = WaveformStore(store_path)
+    batch = plan_batches(store, batch_size)[batch_index]
+    _, metadata = store.load_chunk(batch['chunk'])
+    return row_ids(dataset_id(store), 'waveform', metadata['sample_id'][batch['start']:batch['stop']])
+
+
+def test_loads_waveforms_features_and_feeders(dsn, store):
+    summary = load_store(store, dsn, batch_size=50, workers=2, progress=False)
+    assert summary['rows'] == 200
+    assert summary['batches'] == 3 + 2
+
+    assert _query(dsn, 'SELECT count(*) FROM waveform_data')[0][0] == 200
+    assert _query(dsn, 'SELECT count(*) FROM feature_data f JOIN waveform_data w ON w.id = f.waveform_id '
+                       'WHERE f.label = w.label')[0][0] == 200
+    assert _query(dsn, 'SELECT count(*) FROM waveform_data WHERE feeder_id IS NULL')[0][0] == 0
+    assert sorted(code for code, in _query(dsn, 'SELECT code FROM feeders')) == ['ERN-F001', 'KOL-F002', 'TRI-F003']
+
+    waveforms, metadata = WaveformStore(store).load_chunk(0)
+    row = _query(dsn, f"SELECT {', '.join(CHANNELS)}, features, sampling_rate, f.label FROM waveform_data w "
+                      "JOIN feature_data f ON w.id = f.waveform_id WHERE w.id = %s",
+                 (_batch_waveform_ids(store, 0)[0],))[0]
+    loaded = np.array([np.array(channel, dtype=float) for channel in row[:6]])
+    assert np.abs(loaded - waveforms[0]).max() < 1e-3
+    assert row[6]['current_rms_r'] > 0
+    assert row[7] == 10000
+    assert row[8] == metadata['label'][0]
+
+
+def test_resumes_after_interruption_without_duplicates(dsn, store):
+    load_store(store, dsn, batch_size=50, progress=False)
+
+    # An interrupted run committed only some batches; the others rolled back with their progress rows
+    for index in (1, 4):
+        _query(dsn, f'DELETE FROM {PROGRESS_TABLE} WHERE batch_index = %s RETURNING batch_index', (index,))
+        _query(dsn, 'DELETE FROM waveform_data WHERE id = ANY(%s::uuid[]) RETURNING id',
+               (_batch_waveform_ids(store, index),))
+    assert _query(dsn, 'SELECT count(*) FROM waveform_data')[0][0] == 200 - 50 - 30
+
+    summary = load_store(store, dsn, batch_size=50, workers=2, progress=False)
+    assert summary['skipped_batches'] == 3
+    assert summary['rows'] == 80
+    assert _query(dsn, 'SELECT count(*), count(DISTINCT id) FROM waveform_data')[0] == (200, 200)
+    assert _query(dsn, 'SELECT count(*) FROM feature_data')[0][0] == 200
+
+    with pytest.raises(ValueError):
+        load_store(store, dsn, batch_size=64, progress=False)
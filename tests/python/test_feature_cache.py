@@ -0,0 +1,120 @@
+"""
+Incremental feature cache: hits and misses, version and rate separation, pruning, and the
+journals that carry the work of shard workers back to the parent cache
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_cache import FeatureCache, waveform_keys
+from grid_features import FEATURE_SETS, ID_COLUMNS, features_frame, open_feature_cache
+
+COLUMNS = ['a', 'b']
+
+
+def _waveforms(n, seed):
+    return np.random.default_rng(seed).normal(size=(n, 6, 40)).astype(np.float32)
+
+
+def _metadata(n):
+    return pd.DataFrame({column: np.arange(n) for column in ID_COLUMNS})
+
+
+def test_hits_misses_and_persistence(tmp_path):
+    keys = waveform_keys(_waveforms(5, 0))
+    cache = FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000)
+    rows, hit = cache.lookup(keys)
+    assert not hit.any() and np.isnan(rows).all()
+    cache.update(keys[:3], np.arange(6.0).reshape(3, 2))
+    cache.save()
+
+    reopened = FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000)
+    rows, hit = reopened.lookup(keys)
+    assert hit.tolist() == [True, True, True, False, False]
+    np.testing.assert_array_equal(rows[:3], np.arange(6.0).reshape(3, 2))
+    assert (reopened.hits, reopened.misses) == (3, 2)
+
+
+def test_keys_follow_the_values_features_are_computed_from():
+    waveforms = _waveforms(3, 0)
+    # Store rows and their float64 values give the same features, so they share a key
+    np.testing.assert_array_equal(waveform_keys(waveforms), waveform_keys(waveforms.astype(np.float64)))
+
+    # A change below float32 precision still changes the features, and the key
+    nudged = waveforms.astype(np.float64)
+    nudged[1, 0, 0] += 1e-12
+    assert (waveform_keys(nudged) != waveform_keys(waveforms)).tolist() == [False, True, False]
+
+
+def test_versions_and_rates_are_kept_apart(tmp_path):
+    keys = waveform_keys(_waveforms(2, 0))
+    for version, rate in [(1, 10000), (1, 1000)]:
+        cache = FeatureCache(str(tmp_path), 'full', version, COLUMNS, rate)
+        cache.update(keys, np.full((2, 2), rate, dtype=float))
+        cache.save()
+
+    # Same bytes at another rate are a different cache
+    rows, hit = FeatureCache(str(tmp_path), 'full', 1, COLUMNS, 1000).lookup(keys)
+    assert hit.all() and (rows == 1000).all()
+
+    # A new version starts empty and drops the old version's file of its own rate only
+    bumped = FeatureCache(str(tmp_path), 'full', 2, COLUMNS, 10000)
+    assert not bumped.lookup(keys)[1].any()
+    bumped.save()
+    assert sorted(os.listdir(tmp_path)) == ['full-10000hz-v2.npz', 'full-1000hz-v1.npz']
+
+
+def test_rows_of_other_stores_survive_unless_pruned(tmp_path):
+    first, second = waveform_keys(_waveforms(4, 0)), waveform_keys(_waveforms(4, 1))
+    cache = FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000)
+    cache.update(np.concatenate([first, second]), np.zeros((8, 2)))
+    cache.save()
+
+    # A run over the first store only keeps the second store's rows by default
+    cache = FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000)
+    cache.lookup(first)
+    assert cache.save() == 0
+    assert len(FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000)) == 8
+
+    cache = FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000)
+    cache.lookup(first)
+    assert cache.save(prune=True) == 4
+    assert FeatureCache(str(tmp_path), 'basic', 1, COLUMNS, 10000).lookup(first)[1].all()
+
+
+def test_worker_journals_merge_into_the_parent(tmp_path):
+    waveforms = _waveforms(6, 2)
+    parent = open_feature_cache(str(tmp_path), 'basic', 10000)
+    worker = open_feature_cache(str(tmp_path), 'basic', 10000)
+    expected = features_frame(waveforms, _metadata(6), 'basic', 10000, worker)
+
+    parent.merge(worker.journal())
+    assert (parent.hits, parent.misses, len(parent)) == (0, 6, 6)
+    assert worker.journal()['seen'].size == 0
+
+    parent.save()
+    cached = features_frame(waveforms, _metadata(6), 'basic', 10000, open_feature_cache(str(tmp_path), 'basic', 10000))
+    pd.testing.assert_frame_equal(cached, expected)
+    with pytest.raises(ValueError, match='Hz'):
+        features_frame(waveforms, _metadata(6), 'basic', 1000, parent)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sharded_generation_reuses_the_cache(tmp_path, monkeypatch, generate_dataset, workers):
+    monkeypatch.chdir(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    runs = []
+    for _ in range(2):
+        generator = generate_dataset.KeralaGridDataGenerator(seed=6)
+        generator.generate_dataset_streaming(80, 'store', 'features.csv', shard_size=20, workers=workers,
+                                             cache_dir=cache_dir)
+        runs.append((generator.metrics.counters.copy(), pd.read_csv('data/features.csv')))
+
+    assert runs[0][0]['feature_cache_misses'] == 80
+    assert runs[1][0]['feature_cache_hits'] == 80
+    assert runs[1][0].get('feature_cache_misses', 0) == 0
+    pd.testing.assert_frame_equal(runs[0][1], runs[1][1])
+    assert list(runs[0][1].columns[len(ID_COLUMNS):]) == list(FEATURE_SETS['basic'])
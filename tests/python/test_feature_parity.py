@@ -0,0 +1,45 @@
+"""
+Parity of the batched Python feature extractor with server/services/featureExtractor.ts
+Expected values in the fixture were produced by the TypeScript FeatureExtractor
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+import pytest
+
+from grid_features import FULL_FEATURE_COLUMNS, full_batch_features
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'feature_parity.json')
+WAVEFORM_KEYS = ['currentR', 'currentY', 'currentB', 'voltageR', 'voltageY', 'voltageB']
+
+
+def snake_case(name):
+    return re.sub(r'([A-Z])', r'_\1', name).lower()
+
+
+@pytest.fixture(scope='module')
+def fixture():
+    with open(FIXTURE) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def features(fixture):
+    """Extract every fixture case in a single batch"""
+    waveforms = np.array([[case['waveform'][key] for key in WAVEFORM_KEYS] for case in fixture['cases']])
+    return full_batch_features(waveforms, fixture['sampling_rate'])
+
+
+def test_covers_every_server_feature(fixture):
+    expected_names = [snake_case(name) for name in fixture['cases'][0]['expected']]
+    assert expected_names == FULL_FEATURE_COLUMNS
+
+
+def test_matches_server_extractor(fixture, features):
+    for i, case in enumerate(fixture['cases']):
+        for name, expected in case['expected'].items():
+            actual = features[snake_case(name)][i]
+            assert actual == pytest.approx(expected, rel=1e-6, abs=1e-9), f"{case['name']}: {name}"
@@ -0,0 +1,108 @@
+"""
+Generation entry points of generate-dataset.py: the streaming shard layout and its summary,
+output that does not depend on the worker count, and the serial path that matches it
+"""
+
+import json
+import os
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+REFERENCE_TIME = datetime(2024, 6, 1)
+
+
+def _store_files(store_dir):
+    """Contents of every file of a store, the manifest aside"""
+    files = {}
+    for name in sorted(os.listdir(store_dir)):
+        if name != 'manifest.json':
+            with open(os.path.join(store_dir, name), 'rb') as f:
+                files[name] = f.read()
+    return files
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _streaming_peak(generator, num_samples, name):
+    """Peak traced memory of one streaming run"""
+    tracemalloc.start()
+    try:
+        generator.generate_dataset_streaming(num_samples, name, f'{name}.csv', shard_size=20)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_summary_and_shard_layout(tmp_path, monkeypatch, generate_dataset):
+    monkeypatch.chdir(tmp_path)
+    generator = generate_dataset.KeralaGridDataGenerator(seed=3, reference_time=REFERENCE_TIME)
+    summary = generator.generate_dataset_streaming(110, 'store', 'features.csv', shard_size=25)
+
+    # 110 samples make 27 of each class, the remainder is not generated
+    counts = {name: 27 for name in ('NORMAL', 'LINE_BREAK', 'SHORT_CIRCUIT', 'OVERLOAD')}
+    assert summary['num_samples'] == 108
+    assert summary['class_counts'] == counts
+    features = pd.read_csv('data/features.csv')
+    assert features['label'].value_counts().to_dict() == counts
+    assert summary['num_features'] == features.shape[1]
+    assert summary['feeders'] == set(features['feeder_id'])
+
+    # One float32 chunk per shard, in sample order
+    with open('data/store/manifest.json') as f:
+        manifest = json.load(f)
+    assert manifest['num_samples'] == 108
+    assert [chunk['num_samples'] for chunk in manifest['chunks']] == [25, 25, 25, 25, 8]
+    sample_ids = []
+    for chunk in manifest['chunks']:
+        waveforms = np.load(os.path.join('data/store', chunk['waveforms']))
+        metadata = pd.read_csv(os.path.join('data/store', chunk['metadata']))
+        assert waveforms.dtype == np.float32
+        assert waveforms.shape == (chunk['num_samples'], 6, len(generator.time_vector))
+        sample_ids += metadata['sample_id'].tolist()
+    assert sample_ids == list(range(1, 109)) == features['sample_id'].tolist()
+
+
+def test_streaming_memory_is_bounded_by_the_shard(tmp_path, monkeypatch, generate_dataset):
+    monkeypatch.chdir(tmp_path)
+    generator = generate_dataset.KeralaGridDataGenerator(seed=3, reference_time=REFERENCE_TIME)
+    _streaming_peak(generator, 40, 'warmup')
+
+    small = _streaming_peak(generator, 80, 'small')
+    large = _streaming_peak(generator, 640, 'large')
+    # Eight times the samples at the same shard size peak at about the same memory,
+    # well below what the whole dataset would take
+    assert large < 1.5 * small
+    assert large < 640 * 6 * len(generator.time_vector) * 8
+
+
+def test_output_is_independent_of_the_worker_count(tmp_path, monkeypatch, generate_dataset):
+    monkeypatch.chdir(tmp_path)
+    for workers in (1, 2):
+        generator = generate_dataset.KeralaGridDataGenerator(seed=11, reference_time=REFERENCE_TIME)
+        generator.generate_dataset_streaming(120, f'store_{workers}', f'features_{workers}.csv',
+                                             shard_size=25, workers=workers)
+
+    serial, parallel = _store_files('data/store_1'), _store_files('data/store_2')
+    assert len(serial) == 2 * 5
+    assert serial == parallel
+    assert _read('data/features_1.csv') == _read('data/features_2.csv')
+
+
+def test_serial_generation_matches_the_streaming_path(tmp_path, monkeypatch, generate_dataset):
+    monkeypatch.chdir(tmp_path)
+    generator = generate_dataset.KeralaGridDataGenerator(seed=11, reference_time=REFERENCE_TIME)
+    generator.generate_dataset_streaming(120, 'streamed', 'streamed.csv', shard_size=25, workers=2)
+
+    generator = generate_dataset.KeralaGridDataGenerator(seed=11, reference_time=REFERENCE_TIME)
+    dataset = generator.generate_dataset(120, shard_size=25)
+    generator.save_dataset(dataset, 'serial', chunk_size=25)
+    generator.generate_features_csv(dataset, 'serial.csv')
+
+    assert _store_files('data/serial') == _store_files('data/streamed')
+    assert _read('data/serial.csv') == _read('data/streamed.csv')
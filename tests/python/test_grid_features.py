@@ -0,0 +1,77 @@
+"""
+Basic batched features against the per-sample extraction of generate-dataset.py they replaced
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+
+from grid_features import FEATURE_COLUMNS, batch_features
+
+
+def per_sample_features(sample):
+    """The per-sample definitions, one waveform of six channels at a time"""
+    current_r, current_y, current_b, voltage_r, voltage_y, voltage_b = sample
+    features = {}
+    for name, signal in [('current_rms_r', current_r), ('current_rms_y', current_y), ('current_rms_b', current_b),
+                         ('voltage_rms_r', voltage_r), ('voltage_rms_y', voltage_y), ('voltage_rms_b', voltage_b)]:
+        features[name] = np.sqrt(np.mean(np.square(signal)))
+    for name, signal in [('current_peak_r', current_r), ('current_peak_y', current_y), ('current_peak_b', current_b),
+                         ('voltage_peak_r', voltage_r), ('voltage_peak_y', voltage_y), ('voltage_peak_b', voltage_b)]:
+        features[name] = np.max(np.abs(signal))
+
+    current_rms = [features['current_rms_r'], features['current_rms_y'], features['current_rms_b']]
+    features['current_unbalance'] = (np.max(current_rms) - np.min(current_rms)) / np.max(current_rms) * 100
+    voltage_rms = [features['voltage_rms_r'], features['voltage_rms_y'], features['voltage_rms_b']]
+    features['voltage_unbalance'] = (np.max(voltage_rms) - np.min(voltage_rms)) / np.max(voltage_rms) * 100
+
+    first_10_percent = int(len(current_r) * 0.1)
+    last_10_percent = int(len(current_r) * 0.9)
+    for name, signal in [('current_drop_ratio', current_r), ('voltage_drop_ratio', voltage_r)]:
+        initial = np.sqrt(np.mean(np.square(signal[:first_10_percent])))
+        final = np.sqrt(np.mean(np.square(signal[last_10_percent:])))
+        features[name] = (initial - final) / initial if initial > 0 else 0
+    return features
+
+
+def _samples(num_points, seed):
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_points) / num_points
+    waveforms = np.sin(2 * np.pi * 5 * t + rng.uniform(0, 2 * np.pi, size=(4, 6, 1)))
+    waveforms *= rng.uniform(1, 300, size=(4, 6, 1))
+    # A break two thirds in, and a current that only starts after the first 10%
+    waveforms[1, :, 2 * num_points // 3:] *= 0.2
+    waveforms[2, [0, 3], :num_points // 5] = 0
+    return waveforms
+
+
+# 400 points as generated, 15 where 10% is fractional, 9 where there is no first 10% at all
+@pytest.mark.parametrize('num_points', [400, 15, 9])
+def test_matches_per_sample_features(num_points):
+    waveforms = _samples(num_points, num_points)
+    columns = batch_features(waveforms)
+
+    assert list(columns) == FEATURE_COLUMNS
+    for i, sample in enumerate(waveforms):
+        # Without a first 10% the per-sample means are over empty slices
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            expected = per_sample_features(sample)
+        for name in FEATURE_COLUMNS:
+            assert columns[name][i] == pytest.approx(expected[name], rel=1e-12, abs=1e-12), name
+
+    if num_points < 10:
+        assert (columns['current_drop_ratio'] == 0).all() and (columns['voltage_drop_ratio'] == 0).all()
+    else:
+        # Zero RMS over the first 10% gives no drop ratio rather than a division by zero
+        assert columns['current_drop_ratio'][2] == columns['voltage_drop_ratio'][2] == 0
+
+
+def test_silent_sample_has_zero_unbalance():
+    columns = batch_features(np.zeros((1, 6, 400)))
+    # The per-sample division by a zero RMS gave NaN
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        assert np.isnan(per_sample_features(np.zeros((6, 400)))['current_unbalance'])
+    assert all(columns[name][0] == 0 for name in FEATURE_COLUMNS)
@@ -0,0 +1,151 @@
+"""
+Batch synthesis and fault injection, waveform fidelity: anti-aliased decimation and direct
+synthesis at the output rate, and the synthesis basis shared between batches
+"""
+
+import numpy as np
+import pytest
+
+from grid_synthesis import (
+    CURRENT, VOLTAGE, decimate, inject_line_break, inject_overload, inject_short_circuit, synthesis_basis,
+    synthesize_normal,
+)
+
+
+def _amplitude(signal, rate, frequency):
+    spectrum = np.abs(np.fft.rfft(signal, axis=-1)) * 2 / signal.shape[-1]
+    return spectrum[..., int(round(frequency * signal.shape[-1] / rate))]
+
+
+def _ones(n, num_points):
+    """Unit waveforms, so that injected faults show up as the gains themselves"""
+    return np.ones((n, 6, num_points))
+
+
+def _onset(waveforms):
+    """Index of the first sample each waveform's R current differs from 1"""
+    return np.argmax(waveforms[:, 0] != 1.0, axis=-1)
+
+
+def test_normal_batch_shape_and_phase_relations():
+    t = np.arange(10000) / 10000
+    waveforms = synthesize_normal(8, t, np.random.default_rng(0))
+    assert waveforms.shape == (8, 6, 10000)
+
+    # Y lags R and B leads it by 120 degrees, for currents and voltages alike
+    spectrum = np.fft.rfft(waveforms, axis=-1)[..., 50]
+    phases = np.degrees(np.angle(spectrum / spectrum[:, [0, 0, 0, 3, 3, 3]]))
+    assert np.allclose(phases, [0, -120, 120, 0, -120, 120], atol=2)
+    assert np.allclose(np.abs(spectrum[:, VOLTAGE]) * 2 / len(t), 230, rtol=0.01)
+
+
+def test_line_break_step_and_drop_factor():
+    rate = 10000
+    waveforms = _ones(200, rate)
+    inject_line_break(waveforms, np.random.default_rng(1), rate)
+
+    onset = _onset(waveforms)
+    assert onset.min() >= rate // 4 and onset.max() <= 3 * rate // 4
+    for waveform, start in zip(waveforms, onset):
+        assert (waveform[:, :start] == 1.0).all()
+        # Currents step to the drop factor once the 5 ms transient is over, voltages at once
+        drop, voltage = waveform[0, -1], waveform[3, -1]
+        assert 0.1 <= drop <= 0.4 and 0.7 <= voltage <= 0.9
+        assert (waveform[CURRENT, start + 50:] == drop).all()
+        assert (waveform[VOLTAGE, start:] == voltage).all()
+
+
+def test_short_circuit_multiplier_and_transient_length():
+    rate = 10000
+    waveforms = _ones(200, rate)
+    inject_short_circuit(waveforms, np.random.default_rng(2), rate, values={'fault_position': np.full(200, 0.5)})
+
+    assert (_onset(waveforms) == rate // 2).all()
+    multiplier = waveforms[:, 0, -1]
+    assert multiplier.min() >= 5 and multiplier.max() <= 15
+    assert ((waveforms[:, VOLTAGE, -1] >= 0.05) & (waveforms[:, VOLTAGE, -1] <= 0.2)).all()
+
+    # The oscillation lasts 10 ms, 100 samples at this rate
+    transient = waveforms[:, 0, rate // 2:] != multiplier[:, None]
+    last = transient.shape[1] - 1 - np.argmax(transient[:, ::-1], axis=-1)
+    assert (last < 0.01 * rate).all() and (last >= 0.009 * rate).all()
+
+
+def test_overload_ramp_starts_at_a_quarter():
+    rate, duration = 1000, 4.0
+    num_points = int(rate * duration)
+    waveforms = _ones(4, num_points)
+    inject_overload(waveforms, np.random.default_rng(3), rate, duration_seconds=duration)
+
+    start = num_points // 4
+    assert (waveforms[:, :, :start] == 1.0).all()
+    assert (_onset(waveforms) == start).all()
+    voltage = waveforms[:, VOLTAGE, start:]
+    assert ((voltage >= 0.85) & (voltage <= 0.95)).all()
+
+    # Averaged over whole cycles the harmonics cancel, leaving the 80% ramp
+    cycles = waveforms[:, 0, start:].reshape(4, -1, rate // 50).mean(axis=-1)
+    assert abs(cycles[:, 0] - 1.0).max() < 0.05
+    assert abs(cycles[:, -1] - 1.8).max() < 0.1
+    assert (np.diff(cycles, axis=-1).mean(axis=-1) > 0).all()
+
+
+def test_decimate_removes_content_above_output_nyquist():
+    t = np.arange(10000) / 10000
+    tones = np.sin(2 * np.pi * 50 * t) + np.sin(2 * np.pi * 700 * t)
+    waveforms = np.broadcast_to(tones, (2, 6, len(t)))
+
+    decimated = decimate(waveforms, 10000, 1000)
+
+    assert decimated.shape == (2, 6, 1000)
+    assert abs(_amplitude(decimated, 1000, 50) - 1).max() < 0.01
+    # Slicing folds the 700 Hz tone onto 300 Hz at full strength
+    assert abs(_amplitude(waveforms[..., ::10], 1000, 300) - 1).max() < 0.01
+    assert _amplitude(decimated, 1000, 300).max() < 0.01
+
+
+def test_direct_synthesis_matches_decimated_full_rate():
+    rng = np.random.default_rng(0)
+    direct = synthesize_normal(64, np.arange(1000) / 1000, rng, max_frequency=500)
+    full = synthesize_normal(64, np.arange(10000) / 10000, rng)
+    decimated = decimate(full, 10000, 1000)
+
+    for frequency in (50, 150):
+        assert np.allclose(_amplitude(direct[:, 0], 1000, frequency).mean(),
+                           _amplitude(decimated[:, 0], 1000, frequency).mean(), rtol=0.05)
+
+
+def test_transients_are_timed_in_seconds():
+    for rate in (10000, 5000):
+        t = np.arange(rate) / rate
+        waveforms = np.broadcast_to(np.ones(len(t)), (1, 6, len(t))).copy()
+        inject_short_circuit(waveforms, np.random.default_rng(1), rate)
+        after = waveforms[0, 0][waveforms[0, 0] != 1.0]
+        # 10 ms of oscillation on top of the constant step
+        assert len(np.unique(after.round(9))) > 1
+        assert np.count_nonzero(after != after[-1]) <= 0.01 * rate
+
+
+def test_generator_needs_an_output_rate_above_the_fundamental(generate_dataset):
+    Generator = generate_dataset.KeralaGridDataGenerator
+    assert Generator(seed=0, fidelity='slice').output_rate == 100
+
+    generator = Generator(seed=0, fidelity='direct')
+    assert generator.output_rate == generate_dataset.DEFAULT_OUTPUT_RATE
+    waveforms = generator.generate_batch('NORMAL', 4)['waveforms']
+    assert np.sqrt((waveforms[:, 3:] ** 2).mean()) > 150
+
+    for fidelity in ('direct', 'decimate'):
+        with pytest.raises(ValueError, match='fundamental'):
+            Generator(seed=0, fidelity=fidelity, output_rate=100)
+
+
+def test_synthesis_basis_is_shared_and_read_only():
+    t = np.arange(1000) / 1000
+    carriers, harmonics, load_trend = synthesis_basis(t)
+    assert synthesis_basis(t.copy())[0] is carriers
+    assert synthesis_basis(t, max_frequency=200)[1] is not harmonics
+    assert not any(array.flags.writeable for array in (carriers, harmonics, load_trend))
+
+    phases = np.array([0, -2, 2])[:, None] * np.pi / 3
+    assert np.allclose(carriers, np.sin(2 * np.pi * 50 * t[None, :] + phases))
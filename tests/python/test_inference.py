@@ -0,0 +1,48 @@
+"""
+The NumPy BatchPredictor against scikit-learn on the same exported model
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+sklearn = pytest.importorskip('sklearn')
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from grid_inference import BatchPredictor
+
+
+@pytest.fixture(scope='module')
+def trained():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5)) * [1, 10, 100, 0.1, 5] + [0, 50, 230, 1, -3]
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 50).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = MLPClassifier(hidden_layer_sizes=(16, 8), max_iter=2000, random_state=0).fit(scaler.transform(X), y)
+    return X, model, scaler
+
+
+@pytest.fixture()
+def predictor(tmp_path, trained):
+    _, model, scaler = trained
+    columns = [f'f{i}' for i in range(5)]
+    with open(tmp_path / 'model.json', 'w') as f:
+        json.dump({
+            'coefs': [c.tolist() for c in model.coefs_],
+            'intercepts': [b.tolist() for b in model.intercepts_],
+            'classes': model.classes_.tolist(),
+            'feature_columns': columns,
+        }, f)
+    with open(tmp_path / 'scaler.json', 'w') as f:
+        json.dump({'mean': scaler.mean_.tolist(), 'std': scaler.scale_.tolist(), 'feature_columns': columns}, f)
+    # A batch size that does not divide the row count exercises the partial last batch
+    return BatchPredictor.from_dir(str(tmp_path), batch_size=64, dtype=np.float64)
+
+
+def test_matches_sklearn(trained, predictor):
+    X, model, scaler = trained
+    expected = model.predict_proba(scaler.transform(X))
+    np.testing.assert_allclose(predictor.predict_proba(X), expected, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(predictor.predict(X), model.predict(scaler.transform(X)))
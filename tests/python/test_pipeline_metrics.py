@@ -0,0 +1,63 @@
+"""
+Run metrics: stage accumulation, worker merging, memory peaks of nested stages and the cProfile hook
+"""
+
+import json
+import tracemalloc
+
+import numpy as np
+
+from pipeline_metrics import RunMetrics
+
+
+def test_stages_accumulate_and_merge(tmp_path):
+    metrics = RunMetrics()
+    for _ in range(2):
+        with metrics.stage('features') as stage:
+            stage.add(100)
+    metrics.merge_stages({'features': {'calls': 1, 'seconds': 1.0, 'cpu_seconds': 1.0, 'samples': 50,
+                                       'process_rss_high_water_mb': 1e6, 'rss_growth_mb': 3.0,
+                                       'python_peak_mb': None}})
+    metrics.count('feature_cache_hits', 7)
+
+    report = metrics.save(str(tmp_path / 'run_report.json'))
+    features = report['stages']['features']
+    assert features['calls'] == 3
+    assert features['samples'] == 250
+    assert features['seconds'] >= 1.0
+    assert features['process_rss_high_water_mb'] == 1e6
+    assert features['rss_growth_mb'] >= 3.0
+    assert report['counters'] == {'feature_cache_hits': 7}
+    assert json.loads((tmp_path / 'run_report.json').read_text())['stages'].keys() == {'features'}
+
+
+def test_nested_stage_keeps_the_outer_peak():
+    metrics = RunMetrics(trace_memory=True)
+    try:
+        with metrics.stage('pipeline'):
+            with metrics.stage('synthesis'):
+                block = np.ones(2**22)
+                del block
+            with metrics.stage('features'):
+                pass
+    finally:
+        tracemalloc.stop()
+
+    stages = metrics.report()['stages']
+    # The 32 MB block counts towards the stage that allocated it and every stage around it
+    assert stages['synthesis']['python_peak_mb'] >= 32
+    assert stages['pipeline']['python_peak_mb'] >= 32
+    assert stages['features']['python_peak_mb'] < 1
+
+
+def test_profiles_only_the_chosen_stage(tmp_path):
+    metrics = RunMetrics(profile_stage='synthesis', profile_dir=str(tmp_path))
+    with metrics.stage('synthesis'):
+        sorted(range(10000), key=lambda x: -x)
+    with metrics.stage('features'):
+        pass
+
+    profile = metrics.report()['profile']
+    assert profile['file'] == str(tmp_path / 'profile-synthesis.prof')
+    assert profile['top']
+    assert [path.name for path in tmp_path.iterdir()] == ['profile-synthesis.prof']
@@ -0,0 +1,60 @@
+"""
+Scenario specs: proportions, parameter draws with oversampled hard cases, validation
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from grid_synthesis import DISTRICTS, generate_feeder_list, inject_line_break
+from scenario_spec import BOUNDARY_PARAMETERS, ScenarioSpec
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts', 'scenarios')
+
+
+def test_class_and_district_proportions():
+    spec = ScenarioSpec(classes={'NORMAL': 2, '*': 1}, districts={'*': 1, 'Idukki': 0, 'Ernakulam': 3})
+
+    counts = dict(spec.class_counts(1001))
+    assert sum(counts.values()) == 1001
+    assert counts == {'NORMAL': 401, 'LINE_BREAK': 200, 'SHORT_CIRCUIT': 200, 'OVERLOAD': 200}
+
+    feeders = generate_feeder_list(np.random.default_rng(0))
+    picks = np.random.default_rng(1).choice(len(feeders), size=50000, p=spec.feeder_probabilities(feeders))
+    districts = np.array([feeder['district'] for feeder in feeders])[picks]
+    share = {d: np.mean(districts == d) for d in DISTRICTS}
+    assert share['Idukki'] == 0
+    assert share['Ernakulam'] == pytest.approx(3 / 15, abs=0.01)
+    assert share['Kollam'] == pytest.approx(1 / 15, abs=0.01)
+
+
+def test_hard_cases_come_first_from_the_boundary_region():
+    spec = ScenarioSpec(oversample={'LINE_BREAK': 0.25},
+                        parameters={'LINE_BREAK': {'voltage_drop': {'distribution': 'constant', 'value': 0.8}}})
+    values = spec.draw('LINE_BREAK', 400, np.random.default_rng(0))
+
+    boundary = BOUNDARY_PARAMETERS['LINE_BREAK']['drop_factor']
+    assert set(values) == {'fault_position', 'drop_factor', 'voltage_drop'}
+    assert ((values['drop_factor'][:100] >= boundary['low']) & (values['drop_factor'][:100] <= boundary['high'])).all()
+    assert values['drop_factor'][100:].min() < boundary['low']
+    assert (values['voltage_drop'][100:] == 0.8).all() and (values['voltage_drop'][:100] >= 0.86).all()
+
+    # The injector applies the drawn values instead of its own draws
+    waveforms = np.ones((400, 6, 400))
+    inject_line_break(waveforms, np.random.default_rng(1), 10000, values)
+    assert np.allclose(waveforms[:, 0, -1], values['drop_factor'])
+
+
+def test_example_spec_loads_and_bad_specs_are_rejected():
+    spec = ScenarioSpec.from_file(os.path.join(SCENARIOS_DIR, 'hard-cases.json'))
+    assert ScenarioSpec.from_dict(spec.to_dict()).to_dict() == spec.to_dict()
+
+    with pytest.raises(ValueError):
+        ScenarioSpec(classes={'BROWNOUT': 1})
+    with pytest.raises(ValueError):
+        ScenarioSpec(parameters={'OVERLOAD': {'drop_factor': {'distribution': 'uniform', 'low': 0, 'high': 1}}})
+    with pytest.raises(ValueError):
+        ScenarioSpec(parameters={'*': {'base_current': {'distribution': 'normal', 'mean': 40}}})
+    with pytest.raises(ValueError):
+        ScenarioSpec(oversample={'NORMAL': 0.5})
@@ -0,0 +1,89 @@
+"""
+Streaming fault detection on continuous 10 kHz synthetic feeder streams
+"""
+
+import numpy as np
+import pytest
+
+from grid_synthesis import FAULT_INJECTORS, kept_time_vector, synthesize_normal
+from stream_detector import FeederDetector, sliding_max
+
+SAMPLING_RATE = 10000
+CYCLE_MS = 20
+
+
+def stream(fault_type, seed):
+    """A 4 s full-rate stream and the sample index where the fault starts"""
+    rng = np.random.default_rng(seed)
+    t = kept_time_vector(SAMPLING_RATE, 4.0, 1)
+    waveforms = synthesize_normal(1, t, rng)
+    if fault_type == 'NORMAL':
+        return waveforms[0], None
+    clean = waveforms.copy()
+    FAULT_INJECTORS[fault_type](waveforms, rng, SAMPLING_RATE)
+    onset = int(np.flatnonzero(np.abs(waveforms - clean).max(axis=(0, 1)) > 1e-9)[0])
+    return waveforms[0], onset
+
+
+def run(waveform, chunk_sizes):
+    detector = FeederDetector('TEST', sampling_rate=SAMPLING_RATE)
+    events, start, i = [], 0, 0
+    while start < waveform.shape[1]:
+        size = chunk_sizes[i % len(chunk_sizes)]
+        events += detector.process(waveform[:, start:start + size])
+        start += size
+        i += 1
+    return events
+
+
+def test_sliding_max():
+    x = np.random.default_rng(0).normal(size=(2, 500))
+    expected = np.array([[row[i:i + 37].max() for i in range(500 - 36)] for row in x])
+    np.testing.assert_array_equal(sliding_max(x, 37), expected)
+
+
+def test_window_stats_match_direct_computation():
+    x = np.random.default_rng(1).normal(size=(6, 3000)) * 100
+    detector = FeederDetector('TEST', sampling_rate=SAMPLING_RATE)
+    w = detector.window
+    # Short and long chunks, across and exactly on block boundaries
+    sizes = [1, 7, 250, 3, 189, 200, 1, 600, 2, 199, 400]
+    rms, peak, start = [], [], 0
+    for size in sizes * 2:
+        chunk = x[:, start:start + size]
+        if chunk.shape[1] == 0:
+            break
+        chunk_rms, chunk_peak = detector._window_stats(chunk)
+        detector.samples_seen += chunk.shape[1]
+        rms.append(chunk_rms)
+        peak.append(chunk_peak)
+        start += size
+
+    history = np.lib.stride_tricks.sliding_window_view(np.pad(np.abs(x), ((0, 0), (w - 1, 0))), w, axis=1)
+    np.testing.assert_allclose(np.concatenate(rms, axis=1), np.sqrt((history ** 2).mean(axis=-1)), rtol=1e-9)
+    np.testing.assert_array_equal(np.concatenate(peak, axis=1), history.max(axis=-1))
+
+
+def test_normal_stream_is_quiet():
+    for seed in range(5):
+        assert run(stream('NORMAL', seed)[0], [400]) == []
+
+
+@pytest.mark.parametrize('fault_type, max_latency_ms', [
+    ('LINE_BREAK', 3 * CYCLE_MS),
+    ('SHORT_CIRCUIT', 3 * CYCLE_MS),
+    ('OVERLOAD', 1000),
+])
+def test_detects_fault_quickly(fault_type, max_latency_ms):
+    for seed in range(5):
+        waveform, onset = stream(fault_type, seed)
+        events = run(waveform, [400])
+        assert [event['fault_type'] for event in events] == [fault_type]
+        latency_ms = (events[0]['sample_index'] - onset) * 1000 / SAMPLING_RATE
+        assert 0 <= latency_ms <= max_latency_ms
+
+
+def test_chunking_does_not_change_detections():
+    waveform, _ = stream('SHORT_CIRCUIT', 3)
+    detections = lambda events: [(event['fault_type'], event['sample_index']) for event in events]
+    assert detections(run(waveform, [1, 7, 150, 333, 1024])) == detections(run(waveform, [4000]))
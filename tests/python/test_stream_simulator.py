@@ -0,0 +1,75 @@
+"""
+Live stream simulator: frame stream layout and fault injection seen by the detector
+"""
+
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from stream_detector import StreamDetector
+from stream_simulator import _fault_gains, read_frames, simulate
+
+
+def test_streams_continuous_frames_and_detectable_faults(tmp_path):
+    path = tmp_path / 'stream.bin'
+    feeders = [f'TST-F{i:03d}' for i in range(1, 7)]
+    report = simulate(f'file:{path}', feeders, duration_seconds=3.0, speed=0, workers=2,
+                      fault_rate_per_hour=1e6, seed=7, report_interval=0)
+
+    assert report['samples'] == len(feeders) * 30000
+
+    first_samples = defaultdict(list)
+    detector = StreamDetector()
+    detected = {}
+    with open(path, 'rb') as f:
+        for frame in read_frames(f):
+            first_samples[frame['feeder_id']].append(frame['first_sample'])
+            for event in detector.process(frame['feeder_id'], frame['samples']):
+                detected.setdefault(event['feeder_id'], event['fault_type'])
+
+    assert sorted(first_samples) == feeders
+    assert all(starts == list(range(0, 30000, 1000)) for starts in first_samples.values())
+
+    # Every feeder gets a fault right after warm-up and the detector names it
+    injected = {fault['feeder_id']: fault['fault_type'] for fault in report['injected_faults']}
+    assert sorted(injected) == feeders
+    assert detected == injected
+
+
+def test_streams_at_the_given_sampling_rate(tmp_path):
+    path = tmp_path / 'stream.bin'
+    feeders = [f'TST-F{i:03d}' for i in range(1, 4)]
+    report = simulate(f'file:{path}', feeders, duration_seconds=3.0, sampling_rate=2000, speed=0, workers=1,
+                      fault_rate_per_hour=1e6, seed=7, report_interval=0)
+
+    assert report['samples'] == len(feeders) * 6000
+
+    detector = StreamDetector(sampling_rate=2000)
+    detected = {}
+    with open(path, 'rb') as f:
+        for frame in read_frames(f):
+            assert frame['samples'].shape == (6, 200)
+            for event in detector.process(frame['feeder_id'], frame['samples']):
+                detected.setdefault(event['feeder_id'], event['fault_type'])
+    injected = {fault['feeder_id']: fault['fault_type'] for fault in report['injected_faults']}
+    assert sorted(injected) == feeders
+    assert detected == injected
+
+
+@pytest.mark.parametrize('fault_type, seconds', [('LINE_BREAK', 0.005), ('SHORT_CIRCUIT', 0.01)])
+def test_fault_transients_are_timed_in_seconds(fault_type, seconds):
+    for sampling_rate in (5000, 20000):
+        fault = {'type': fault_type, 'start': 100, 'length': 10 * sampling_rate, 'current': 1.0, 'voltage': 1.0}
+        num_samples = sampling_rate // 10
+        t = np.arange(num_samples) / sampling_rate
+        current, _, _ = _fault_gains(fault, 0, num_samples, t, sampling_rate)
+        assert np.flatnonzero(current != 1.0).max() < 100 + seconds * sampling_rate
+        assert np.flatnonzero(current != 1.0).max() > 100 + 0.8 * seconds * sampling_rate
+
+
+def test_failing_worker_raises_instead_of_hanging(tmp_path):
+    # Feeder ids are encoded as ASCII, so this one fails in the worker
+    with pytest.raises(RuntimeError, match='UnicodeEncodeError'):
+        simulate(f'file:{tmp_path / "stream.bin"}', ['TST-F001', 'TÉST-F002'], duration_seconds=1.0, speed=0,
+                 workers=2, seed=7, report_interval=0)
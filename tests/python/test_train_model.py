@@ -0,0 +1,111 @@
+"""
+Training entry points of train-model.py on small generated datasets
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_store_features_use_the_store_rate(tmp_path, monkeypatch, generate_dataset, train_model):
+    monkeypatch.chdir(tmp_path)
+    generator = generate_dataset.KeralaGridDataGenerator(seed=4, fidelity='direct', output_rate=1000)
+    generator.save_dataset(generator.generate_dataset(num_samples=40), name='direct')
+
+    df = train_model.load_dataset('data/direct', 'full')
+
+    normal = df[df['label'] == 'NORMAL']
+    assert len(df) == 40
+    assert np.allclose(normal['fundamental_frequency'], 50)
+    assert normal['thd_current_r'].max() < 20
+
+
+@pytest.fixture
+def features_csv(tmp_path, monkeypatch, generate_dataset):
+    """A small basic-feature CSV under data/ of a scratch working directory"""
+    monkeypatch.chdir(tmp_path)
+    generator = generate_dataset.KeralaGridDataGenerator(seed=5)
+    generator.generate_dataset_streaming(240, 'store', 'features.csv', shard_size=60)
+    return os.path.join('data', 'features.csv')
+
+
+def test_streaming_training_exports_model_and_metrics(features_csv, train_model):
+    train_model.train_model_streaming(features_csv, chunk_size=64, epochs=3, block_size=16)
+
+    with open('server/ml/model.json') as f:
+        model = json.load(f)
+    with open('server/ml/scaler.json') as f:
+        scaler = json.load(f)
+    with open('server/ml/metrics.json') as f:
+        metrics = json.load(f)
+    assert model['feature_columns'] == scaler['feature_columns'] == list(train_model.FEATURE_SETS['basic'])
+    assert len(scaler['mean']) == len(model['feature_columns'])
+    assert metrics['dataset_size'] == 240
+    assert metrics['training_samples'] + metrics['test_samples'] == 240
+    assert os.path.getsize('server/ml/model.bin') > 0
+
+
+def test_streaming_split_is_deterministic(features_csv, train_model, tmp_path):
+    columns = list(train_model.FEATURE_SETS['basic'])
+    splits = []
+    for chunk_size in (17, 1000):
+        spill_dir = tmp_path / f'spill_{chunk_size}'
+        spill_dir.mkdir()
+        scaler, train, test, class_counts = train_model._spill_features(features_csv, columns, chunk_size, str(spill_dir))
+        splits.append((np.array(train[0]), train[1], np.array(test[0]), test[1], scaler.mean_))
+        assert sum(class_counts.values()) == 240
+
+    # The same rows land in the same split whatever the chunking
+    for a, b in zip(*splits):
+        np.testing.assert_allclose(a, b, rtol=1e-6)
+    ids = pd.read_csv(features_csv)['sample_id']
+    test = train_model._is_test_row(ids)
+    np.testing.assert_array_equal(test, train_model._is_test_row(ids.to_numpy()[::-1])[::-1])
+    assert len(splits[0][3]) == test.sum()
+    assert 0.1 < test.mean() < 0.3
+
+
+def test_sweep_halves_the_candidates_and_keeps_the_best(features_csv, train_model):
+    os.replace(features_csv, os.path.join('data', 'kerala_grid_features_10k.csv'))
+    train_model.sweep_model(trials=9, workers=2, min_epochs=2, max_epochs=18, eta=3)
+
+    with open('server/ml/sweep.json') as f:
+        report = json.load(f)
+    assert len(report) == 9
+    # 9 candidates at 2 epochs, the best 3 at 6, the best of those at 18
+    for budget, count in ((2, 9), (6, 3), (18, 1)):
+        assert sum(any(r['budget'] == budget for r in c['rounds']) for c in report) == count
+    for k in (0, 1):
+        # Every candidate kept past round k scored at least as well in it as every one dropped
+        kept = [c['rounds'][k]['val_accuracy'] for c in report if len(c['rounds']) > k + 1]
+        dropped = [c['rounds'][k]['val_accuracy'] for c in report if len(c['rounds']) == k + 1]
+        assert min(kept) >= max(dropped)
+
+    # Epochs are the ones actually trained, never more than the budget
+    for c in report:
+        assert c['epochs'] == c['rounds'][-1]['epochs'] <= c['rounds'][-1]['budget']
+    best, = [c for c in report if len(c['rounds']) == 3]
+    with open('server/ml/model.json') as f:
+        model = json.load(f)
+    assert [len(b) for b in model['intercepts'][:-1]] == list(best['params']['hidden_layer_sizes'])
+
+
+def test_help_does_not_import_pandas_or_sklearn():
+    scripts_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'scripts')
+    code = (
+        "import runpy, sys\n"
+        "sys.argv = ['train-model.py', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('train-model.py', run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted(name for name in ('pandas', 'sklearn') if name in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=scripts_dir, capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.splitlines()[-1] == '[]'
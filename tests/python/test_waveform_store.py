@@ -0,0 +1,140 @@
+"""
+Chunked waveform store: round trip of chunks, metadata and manifest, and the indexed layout's
+queries by label, district, feeder and time against a plain scan
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from grid_synthesis import CHANNELS
+from waveform_store import (
+    METADATA_COLUMNS, PARAM_COLUMNS, WaveformStore, build_index, samples_to_arrays, write_chunk, write_manifest,
+)
+
+LABELS = ['NORMAL', 'LINE_BREAK', 'SHORT_CIRCUIT', 'OVERLOAD']
+FEEDERS = {'ERN-F001': 'Ernakulam', 'ERN-F002': 'Ernakulam', 'KOL-F001': 'Kollam', 'TRI-F007': 'Trivandrum'}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'store')
+    rng = np.random.default_rng(1)
+    samples = [
+        {'sample_id': i + 1, 'label': 'LINE_BREAK' if i % 2 else 'NORMAL', 'feeder_id': 'KOL-F001',
+         'feeder_name': 'Kollam Feeder 1', 'district': 'Kollam', 'area_type': 'urban', 'typical_load_kw': 120.5,
+         'timestamp': f'2025-01-{i + 1:02d}T00:00:00', **({'break_location_km': 2.5} if i % 2 else {}),
+         **{channel: rng.normal(size=16).tolist() for channel in CHANNELS}}
+        for i in range(10)
+    ]
+    chunks = []
+    for chunk_index, first in enumerate(range(0, 10, 4)):
+        waveforms, metadata = samples_to_arrays(samples[first:first + 4])
+        chunks.append(write_chunk(path, chunk_index, waveforms, metadata))
+    write_manifest(path, chunks, 1000, 0.016, fidelity='direct')
+
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    assert manifest['num_samples'] == 10 and manifest['dtype'] == 'float32'
+    assert manifest['channels'] == CHANNELS and manifest['fidelity'] == 'direct'
+    assert [chunk['num_samples'] for chunk in manifest['chunks']] == [4, 4, 2]
+
+    store = WaveformStore(path)
+    assert len(store) == 10
+    expected = np.array([[sample[channel] for channel in CHANNELS] for sample in samples], dtype=np.float32)
+    loaded = []
+    for waveforms, metadata in store.iter_chunks():
+        assert isinstance(waveforms, np.memmap) and waveforms.dtype == np.float32
+        assert list(metadata.columns) == METADATA_COLUMNS + PARAM_COLUMNS
+        loaded.append(np.asarray(waveforms))
+    np.testing.assert_array_equal(np.concatenate(loaded), expected)
+
+    metadata = store.metadata()
+    assert metadata['sample_id'].tolist() == list(range(1, 11))
+    assert metadata['break_location_km'].isna().tolist() == [i % 2 == 0 for i in range(10)]
+
+    sample = list(store)[3]
+    assert sample['label'] == 'LINE_BREAK' and sample['break_location_km'] == 2.5
+    assert 'fault_location_km' not in sample
+    assert sample['sampling_rate'] == 1000
+    np.testing.assert_array_equal(sample['voltage_b'], expected[3, 5])
+
+    build_index(path)
+    np.testing.assert_array_equal(WaveformStore(path).get(7), expected[6])
+    with pytest.raises(KeyError):
+        WaveformStore(path).get(11)
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('store'))
+    rng = np.random.default_rng(0)
+    chunks = []
+    for chunk_index in range(3):
+        n = 70
+        feeder_ids = rng.choice(list(FEEDERS), size=n)
+        metadata = pd.DataFrame({
+            'sample_id': chunk_index * n + np.arange(1, n + 1),
+            'label': rng.choice(LABELS, size=n),
+            'feeder_id': feeder_ids,
+            'feeder_name': feeder_ids,
+            'district': [FEEDERS[f] for f in feeder_ids],
+            'area_type': rng.choice(['urban', 'rural'], size=n),
+            'typical_load_kw': rng.uniform(50, 500, size=n),
+            'timestamp': np.datetime_as_string(
+                np.datetime64('2025-01-01') + rng.integers(0, 365, size=n).astype('timedelta64[D]'), unit='us'),
+        }, columns=METADATA_COLUMNS)
+        # Every waveform is filled with its sample id so rows can be traced after sorting
+        waveforms = np.broadcast_to(metadata['sample_id'].to_numpy(np.float32)[:, None, None], (n, 6, 8))
+        chunks.append(write_chunk(path, chunk_index, waveforms, metadata))
+    write_manifest(path, chunks, 10000, 4.0)
+    build_index(path)
+    return WaveformStore(path)
+
+
+def scan(store, label=None, district=None, feeder_prefix=None, start=None, end=None):
+    metadata = store.metadata()
+    timestamps = pd.to_datetime(metadata['timestamp'])
+    mask = np.ones(len(metadata), dtype=bool)
+    if label is not None:
+        mask &= metadata['label'] == label
+    if district is not None:
+        mask &= metadata['district'] == district
+    if feeder_prefix is not None:
+        mask &= metadata['feeder_id'].str.startswith(feeder_prefix)
+    if start is not None:
+        mask &= timestamps >= pd.Timestamp(start)
+    if end is not None:
+        mask &= timestamps < pd.Timestamp(end)
+    return sorted(metadata.loc[mask, 'sample_id'])
+
+
+@pytest.mark.parametrize('query', [
+    {'label': 'SHORT_CIRCUIT', 'feeder_prefix': 'ERN', 'start': '2025-03-01', 'end': '2025-04-01'},
+    {'label': 'OVERLOAD', 'district': 'Kollam'},
+    {'district': 'Ernakulam', 'start': '2025-06-01'},
+    {'label': 'NO_SUCH_LABEL'},
+    {},
+])
+def test_query_matches_scan(store, query):
+    selection = store.query(**query)
+    assert sorted(selection.sample_ids) == scan(store, **query)
+    assert list(selection.metadata['sample_id']) == list(selection.sample_ids)
+    for view in selection.views():
+        assert isinstance(view, np.memmap)
+    waveforms = selection.waveforms()
+    np.testing.assert_array_equal(waveforms[:, 0, 0], selection.sample_ids)
+
+
+def test_label_and_district_is_one_contiguous_view(store):
+    selection = store.query(label='LINE_BREAK', district='Ernakulam')
+    assert len(selection.runs) == 1
+    assert isinstance(selection.waveforms(), np.memmap)
+
+
+def test_get_by_sample_id(store):
+    assert store.get(123)[0, 0] == 123
+    with pytest.raises(KeyError):
+        store.get(10**6)
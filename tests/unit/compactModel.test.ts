@@ -0,0 +1,36 @@
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { CompactModel } from '../../server/services/compactModel.js';
+
+// Model files and expected probabilities written by scripts/compact_model.py
+const FIXTURES = path.join(process.cwd(), 'tests', 'fixtures');
+const fixture = JSON.parse(fs.readFileSync(path.join(FIXTURES, 'compact_model.json'), 'utf8'));
+
+describe('CompactModel', () => {
+  describe.each(['float32', 'int8'])('%s model', (dtype) => {
+    const model = CompactModel.load(path.join(FIXTURES, `compact_model_${dtype}.bin`));
+
+    it('should read the header', () => {
+      expect(model.featureColumns).toEqual(fixture.feature_columns);
+      expect(model.featureKeys[0]).toBe('currentRmsR');
+      expect(model.classes).toEqual(['NORMAL', 'LINE_BREAK', 'SHORT_CIRCUIT', 'OVERLOAD']);
+    });
+
+    it('should match the Python predictions', () => {
+      fixture.inputs.forEach((input: number[], i: number) => {
+        const probabilities = Array.from(model.predict(input));
+        const expected: number[] = fixture.expected[dtype][i];
+        expect(probabilities).toHaveLength(expected.length);
+        probabilities.forEach((p, j) => expect(p).toBeCloseTo(expected[j], 5));
+      });
+    });
+  });
+
+  it('should reject files that are not compact models', () => {
+    const filePath = path.join(fs.mkdtempSync(path.join(os.tmpdir(), 'compact-model-')), 'model.bin');
+    fs.writeFileSync(filePath, '{"coefs": []}');
+
+    expect(() => CompactModel.load(filePath)).toThrow('not a compact model file');
+  });
+});
@@ -1,4 +1,6 @@
+import path from 'path';
 import { MLService } from '../../server/services/mlService.js';
+import { CompactModel } from '../../server/services/compactModel.js';
 
 describe('MLService', () => {
   let mlService: MLService;
@@ -46,6 +48,41 @@ describe('MLService', () => {
     });
   });
 
+  describe('predict with the compact model', () => {
+    const modelPath = path.join(process.cwd(), 'tests', 'fixtures', 'compact_model_float32.bin');
+    const waveformData = {
+      currentR: Array.from({ length: 400 }, (_, i) => Math.sin(2 * Math.PI * i / 200) * 50),
+      currentY: Array.from({ length: 400 }, (_, i) => Math.sin(2 * Math.PI * i / 200 - 2.09) * 50),
+      currentB: Array.from({ length: 400 }, (_, i) => Math.sin(2 * Math.PI * i / 200 + 2.09) * 50),
+      voltageR: Array.from({ length: 400 }, (_, i) => Math.sin(2 * Math.PI * i / 200) * 230),
+      voltageY: Array.from({ length: 400 }, (_, i) => Math.sin(2 * Math.PI * i / 200 - 2.09) * 230),
+      voltageB: Array.from({ length: 400 }, (_, i) => Math.sin(2 * Math.PI * i / 200 + 2.09) * 230),
+      samplingRate: 10000,
+      durationSeconds: 4.0,
+    };
+
+    it('should classify with the features named in the model header', async () => {
+      (mlService as any).compactModel = CompactModel.load(modelPath);
+
+      const result = await mlService.predict(waveformData);
+
+      expect(['NORMAL', 'LINE_BREAK', 'SHORT_CIRCUIT', 'OVERLOAD']).toContain(result.faultType);
+      expect(result.confidence).toBeGreaterThan(0);
+      expect(result.confidence).toBeLessThanOrEqual(1);
+    });
+
+    it('should fail instead of zero-filling a missing feature', async () => {
+      const model = CompactModel.load(modelPath);
+      Object.defineProperty(model, 'featureKeys', { value: [...model.featureKeys.slice(1), 'notAFeature'] });
+      (mlService as any).compactModel = model;
+      const features = (mlService as any).featureExtractor.extractFeatures(waveformData);
+
+      expect(() => (mlService as any).predictWithCompactModel(features))
+        .toThrow('Feature notAFeature required by the compact model is missing');
+      await expect(mlService.predict(waveformData)).rejects.toThrow();
+    });
+  });
+
   describe('getModelMetrics', () => {
     it('should return model performance metrics', async () => {
       const metrics = await mlService.getModelMetrics();